@@ -0,0 +1,118 @@
+"""
+Perfis de carga em modelo aberto (taxa de chegada).
+
+Um perfil é uma sequência de estágios no formato "DURAÇÃO@TAXA", separados por
+vírgula, por exemplo "30s@50rps, 120s@200rps, 30s@0". A taxa pode ser uma rampa
+linear ("60s@10->200rps"). Durações aceitam os sufixos s, m e h (padrão: s).
+
+As chegadas são geradas invertendo a contagem acumulada de requisições N(t),
+que é exata tanto para estágios constantes quanto para rampas: no modo uniforme
+a k-ésima requisição sai quando N(t) = k; no modo Poisson os alvos são somas de
+variáveis exponenciais de média 1 (teorema da mudança de escala de tempo).
+"""
+import re
+import math
+import random
+
+CHEGADAS_UNIFORMES = 'uniform'
+CHEGADAS_POISSON = 'poisson'
+
+_UNIDADES = {'s': 1, 'm': 60, 'h': 3600}
+_ESTAGIO = re.compile(
+    r'^\s*(?P<duracao>\d+(?:\.\d+)?)\s*(?P<unidade>[smh]?)\s*@\s*'
+    r'(?P<taxa>\d+(?:\.\d+)?)(?:\s*->\s*(?P<taxa_final>\d+(?:\.\d+)?))?\s*(?:rps)?\s*$'
+)
+
+
+class Estagio:
+    """Estágio do perfil: duração em segundos e taxa (req/s) no início e no fim, variando linearmente"""
+
+    def __init__(self, duracao: float, taxa_inicial: float, taxa_final: float = None):
+        self.duracao = duracao
+        self.taxa_inicial = taxa_inicial
+        self.taxa_final = taxa_inicial if taxa_final is None else taxa_final
+
+    def __repr__(self):
+        if self.taxa_final == self.taxa_inicial:
+            return f"{self.duracao:g}s@{self.taxa_inicial:g}rps"
+        return f"{self.duracao:g}s@{self.taxa_inicial:g}->{self.taxa_final:g}rps"
+
+    def requisicoes(self) -> float:
+        """Número esperado de requisições no estágio (área sob a taxa)"""
+        return (self.taxa_inicial + self.taxa_final) / 2 * self.duracao
+
+    def taxa_em(self, t: float) -> float:
+        return self.taxa_inicial + (self.taxa_final - self.taxa_inicial) * t / self.duracao
+
+    def tempo_para(self, n: float) -> float:
+        """Instante (relativo ao início do estágio) em que a contagem acumulada atinge n"""
+        aceleracao = (self.taxa_final - self.taxa_inicial) / self.duracao
+        if abs(aceleracao) < 1e-12:
+            return n / self.taxa_inicial
+        # Resolve taxa_inicial * t + aceleracao * t² / 2 = n
+        discriminante = max(self.taxa_inicial ** 2 + 2 * aceleracao * n, 0.0)
+        return (math.sqrt(discriminante) - self.taxa_inicial) / aceleracao
+
+
+def interpretar_perfil(texto: str) -> list:
+    """Converte "30s@50rps, 120s@200rps, 30s@0" em uma lista de Estagio"""
+    estagios = []
+    for parte in texto.split(','):
+        if not parte.strip():
+            continue
+        m = _ESTAGIO.match(parte)
+        if not m:
+            raise ValueError(f"Estágio inválido no perfil de carga: '{parte.strip()}' (esperado, ex.: 30s@50rps ou 60s@10->200rps)")
+        duracao = float(m.group('duracao')) * _UNIDADES[m.group('unidade') or 's']
+        if duracao <= 0:
+            raise ValueError(f"Estágio com duração zero no perfil de carga: '{parte.strip()}'")
+        taxa_final = m.group('taxa_final')
+        estagios.append(Estagio(duracao, float(m.group('taxa')), float(taxa_final) if taxa_final else None))
+    if not estagios:
+        raise ValueError("Perfil de carga vazio")
+    return estagios
+
+
+def escalar_perfil(estagios: list, fator: float) -> list:
+    """Multiplica as taxas de todos os estágios (ex.: para dividir a carga entre workers)"""
+    return [Estagio(e.duracao, e.taxa_inicial * fator, e.taxa_final * fator) for e in estagios]
+
+
+def recortar_perfil(estagios: list, decorrido: float) -> list:
+    """Parte do perfil que falta depois de `decorrido` segundos (ex.: para retomar uma execução)"""
+    restantes = []
+    for e in estagios:
+        if decorrido >= e.duracao:
+            decorrido -= e.duracao
+            continue
+        if decorrido > 0:
+            e = Estagio(e.duracao - decorrido, e.taxa_em(decorrido), e.taxa_final)
+            decorrido = 0
+        restantes.append(e)
+    return restantes
+
+
+def duracao_total(estagios: list) -> float:
+    return sum(e.duracao for e in estagios)
+
+
+def chegadas(estagios: list, modo: str = CHEGADAS_UNIFORMES, rng: random.Random = None):
+    """Gera os instantes previstos de envio (segundos desde o início do perfil), em ordem crescente"""
+    rng = rng or random.Random()
+    if modo == CHEGADAS_POISSON:
+        def passo():
+            return rng.expovariate(1.0)
+    else:
+        def passo():
+            return 1.0
+
+    inicio_estagio = 0.0
+    proximo = passo()
+    for estagio in estagios:
+        total = estagio.requisicoes()
+        while proximo <= total:
+            yield inicio_estagio + estagio.tempo_para(proximo)
+            proximo += passo()
+        # O que sobrou do alvo passa para o próximo estágio
+        proximo -= total
+        inicio_estagio += estagio.duracao
@@ -1,12 +1,36 @@
 import os
+import sys
 import time
+import argparse
+import asyncio
+import contextlib
 import concurrent.futures
+import multiprocessing
+import queue
+import threading
+import aiohttp
 import requests
 from dotenv import load_dotenv
-from faker import Faker
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 import random
+from collections import deque
 import json  # Adicionando a importação do módulo json
+from estado_pedidos import ArmazemPedidos, EstadoPedidos
+from cenarios import Cenario, TransacaoPedido, carregar_cenario, TRANSACAO_PEDIDO, ETAPAS_CICLO
+from agendador import interpretar_perfil, escalar_perfil, recortar_perfil, duracao_total, chegadas, CHEGADAS_UNIFORMES, CHEGADAS_POISSON
+from metricas import Metricas, PERCENTIS_RELATORIO, FASES, SUCESSO, ERRO_ESPERADO, ERRO
+from registro import log, configurar_registro, parar_registro, arquivo_worker, tamanho_fila_log
+from painel import Painel
+from exportacao import SerieTemporal, caminho_resumo
+from gravacao import Gravador, Reproducao, ler_gravacao
+from capacidade import buscar_capacidade, imprimir_capacidade, MODO_TAXA, MODO_USUARIOS
+from classificacao import carregar_classificador, LIMITE_CORPO
+from referencias import obter_referencias
+from exposicao import ExposicaoMetricas
+from resistencia import PontoControle, ler_ponto_controle, retomar
+from saturacao import MonitorSaturacao
+from perfilamento import Perfilador, combinar_perfis_workers, imprimir_perfil
+from payloads import PoolTextos, semear_faker
 
 # Carrega as variáveis de ambiente
 load_dotenv()
@@ -16,9 +40,61 @@ API_BASE_URL = os.getenv('API_BASE_URL')
 API_PORT = os.getenv('API_PORT')
 MAX_CONCURRENT_REQUESTS = int(os.getenv('MAX_CONCURRENT_REQUESTS'))
 TEST_DURATION_SECONDS = int(os.getenv('TEST_DURATION_SECONDS'))
+NUM_USUARIOS_SIMULTANEOS = int(os.getenv('NUM_USUARIOS_SIMULTANEOS', MAX_CONCURRENT_REQUESTS))
+# Perfil de carga em modelo aberto (vazio: modelo fechado com NUM_USUARIOS_SIMULTANEOS usuários)
+PERFIL_CARGA = os.getenv('PERFIL_CARGA', '')
+# Arquivo de cenário (endpoints, pesos, pausas e geradores de payload)
+CENARIO = os.getenv('CENARIO', 'cenario.json')
+# Quantas vezes o modelo aberto tenta sortear um endpoint disponível para cada chegada
+TENTATIVAS_SELECAO = 10
+# Banco de estado dos pedidos e frequência dos commits (cada commit faz um fsync)
+ESTADO_DB = os.getenv('ESTADO_DB', 'estado_pedidos.db')
+ESTADO_COMMIT_LOTE = int(os.getenv('ESTADO_COMMIT_LOTE', 200))
+ESTADO_COMMIT_INTERVALO = float(os.getenv('ESTADO_COMMIT_INTERVALO', 1.0))
+# Log das requisições ('-' para stderr), nível (DEBUG inclui o corpo das respostas) e tamanho da fila
+LOG_ARQUIVO = os.getenv('LOG_ARQUIVO', 'api_tester.log')
+LOG_NIVEL = os.getenv('LOG_NIVEL', 'INFO')
+LOG_FILA = int(os.getenv('LOG_FILA', 10000))
+# Textos pré-gerados para cada tamanho usado no cenário ($texto:N)
+POOL_TEXTOS = int(os.getenv('POOL_TEXTOS', 1000))
+# Semente dos geradores aleatórios, para repetir os mesmos payloads (vazio: aleatória)
+SEMENTE = int(os.getenv('SEMENTE')) if os.getenv('SEMENTE') else None
+# SLO da busca de capacidade (--find-capacity): p99 máximo em segundos e taxa máxima de erros em %
+SLO_P99 = float(os.getenv('SLO_P99', 2.0))
+SLO_ERROS = float(os.getenv('SLO_ERROS', 1.0))
+# Série por segundo das métricas (.jsonl ou .csv); vazio: não exporta
+EXPORTAR = os.getenv('EXPORTAR', '')
+# Modo distribuído: agentes de carga (host:porta, separados por vírgula) e o token exigido por eles
+AGENTES = os.getenv('AGENTES', '')
+AGENTES_TOKEN = os.getenv('AGENTES_TOKEN', '')
+# Regras das respostas de erro esperadas (ver classificacao.py)
+ERROS_ESPERADOS = os.getenv('ERROS_ESPERADOS', 'erros_esperados.json')
+# Status de sucesso; o corpo das demais respostas é lido só até LIMITE_CORPO bytes
+STATUS_SUCESSO = (200, 201, 204)
+# Cache dos catálogos lidos da API na partida (clientes, representantes, produtos) e sua validade em segundos
+REFERENCIAS_CACHE = os.getenv('REFERENCIAS_CACHE', 'referencias_cache.json.gz')
+REFERENCIAS_TTL = float(os.getenv('REFERENCIAS_TTL', 86400))
 
-# Inicializa o Faker para gerar dados aleatórios
-fake = Faker('pt_BR')
+# Porta local do endpoint /metrics (OpenMetrics) durante o teste (vazio: desativado)
+METRICAS_PORTA = int(os.getenv('METRICAS_PORTA')) if os.getenv('METRICAS_PORTA') else None
+METRICAS_HOST = os.getenv('METRICAS_HOST', '127.0.0.1')
+
+# Respostas guardadas em results['success_responses'] (as mais recentes)
+RESPOSTAS_GUARDADAS = int(os.getenv('RESPOSTAS_GUARDADAS', 1000))
+# Teste de resistência (--soak): pedidos mantidos no estado, ponto de controle, intervalo entre pontos e janela das métricas (s)
+SOAK_MAX_PEDIDOS = int(os.getenv('SOAK_MAX_PEDIDOS', 10000))
+SOAK_CHECKPOINT = os.getenv('SOAK_CHECKPOINT', 'soak.checkpoint.json')
+SOAK_INTERVALO = float(os.getenv('SOAK_INTERVALO', 60))
+SOAK_JANELA = float(os.getenv('SOAK_JANELA', 300))
+# Saturação do gerador (ver saturacao.py): limites de CPU (fração de um núcleo), atraso do laço de eventos (s),
+# p99 do atraso de envio (s) e fração de intervalos saturados acima da qual a execução é inválida; 0 desativa o limite
+SATURACAO_CPU = float(os.getenv('SATURACAO_CPU', 0.9))
+SATURACAO_ATRASO_LACO = float(os.getenv('SATURACAO_ATRASO_LACO', 0.1))
+SATURACAO_ATRASO_ENVIO = float(os.getenv('SATURACAO_ATRASO_ENVIO', 0.05))
+SATURACAO_TOLERANCIA = float(os.getenv('SATURACAO_TOLERANCIA', 0.1))
+
+# Pools de textos aleatórios; o Faker só é carregado quando o primeiro pool é gerado
+textos = PoolTextos(POOL_TEXTOS)
 
 class APITester:
     def __init__(self):
@@ -28,338 +104,678 @@ class APITester:
         self.results = {
             'success': 0,
             'errors': 0,
+            # Respostas de erro previstas pelas regras de ERROS_ESPERADOS (nem sucesso, nem erro)
+            'expected_errors': 0,
             'total_time': 0,
-            'response_times': [],
-            'success_responses': []  # <-- Adicionado para armazenar respostas de sucesso
+            # Chegadas do modelo aberto descartadas por o perfil ter terminado antes do envio
+            'nao_enviadas': 0,
+            # Chegadas do modelo aberto sem requisição possível após TENTATIVAS_SELECAO sorteios (ex.: ainda sem pedidos)
+            'sem_requisicao': 0,
+            'success_responses': deque(maxlen=RESPOSTAS_GUARDADAS)  # <-- Adicionado para armazenar respostas de sucesso
         }
-        # Lista para armazenar os números de pedidos criados
-        self.pedidos_criados = []
-        # Dicionário para armazenar os itens de cada pedido {nro_pedido: [codigos_produto]}
-        self.itens_por_pedido = {}
-        # Dicionário para rastrear os clientes de cada pedido
-        self.pedidos_clientes = {}
-        # Carregar códigos de produto
-        self.codigos_produto = carregar_codigos_produto()
-        # Tenta carregar pedidos criados anteriormente
-        self.carregar_pedidos_criados()
-        # Tenta carregar itens por pedido
-        self.carregar_itens_por_pedido()
-        # Tenta carregar pedidos_clientes
-        self.carregar_pedidos_clientes()
+        # Histogramas de latência por endpoint e resultado
+        self.metricas = Metricas()
+        # Tabela (template, status) -> regras de erro esperado
+        self.classificador = carregar_classificador(ERROS_ESPERADOS)
+        # Métricas próprias de cada thread de run_concurrent_tests (mescladas ao final)
+        self._local = threading.local()
+        # Requisições enviadas e ainda sem resposta (exibido no painel)
+        self.em_andamento = 0
+        # Atraso do laço de eventos na última atualização do painel (motor assíncrono)
+        self.atraso_laco = None
+        # Últimas medidas de cada worker (coordenador), ver medidas()
+        self.medidas_workers = {}
+        # Saúde do gerador ao fim da execução (MonitorSaturacao.resumo), gravada no resumo de --export
+        self.saturacao = None
+        # Gravação das requisições enviadas (--record), ver gravacao.Gravador
+        self.gravador = None
+        # Modo soak: máximo de pedidos no estado em memória (os fechados e os mais antigos são retirados; os fechados ficam marcados no banco e não são carregados de novo); None mantém todos
+        self.max_pedidos = None
+        # Banco com o estado dos pedidos (compartilhável entre processos)
+        self.armazem = ArmazemPedidos(ESTADO_DB, ESTADO_COMMIT_LOTE, ESTADO_COMMIT_INTERVALO)
+        # Pedidos criados, itens e cliente de cada pedido (em memória, gravados no armazém)
+        self.estado = EstadoPedidos(self.armazem)
+        # Carrega pedidos, itens e clientes de execuções anteriores
+        self.carregar_estado()
     
-    def carregar_pedidos_clientes(self):
-        """Carrega a relação entre pedidos e clientes de um arquivo, se existir"""
+    def carregar_estado(self):
+        """Carrega o estado dos pedidos do banco, importando os arquivos JSON antigos na primeira vez"""
         try:
-            if os.path.exists('pedidos_clientes.json'):
-                with open('pedidos_clientes.json', 'r') as f:
-                    # Converte as chaves de string para int
-                    dados = json.load(f)
-                    self.pedidos_clientes = {int(k): v for k, v in dados.items()}
-                print(f"Carregados clientes para {len(self.pedidos_clientes)} pedidos")
+            if not self.armazem.migrado():
+                total = self.armazem.importar_json()
+                log.info("Importados %d pedidos dos arquivos JSON para %s", total, ESTADO_DB)
+            self.estado.carregar(*self.armazem.carregar())
+            log.info("Carregados %d pedidos de execuções anteriores", len(self.estado))
+            log.info("Carregados itens para %d pedidos", self.estado.pedidos_com_itens())
+            log.info("Carregados clientes para %d pedidos", self.estado.pedidos_com_cliente())
         except Exception as e:
-            print(f"Erro ao carregar pedidos_clientes: {str(e)}")
-            self.pedidos_clientes = {}
-            
-    def salvar_pedidos_clientes(self):
-        """Salva o dicionário de pedidos e clientes em um arquivo"""
-        try:
-            with open('pedidos_clientes.json', 'w') as f:
-                json.dump(self.pedidos_clientes, f)
-            print(f"Salvos clientes para {len(self.pedidos_clientes)} pedidos")
-        except Exception as e:
-            print(f"Erro ao salvar pedidos_clientes: {str(e)}")
-            
-    def carregar_pedidos_criados(self):
-        """Carrega pedidos criados de um arquivo, se existir"""
-        try:
-            if os.path.exists('pedidos_criados.json'):
-                with open('pedidos_criados.json', 'r') as f:
-                    self.pedidos_criados = json.load(f)
-                print(f"Carregados {len(self.pedidos_criados)} pedidos de execuções anteriores")
-        except Exception as e:
-            print(f"Erro ao carregar pedidos criados: {str(e)}")
-            self.pedidos_criados = []
+            log.error("Erro ao carregar estado dos pedidos: %s", e)
+            self.estado = EstadoPedidos(self.armazem)
 
-    def salvar_pedidos_criados(self):
-        """Salva a lista de pedidos criados em um arquivo"""
-        try:
-            with open('pedidos_criados.json', 'w') as f:
-                json.dump(self.pedidos_criados, f)
-            print(f"Salvos {len(self.pedidos_criados)} pedidos criados")
-        except Exception as e:
-            print(f"Erro ao salvar pedidos criados: {str(e)}")
-            
-    def carregar_itens_por_pedido(self):
-        """Carrega itens por pedido de um arquivo, se existir"""
-        try:
-            if os.path.exists('itens_por_pedido.json'):
-                with open('itens_por_pedido.json', 'r') as f:
-                    # Converte as chaves de string para int
-                    dados = json.load(f)
-                    self.itens_por_pedido = {int(k): v for k, v in dados.items()}
-                print(f"Carregados itens para {len(self.itens_por_pedido)} pedidos")
-        except Exception as e:
-            print(f"Erro ao carregar itens por pedido: {str(e)}")
-            self.itens_por_pedido = {}
-            
-    def salvar_itens_por_pedido(self):
-        """Salva o dicionário de itens por pedido em um arquivo"""
-        try:
-            with open('itens_por_pedido.json', 'w') as f:
-                json.dump(self.itens_por_pedido, f)
-            print(f"Salvos itens para {len(self.itens_por_pedido)} pedidos")
-        except Exception as e:
-            print(f"Erro ao salvar itens por pedido: {str(e)}")
+    def fechar(self):
+        """Confirma as alterações de estado pendentes e libera os recursos do tester"""
+        self.armazem.fechar()
+        self.session.close()
+
+    def restringir_particao(self, worker_id: int, num_workers: int):
+        """Mantém apenas os pedidos carregados que pertencem a este worker (nro_pedido % num_workers)"""
+        self.estado.restringir(lambda nro_pedido: nro_pedido % num_workers == worker_id)
 
     def adicionar_pedido_criado(self, nro_pedido):
-        """Adiciona um número de pedido à lista de pedidos criados"""
-        if nro_pedido not in self.pedidos_criados:
-            self.pedidos_criados.append(nro_pedido)
-            self.salvar_pedidos_criados()
+        """Adiciona um número de pedido aos pedidos criados"""
+        self.estado.adicionar_pedido(nro_pedido)
+
+    def associar_cliente_ao_pedido(self, nro_pedido, cod_cliente):
+        """Registra o cliente usado na criação do pedido"""
+        self.estado.associar_cliente(nro_pedido, cod_cliente)
             
     def adicionar_item_ao_pedido(self, nro_pedido, cod_produto):
-        """Adiciona um item à lista de itens do pedido"""
-        # Converte para int para garantir consistência
-        nro_pedido = int(nro_pedido)
-        
-        # Inicializa a lista de itens se o pedido não existir no dicionário
-        if nro_pedido not in self.itens_por_pedido:
-            self.itens_por_pedido[nro_pedido] = []
-            
-        # Adiciona o código do produto à lista de itens do pedido
-        if cod_produto not in self.itens_por_pedido[nro_pedido]:
-            self.itens_por_pedido[nro_pedido].append(cod_produto)
-            self.salvar_itens_por_pedido()
-            return True
-        return False
+        """Adiciona um item ao pedido; retorna False se ele já estava no pedido"""
+        return self.estado.adicionar_item(nro_pedido, cod_produto)
         
     def obter_item_aleatorio_do_pedido(self, nro_pedido):
-        """Retorna um código de produto aleatório da lista de itens do pedido"""
-        # Converte para int para garantir consistência
-        nro_pedido = int(nro_pedido)
-        
-        # Verifica se o pedido existe e tem itens
-        if nro_pedido in self.itens_por_pedido and self.itens_por_pedido[nro_pedido]:
-            return random.choice(self.itens_por_pedido[nro_pedido])
-        return None
+        """Retorna um código de produto aleatório entre os itens do pedido"""
+        return self.estado.item_aleatorio(nro_pedido)
         
     def remover_item_do_pedido(self, nro_pedido, cod_produto):
-        """Remove um item da lista de itens do pedido"""
-        # Converte para int para garantir consistência
-        nro_pedido = int(nro_pedido)
-        
-        # Verifica se o pedido existe e tem o item
-        if nro_pedido in self.itens_por_pedido and cod_produto in self.itens_por_pedido[nro_pedido]:
-            self.itens_por_pedido[nro_pedido].remove(cod_produto)
-            self.salvar_itens_por_pedido()
-            return True
-        return False
+        """Remove um item do pedido; retorna False se ele não estava no pedido"""
+        return self.estado.remover_item(nro_pedido, cod_produto)
 
     def obter_pedido_aleatorio(self):
-        """Retorna um número de pedido aleatório da lista de pedidos criados"""
-        if not self.pedidos_criados:
+        """Retorna um número de pedido aleatório entre os pedidos criados"""
+        nro_pedido = self.estado.pedido_aleatorio()
+        if nro_pedido is None:
             # Se não houver pedidos criados, retorna um valor padrão
             return random.choice(carregar_nro_pedidos())
-        return random.choice(self.pedidos_criados)
+        return nro_pedido
 
-    def test_endpoint(self, endpoint: str, method: str = 'GET', data: Dict[str, Any] = None, params: Dict[str, Any] = None) -> tuple[bool, float]:
+    def test_endpoint(self, endpoint: str, method: str = 'GET', data: Dict[str, Any] = None, params: Dict[str, Any] = None, template: str = None, contexto: Dict[str, Any] = None) -> tuple[bool, float]:
         """
         Testa um endpoint específico
+
+        template identifica o endpoint nas métricas (ex.: '/Pedido/listarPedidosAbertos/{codRepresentante}');
+        se omitido, é deduzido do próprio endpoint. Se informado, contexto recebe
+        o 'resultado' e, num pedido criado, o número em 'pedido' (ver TransacaoPedido).
         """
+        template = template or template_endpoint(endpoint)
         # Corrigido: garante que não haja barra dupla na URL
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
-            if method == 'GET':
-                response = self.session.get(url, params=params)
-            elif method == 'POST':
-                response = self.session.post(url, json=data, params=params)
-            elif method == 'PUT':
-                response = self.session.put(url, json=data)
-            elif method == 'DELETE':
-                response = self.session.delete(url, params=params)
-            else:
-                raise ValueError(f"Método {method} não suportado")
+            self.em_andamento += 1
+            try:
+                # stream=True: a chamada retorna ao chegarem os cabeçalhos e o corpo é lido à parte
+                if method == 'GET':
+                    response = self.session.get(url, params=params, stream=True)
+                elif method == 'POST':
+                    response = self.session.post(url, json=data, params=params, stream=True)
+                elif method == 'PUT':
+                    response = self.session.put(url, json=data, stream=True)
+                elif method == 'DELETE':
+                    response = self.session.delete(url, params=params, stream=True)
+                else:
+                    raise ValueError(f"Método {method} não suportado")
+                primeiro_byte = time.perf_counter()
+                texto = response.text if response.status_code in STATUS_SUCESSO else ler_inicio_corpo(response)
+            finally:
+                self.em_andamento -= 1
 
-            response_time = time.time() - start_time
-            self.results['response_times'].append(response_time)
+            fim = time.perf_counter()
+            response_time = fim - start_time
 
-            # Tratamento especial para o endpoint de recuperação de observação
-            if endpoint.startswith('/EditaItemPedido/recuperarObservacao/') and response.status_code == 404:
-                # Trata como sucesso com mensagem personalizada
-                self.results['success'] += 1
-                nro_pedido = params.get('nroPedido', 'desconhecido') if params else 'desconhecido'
-                mensagem = f"Pedido {nro_pedido} sem observações"
-                print(f"Informação: {mensagem}")
-                self.results['success_responses'].append(mensagem)
-                return True, response_time
-                
-            # Tratamento especial para o endpoint de exclusão de item
-            if endpoint == '/EditaItemPedido/excluirItem' and response.status_code == 404:
-                # Trata como informação, não como erro
-                self.results['success'] += 1
-                nro_pedido = params.get('nroPedido', 'desconhecido') if params else 'desconhecido'
-                codigo = params.get('codigo', 'desconhecido') if params else 'desconhecido'
-                mensagem = f"Item {codigo} não encontrado no pedido {nro_pedido}"
-                print(f"Informação: {mensagem}")
-                self.results['success_responses'].append(mensagem)
-                return True, response_time
-                
-            # Tratamento especial para erros de impressão de pedido
-            if (endpoint == '/Pedido/imprime' or endpoint == '/Pedido/imprimeFichaCadastral') and response.status_code == 500:
-                # Trata como informação, não como erro
-                self.results['success'] += 1
-                nro_pedido = data.get('nroPedido', 'desconhecido') if data else 'desconhecido'
-                mensagem = f"Pedido {nro_pedido} não pode ser impresso (pode ter sido excluído ou alterado)"
-                print(f"Informação: {mensagem}")
+            resultado, nro_pedido_criado = self.processar_resposta(endpoint, response.status_code, texto, data, params, template)
+            metricas = self.metricas_atuais()
+            metricas.registrar(template, resultado, response_time)
+            # O requests não expõe DNS, conexão e envio: numa conexão nova, a espera inclui essas fases
+            metricas.registrar_fases(template, {'espera': primeiro_byte - start_time, 'download': fim - primeiro_byte})
+            anotar_contexto(contexto, resultado, nro_pedido_criado)
+            if self.gravador:
+                self.gravador.registrar(start_time, method, endpoint, template, data, params, nro_pedido_criado)
+
+            return resultado != ERRO, response_time
+
+        except Exception as e:
+            response_time = time.perf_counter() - start_time
+            self.results['errors'] += 1
+            self.metricas_atuais().registrar(template, ERRO, response_time)
+            anotar_contexto(contexto, ERRO)
+            if self.gravador:
+                self.gravador.registrar(start_time, method, endpoint, template, data, params)
+            log.error("Exceção no endpoint %s: %s", endpoint, e)
+            return False, response_time
+
+    def executar_transacao(self, transacao: TransacaoPedido):
+        """Executa, uma requisição por vez, todas as etapas de uma transação do cenário"""
+        inicio = time.perf_counter()
+        lote = transacao.proximo_lote(self)
+        while lote:
+            for requisicao, contexto in lote:
+                self.test_endpoint(*requisicao, contexto=contexto)
+            transacao.concluir_lote(lote)
+            lote = transacao.proximo_lote(self)
+        self.registrar_transacao(transacao, time.perf_counter() - inicio)
+
+    def registrar_transacao(self, transacao: TransacaoPedido, duracao: float):
+        metricas = self.metricas_atuais()
+        metricas.registrar_transacao(TRANSACAO_PEDIDO, transacao.resultado, duracao)
+        for etapa, (resultado, duracao_etapa) in transacao.etapas.items():
+            metricas.registrar_transacao(f"{TRANSACAO_PEDIDO}/{etapa}", resultado, duracao_etapa)
+        log.info("Pedido %s: transação concluída com resultado %s em %.3fs", transacao.nro_pedido, transacao.resultado, duracao)
+
+    def executar_selecao(self, selecao) -> str:
+        """Executa a requisição ou a transação sorteada pelo cenário e retorna o nome usado na pausa"""
+        if isinstance(selecao, TransacaoPedido):
+            self.executar_transacao(selecao)
+            return TRANSACAO_PEDIDO
+        self.test_endpoint(*selecao)
+        return selecao[4]
+
+    def metricas_atuais(self) -> Metricas:
+        """Métricas onde a thread corrente deve registrar (as da thread, dentro de run_concurrent_tests)"""
+        return getattr(self._local, 'metricas', self.metricas)
+
+    def processar_resposta(self, endpoint: str, status_code: int, texto: str, data: Dict[str, Any] = None, params: Dict[str, Any] = None, template: str = None) -> Tuple[str, Optional[int]]:
+        """
+        Classifica a resposta de um endpoint e atualiza os resultados e o estado dos pedidos.
+
+        Compartilhado pelos motores síncrono e assíncrono. Retorna o resultado
+        (SUCESSO, ERRO_ESPERADO ou ERRO) e, para um pedido recém-criado, o seu
+        número (None nas demais respostas). As respostas de erro são comparadas com
+        as regras de erros esperados (classificacao.Classificador) pelo template
+        do endpoint; texto traz só o início do corpo delas (LIMITE_CORPO bytes).
+        """
+        if status_code not in STATUS_SUCESSO:
+            regra = self.classificador.classificar(template or template_endpoint(endpoint), status_code, texto)
+            if regra:
+                # Erro esperado: informação, não falha da API
+                self.results['expected_errors'] += 1
+                mensagem = regra.descrever(data, params)
+                log.info("Informação: %s", mensagem)
                 self.results['success_responses'].append(mensagem)
-                return True, response_time
+                return ERRO_ESPERADO, None
+            self.results['errors'] += 1
+            log.warning("Erro no endpoint %s: %s", endpoint, status_code)
+            log.debug("Resposta do endpoint %s (até %d bytes): %s", endpoint, LIMITE_CORPO, texto)
+            return ERRO, None
+
+        self.results['success'] += 1
+        nro_pedido_criado = None
+        # Armazena o conteúdo da resposta de sucesso
+        try:
+            response_json = json.loads(texto)
+            self.results['success_responses'].append(response_json)
+            
+            # Se for uma resposta de criação de pedido, armazena o número do pedido
+            if endpoint == '/Pedido/Criar' and isinstance(response_json, dict) and 'pedidoNumero' in response_json:
+                nro_pedido_criado = response_json['pedidoNumero']
+                self.adicionar_pedido_criado(nro_pedido_criado)
                 
-            # Tratamento especial para erro de cliente alterado ao fechar pedido
-            if endpoint == '/EditaItemPedido/fecharPedido' and response.status_code == 400:
-                # Verifica se a mensagem de erro contém "Código do Cliente foi alterado"
-                try:
-                    response_json = response.json()
-                    if isinstance(response_json, dict) and 'errorMessage' in response_json and 'Código do Cliente foi alterado' in response_json['errorMessage']:
-                        self.results['success'] += 1
-                        nro_pedido = data.get('nroPedido', 'desconhecido') if data else 'desconhecido'
-                        mensagem = f"Pedido {nro_pedido} não pode ser fechado (cliente foi alterado por outro usuário)"
-                        print(f"Informação: {mensagem}")
-                        self.results['success_responses'].append(mensagem)
-                        return True, response_time
-                except Exception:
-                    pass
-                    
-            # Tratamento especial para erro de cliente alterado ao alterar quantidade
-            if endpoint == '/EditaItemPedido/alterarQuantidade' and response.status_code == 500:
-                # Verifica se a mensagem de erro contém "Código do Cliente foi alterado"
-                try:
-                    error_text = response.text
-                    if 'Código do Cliente foi alterado por outro usuário' in error_text:
-                        self.results['success'] += 1
-                        nro_pedido = data.get('nroPedido', 'desconhecido') if data else 'desconhecido'
-                        mensagem = f"Pedido {nro_pedido} não pode ter quantidade alterada (cliente foi alterado por outro usuário)"
-                        print(f"Informação: {mensagem}")
-                        self.results['success_responses'].append(mensagem)
-                        return True, response_time
-                except Exception:
-                    pass
-        
-            if response.status_code in [200, 201, 204]:
-                self.results['success'] += 1
-                # Armazena o conteúdo da resposta de sucesso
-                try:
-                    response_json = response.json()
-                    self.results['success_responses'].append(response_json)
+                # Armazenar o cliente associado a este pedido
+                if isinstance(data, dict) and 'CodCliente' in data:
+                    try:
+                        self.associar_cliente_ao_pedido(nro_pedido_criado, data['CodCliente'])
+                        log.info("Cliente %s associado ao pedido %s", data['CodCliente'], nro_pedido_criado)
+                    except Exception as e:
+                        log.error("Erro ao salvar pedidos_clientes: %s", e)
+                if self.max_pedidos:
+                    self.estado.retirar_antigos(self.max_pedidos)
+
+            # Se for uma resposta de alteração de quantidade, armazena o item no pedido
+            if endpoint == '/EditaItemPedido/alterarQuantidade' and isinstance(data, dict):
+                if 'nroPedido' in data and 'codProduto' in data:
+                    log.debug("Adicionando produto %s ao pedido %s", data['codProduto'], data['nroPedido'])
+                    self.adicionar_item_ao_pedido(data['nroPedido'], data['codProduto'])
                     
-                    # Se for uma resposta de criação de pedido, armazena o número do pedido
-                    if endpoint == '/Pedido/Criar' and isinstance(response_json, dict) and 'pedidoNumero' in response_json:
-                        nro_pedido_criado = response_json['pedidoNumero']
-                        self.adicionar_pedido_criado(nro_pedido_criado)
-                        
-                        # Armazenar o cliente associado a este pedido
-                        if isinstance(data, dict) and 'CodCliente' in data:
-                            # Atualiza o dicionário pedidos_clientes
-                            self.pedidos_clientes[nro_pedido_criado] = data['CodCliente']
-                            
-                            # Salvar pedidos_clientes em um arquivo
-                            try:
-                                self.salvar_pedidos_clientes()
-                                print(f"Cliente {data['CodCliente']} associado ao pedido {nro_pedido_criado}")
-                            except Exception as e:
-                                print(f"Erro ao salvar pedidos_clientes: {str(e)}")
-                        
-                        # Inicializa o contador de itens adicionados
-                        itens_adicionados = 0
-                        
-                        # Adicionar entre 1 e 5 itens aleatórios ao pedido (menos para não sobrecarregar)
-                        num_itens = random.randint(1, 5)
-                        
-                        for i in range(num_itens):
-                            # Selecionar um produto aleatório
-                            cod_produto_aleatorio = random.choice(self.codigos_produto)
-                            qtd_vendida_aleatoria = random.randint(1, 500)
-                            desconto_individual_aleatorio = round(random.uniform(1.0, 20.0), 2)
-                            
-                            # Dados para adicionar o item ao pedido
-                            item_data = {
-                                'nroPedido': nro_pedido_criado,
-                                'codCliente': data['CodCliente'],
-                                'codProduto': cod_produto_aleatorio,
-                                'qtdVendida': qtd_vendida_aleatoria,
-                                'descontoIndividual': desconto_individual_aleatorio,
-                                'tabelaPreco': 1,
-                                'codCondPagamento': data['CodCondPagamento'],
-                                'codTransportadora': data['CodTransportadora'],
-                                'tipoOperacao': 1
-                            }
-                            
-                            # Adicionar o item ao pedido
-                            item_success, _ = self.test_endpoint('/EditaItemPedido/alterarQuantidade', 'POST', item_data, None)
-                            
-                            # Se o item foi adicionado com sucesso, incrementar o contador
-                            if item_success:
-                                itens_adicionados += 1
-                        
-                        print(f"Adicionados {itens_adicionados} itens ao pedido {nro_pedido_criado}")
-                    # Se for uma resposta de alteração de quantidade, armazena o item no pedido
-                    if endpoint == '/EditaItemPedido/alterarQuantidade' and isinstance(data, dict):
-                        if 'nroPedido' in data and 'codProduto' in data:
-                            print(f"Adicionando produto {data['codProduto']} ao pedido {data['nroPedido']}")
-                            self.adicionar_item_ao_pedido(data['nroPedido'], data['codProduto'])
-                            
-                    # Se for uma resposta de exclusão de item, remove o item do pedido
-                    if endpoint == '/EditaItemPedido/excluirItem' and isinstance(params, dict):
-                        if 'nroPedido' in params and 'codigo' in params:
-                            self.remover_item_do_pedido(params['nroPedido'], params['codigo'])
-                        
-                    print(f"Resposta de sucesso do endpoint {endpoint}: {response.text}")
-                except Exception as e:
-                    self.results['success_responses'].append(response.text)
-                    print(f"Erro ao processar resposta: {str(e)}")
-                return True, response_time
-            else:
-                self.results['errors'] += 1
-                print(f"Erro no endpoint {endpoint}: {response.status_code}")
-                print(f"Resposta: {response.text}")
-                return False, response_time
+            # Se for uma resposta de exclusão de item, remove o item do pedido
+            if endpoint == '/EditaItemPedido/excluirItem' and isinstance(params, dict):
+                if 'nroPedido' in params and 'codigo' in params:
+                    self.remover_item_do_pedido(params['nroPedido'], params['codigo'])
 
+            # No modo soak, o pedido fechado sai do estado em memória e fica marcado no banco
+            if endpoint == '/EditaItemPedido/fecharPedido' and self.max_pedidos and isinstance(data, dict) and 'nroPedido' in data:
+                self.estado.fechar_pedido(data['nroPedido'])
+                
+            log.debug("Resposta de sucesso do endpoint %s: %s", endpoint, texto)
         except Exception as e:
-            self.results['errors'] += 1
-            print(f"Exceção no endpoint {endpoint}: {str(e)}")
-            return False, time.time() - start_time
+            self.results['success_responses'].append(texto)
+            log.error("Erro ao processar resposta do endpoint %s: %s", endpoint, e)
+        return SUCESSO, nro_pedido_criado
 
     def run_concurrent_tests(self, endpoint: str, method: str = 'GET', data: Dict[str, Any] = None, params: Dict[str, Any] = None, num_requests: int = 10):
         """
         Executa testes concorrentes em um endpoint
         """
+        metricas_threads = []
+
+        def executar():
+            # Cada thread registra nas suas próprias métricas, sem disputar as do tester
+            if not hasattr(self._local, 'metricas'):
+                self._local.metricas = Metricas()
+                metricas_threads.append(self._local.metricas)
+            return self.test_endpoint(endpoint, method, data, params)
+
         with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
             futures = [
-                executor.submit(self.test_endpoint, endpoint, method, data, params)
+                executor.submit(executar)
                 for _ in range(num_requests)
             ]
             
             for future in concurrent.futures.as_completed(futures):
                 success, response_time = future.result()
                 if success:
-                    print(f"Requisição bem-sucedida em {response_time:.2f} segundos")
+                    log.debug("Requisição bem-sucedida em %.2f segundos", response_time)
                 else:
-                    print("Requisição falhou")
+                    log.debug("Requisição falhou")
+
+        for metricas in metricas_threads:
+            self.metricas.mesclar(metricas)
+
+    def mesclar_parcial(self, parcial: Dict[str, Any], worker_id: int = None):
+        """Soma aos resultados os contadores e histogramas enviados por um worker e guarda as suas medidas"""
+        self.results['success'] += parcial['success']
+        self.results['errors'] += parcial['errors']
+        self.results['expected_errors'] += parcial['expected_errors']
+        self.results['nao_enviadas'] += parcial['nao_enviadas']
+        self.results['sem_requisicao'] += parcial['sem_requisicao']
+        self.metricas.mesclar(parcial['metricas'])
+        if worker_id is not None:
+            self.medidas_workers[worker_id] = parcial['medidas']
+            self.em_andamento = sum(medidas['em_andamento'] for medidas in self.medidas_workers.values())
+
+    def medidas(self) -> Dict[str, Any]:
+        """Medidas instantâneas do gerador neste processo (enviadas pelos workers nas parciais)"""
+        return {
+            'instante': time.monotonic(),
+            'em_andamento': self.em_andamento,
+            'pedidos': len(self.estado),
+            'cpu': time.process_time(),
+            'atraso_laco': self.atraso_laco,
+            'fila_log': tamanho_fila_log()
+        }
+
+    def pedidos_rastreados(self) -> int:
+        """Pedidos no estado dos geradores (no coordenador, a soma das partições dos workers)"""
+        if self.medidas_workers:
+            return sum(medidas['pedidos'] for medidas in self.medidas_workers.values())
+        return len(self.estado)
 
     def print_results(self):
         """
         Imprime os resultados dos testes
         """
-        total_requests = self.results['success'] + self.results['errors']
-        avg_response_time = sum(self.results['response_times']) / len(self.results['response_times']) if self.results['response_times'] else 0
+        total_requests = self.results['success'] + self.results['errors'] + self.results['expected_errors']
+        avg_response_time = self.metricas.combinado().media()
+        duracao = self.metricas.duracao()
         
         print("\n=== Resultados dos Testes ===")
         print(f"Total de requisições: {total_requests}")
         print(f"Sucessos: {self.results['success']}")
         print(f"Erros: {self.results['errors']}")
+        print(f"Erros esperados: {self.results['expected_errors']}")
         print(f"Tempo médio de resposta: {avg_response_time:.2f} segundos")
-        print(f"Taxa de sucesso: {(self.results['success']/total_requests)*100:.2f}%")
+        if total_requests:
+            print(f"Taxa de sucesso: {(self.results['success']/total_requests)*100:.2f}%")
+        if duracao > 0:
+            print(f"Vazão: {total_requests/duracao:.1f} req/s")
+        atraso = self.metricas.atraso_envio
+        if atraso.total:
+            print(f"Atraso de envio do agendador: p50 {atraso.percentil(50) * 1000:.1f} ms, "
+                  f"p99 {atraso.percentil(99) * 1000:.1f} ms, máx {atraso.maximo * 1000:.1f} ms")
+        if self.results['nao_enviadas']:
+            print(f"Chegadas não enviadas (gerador não acompanhou o perfil): {self.results['nao_enviadas']}")
+        if self.results['sem_requisicao']:
+            print(f"Chegadas sem requisição disponível (endpoints sorteados dependem de pedidos ou itens): "
+                  f"{self.results['sem_requisicao']}")
+
+        # Latências por endpoint (em ms), considerando todos os resultados
+        colunas = ''.join(f"{'p' + format(p, 'g'):>9}" for p in PERCENTIS_RELATORIO)
+        print(f"\n{'Endpoint':<50}{'Reqs':>8}{'req/s':>9}{'Erros':>8}{'Esper.':>8}{colunas}{'máx':>9}")
+        for endpoint in self.metricas.endpoints():
+            histograma = self.metricas.combinado(endpoint)
+            erros = self.metricas.contagem(endpoint, ERRO)
+            esperados = self.metricas.contagem(endpoint, ERRO_ESPERADO)
+            vazao = histograma.total / duracao if duracao > 0 else 0
+            percentis = ''.join(f"{histograma.percentil(p) * 1000:>9.1f}" for p in PERCENTIS_RELATORIO)
+            print(f"{endpoint:<50}{histograma.total:>8}{vazao:>9.1f}{erros / histograma.total * 100:>7.1f}%"
+                  f"{esperados:>8}{percentis}{histograma.maximo * 1000:>9.1f}")
+
+        # Fases das requisições (em ms): p50/p99 de cada fase medida
+        fases = [fase for fase in FASES if any(f == fase for _, f in self.metricas.fases)]
+        if fases:
+            print(f"\nFases por endpoint, p50/p99 em ms (conexao inclui o handshake TLS)")
+            print(f"{'Endpoint':<50}" + ''.join(f"{fase:>15}" for fase in fases))
+            for endpoint in self.metricas.endpoints():
+                celulas = []
+                for fase in fases:
+                    histograma = self.metricas.fase(endpoint, fase)
+                    celula = f"{histograma.percentil(50) * 1000:.1f}/{histograma.percentil(99) * 1000:.1f}" if histograma.total else '-'
+                    celulas.append(f"{celula:>15}")
+                print(f"{endpoint:<50}" + ''.join(celulas))
+
+        # Transações do ciclo do pedido (em ms): a transação inteira e cada etapa
+        if self.metricas.transacoes:
+            print(f"\nTransações (pedido criado e fechado) e suas etapas, em ms")
+            print(f"{'Transação':<50}{'Qtde':>8}{'Erros':>8}{'Esper.':>8}{colunas}{'máx':>9}")
+            nomes = self.metricas.nomes_transacoes()
+            ordem = [TRANSACAO_PEDIDO] + [f"{TRANSACAO_PEDIDO}/{etapa}" for etapa in ETAPAS_CICLO]
+            for nome in sorted(nomes, key=lambda n: ordem.index(n) if n in ordem else len(ordem)):
+                histograma = self.metricas.transacao(nome)
+                erros = self.metricas.transacao(nome, (ERRO,)).total
+                esperados = self.metricas.transacao(nome, (ERRO_ESPERADO,)).total
+                percentis = ''.join(f"{histograma.percentil(p) * 1000:>9.1f}" for p in PERCENTIS_RELATORIO)
+                print(f"{nome:<50}{histograma.total:>8}{erros / histograma.total * 100:>7.1f}%"
+                      f"{esperados:>8}{percentis}{histograma.maximo * 1000:>9.1f}")
+
+class AsyncAPITester(APITester):
+    """
+    Motor assíncrono sobre um cliente HTTP não bloqueante (aiohttp).
+
+    Roda em modelo fechado (N usuários virtuais independentes, cada um com seu
+    próprio laço de seleção de endpoints) ou em modelo aberto (requisições
+    disparadas numa taxa alvo, independentemente do tempo de resposta). Todas
+    as requisições compartilham uma única sessão, cujo pool de conexões é
+    limitado por MAX_CONCURRENT_REQUESTS.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.client_session = None
+
+    async def test_endpoint_async(self, endpoint: str, method: str = 'GET', data: Dict[str, Any] = None, params: Dict[str, Any] = None, template: str = None, inicio_previsto: float = None, contexto: Dict[str, Any] = None) -> tuple[bool, float]:
+        """
+        Testa um endpoint específico sem bloquear o laço de eventos
+
+        Com inicio_previsto (modelo aberto, no relógio time.perf_counter), a
+        latência é medida a partir do instante em que a requisição deveria ter
+        sido enviada, corrigindo a omissão coordenada quando o gerador atrasa
+        os envios. As fases da requisição são marcadas pelo rastreamento da
+        sessão (criar_rastreamento_fases). contexto funciona como em test_endpoint.
+        """
+        template = template or template_endpoint(endpoint)
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        start_time = inicio_previsto if inicio_previsto is not None else time.perf_counter()
+        marcos = {}
+
+        try:
+            if method not in ('GET', 'POST', 'PUT', 'DELETE'):
+                raise ValueError(f"Método {method} não suportado")
+            # Mantém a mesma semântica do motor síncrono: PUT não envia params
+            if method == 'PUT':
+                params = None
+            json_data = data if method in ('POST', 'PUT') else None
+
+            self.em_andamento += 1
+            try:
+                async with self.client_session.request(method, url, json=json_data, params=_params_http(params),
+                                                       trace_request_ctx=marcos) as response:
+                    status_code = response.status
+                    if status_code in STATUS_SUCESSO:
+                        texto = await response.text()
+                    else:
+                        texto = await ler_inicio_corpo_async(response)
+            finally:
+                self.em_andamento -= 1
+
+            marcos['fim'] = time.perf_counter()
+            response_time = marcos['fim'] - start_time
+
+            resultado, nro_pedido_criado = self.processar_resposta(endpoint, status_code, texto, data, params, template)
+            self.metricas.registrar(template, resultado, response_time)
+            self.metricas.registrar_fases(template, fases_requisicao(marcos))
+            anotar_contexto(contexto, resultado, nro_pedido_criado)
+            if self.gravador:
+                self.gravador.registrar(start_time, method, endpoint, template, data, params, nro_pedido_criado)
+
+            return resultado != ERRO, response_time
+
+        except Exception as e:
+            response_time = time.perf_counter() - start_time
+            self.results['errors'] += 1
+            self.metricas.registrar(template, ERRO, response_time)
+            anotar_contexto(contexto, ERRO)
+            if self.gravador:
+                self.gravador.registrar(start_time, method, endpoint, template, data, params)
+            log.error("Exceção no endpoint %s: %s", endpoint, e)
+            return False, response_time
+
+    async def executar_transacao_async(self, transacao: TransacaoPedido, inicio_previsto: float = None):
+        """
+        Executa as etapas de uma transação do cenário; as requisições de cada lote saem juntas.
+
+        Com inicio_previsto (modelo aberto), a transação e a sua primeira
+        requisição são medidas a partir do instante previsto.
+        """
+        inicio = inicio_previsto if inicio_previsto is not None else time.perf_counter()
+        lote = transacao.proximo_lote(self)
+        while lote:
+            await asyncio.gather(*(self.test_endpoint_async(*requisicao, inicio_previsto=inicio_previsto, contexto=contexto)
+                                   for requisicao, contexto in lote))
+            inicio_previsto = None
+            transacao.concluir_lote(lote)
+            lote = transacao.proximo_lote(self)
+        self.registrar_transacao(transacao, time.perf_counter() - inicio)
+
+    async def executar_selecao_async(self, selecao, inicio_previsto: float = None) -> str:
+        """Versão assíncrona de executar_selecao"""
+        if isinstance(selecao, TransacaoPedido):
+            await self.executar_transacao_async(selecao, inicio_previsto)
+            return TRANSACAO_PEDIDO
+        await self.test_endpoint_async(*selecao, inicio_previsto=inicio_previsto)
+        return selecao[4]
+
+    async def virtual_user(self, cenario: Cenario, fim: float):
+        """Laço de um usuário virtual: sorteia e executa requisições até o fim do teste"""
+        loop = asyncio.get_running_loop()
+        while loop.time() < fim:
+            requisicao = cenario.selecionar(self)
+            if requisicao is None:
+                # Cede o laço para não monopolizá-lo enquanto não há pedidos
+                await asyncio.sleep(0)
+                continue
+            nome = await self.executar_selecao_async(requisicao)
+            pausa = cenario.pausa(nome)
+            if pausa:
+                await asyncio.sleep(pausa)
+
+    async def run_virtual_users(self, cenario: Cenario, num_usuarios: int, duracao: float):
+        """
+        Executa num_usuarios usuários virtuais concorrentes durante duracao segundos
+        """
+        async with self.abrir_sessao():
+            loop = asyncio.get_running_loop()
+            fim = loop.time() + duracao
+            usuarios = [asyncio.create_task(self.virtual_user(cenario, fim)) for _ in range(num_usuarios)]
+            await asyncio.gather(*usuarios)
+
+    async def _chegada(self, cenario: Cenario, inicio_previsto: float, limite: asyncio.Semaphore):
+        """Executa uma requisição do modelo aberto e libera a vaga de requisição em andamento"""
+        try:
+            self.metricas.atraso_envio.registrar(max(0.0, time.perf_counter() - inicio_previsto))
+            # Endpoints que dependem de pedidos podem não estar disponíveis; tenta outro sorteio
+            for _ in range(TENTATIVAS_SELECAO):
+                requisicao = cenario.selecionar(self)
+                if requisicao is not None:
+                    await self.executar_selecao_async(requisicao, inicio_previsto)
+                    return
+            # A chegada não vira requisição, mas fica contada: a carga oferecida não é subestimada em silêncio
+            self.results['sem_requisicao'] += 1
+        finally:
+            limite.release()
+
+    async def run_open_model(self, cenario: Cenario, estagios: list, modo_chegadas: str = CHEGADAS_UNIFORMES, max_em_andamento: int = MAX_CONCURRENT_REQUESTS):
+        """
+        Dispara requisições na taxa definida pelos estágios do perfil de carga (modelo aberto)
+
+        Os envios seguem o relógio, não as respostas. Se max_em_andamento
+        requisições estiverem pendentes, o agendador espera uma vaga e as
+        requisições seguintes saem atrasadas; o atraso entra na latência medida
+        (a partir do instante previsto) e no histograma atraso_envio. Chegadas
+        que ainda não saíram quando o perfil termina não são enviadas e ficam
+        contadas em results['nao_enviadas'].
+        """
+        async with self.abrir_sessao():
+            limite = asyncio.Semaphore(max_em_andamento)
+            pendentes = set()
+            inicio = time.perf_counter()
+            fim = inicio + duracao_total(estagios)
+            # Gerador próprio, derivado do global para respeitar --seed
+            programadas = chegadas(estagios, modo_chegadas, random.Random(random.getrandbits(64)))
+            for deslocamento in programadas:
+                if time.perf_counter() >= fim:
+                    # O perfil acabou: as chegadas restantes não são mais enviadas, apenas contadas
+                    self.results['nao_enviadas'] += 1 + sum(1 for _ in programadas)
+                    break
+                inicio_previsto = inicio + deslocamento
+                espera = inicio_previsto - time.perf_counter()
+                # Mesmo atrasado, cede o laço para as requisições em andamento progredirem
+                await asyncio.sleep(max(espera, 0))
+                await limite.acquire()
+                if time.perf_counter() >= fim:
+                    # O perfil acabou enquanto esperava uma vaga: esta chegada e as restantes também não saem
+                    limite.release()
+                    self.results['nao_enviadas'] += 1 + sum(1 for _ in programadas)
+                    break
+                tarefa = asyncio.create_task(self._chegada(cenario, inicio_previsto, limite))
+                pendentes.add(tarefa)
+                tarefa.add_done_callback(pendentes.discard)
+            # Respeita estágios finais sem carga (ex.: 30s@0) antes de encerrar
+            await asyncio.sleep(max(fim - time.perf_counter(), 0))
+            if pendentes:
+                await asyncio.gather(*pendentes)
+
+    async def executar(self, cenario: Cenario, opcoes: Dict[str, Any], painel: Painel = None):
+        """Executa a carga descrita em opcoes no modelo aberto (se houver perfil) ou fechado"""
+        atualizador = asyncio.create_task(self.atualizar_painel(painel)) if painel else None
+        try:
+            if opcoes.get('perfil'):
+                await self.run_open_model(cenario, opcoes['perfil'], opcoes['chegadas'], opcoes['max_em_andamento'])
+            else:
+                await self.run_virtual_users(cenario, opcoes['usuarios'], opcoes['duracao'])
+        finally:
+            if atualizador:
+                atualizador.cancel()
+
+    async def atualizar_painel(self, painel: Painel):
+        """Redesenha o painel a cada intervalo, no próprio laço de eventos que registra as métricas"""
+        while True:
+            previsto = time.perf_counter() + painel.intervalo
+            await asyncio.sleep(painel.intervalo)
+            self.atraso_laco = max(0.0, time.perf_counter() - previsto)
+            painel.mostrar(self)
+
+    @contextlib.asynccontextmanager
+    async def abrir_sessao(self):
+        """
+        Abre a sessão aiohttp compartilhada pelas requisições do motor
+
+        Se já houver uma sessão aberta (ex.: a busca de capacidade executa vários
+        degraus na mesma sessão), ela é reutilizada e continua aberta.
+        """
+        if self.client_session is not None:
+            yield self.client_session
+            return
+        connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT_REQUESTS, limit_per_host=0, ttl_dns_cache=300)
+        async with aiohttp.ClientSession(connector=connector, trace_configs=[criar_rastreamento_fases()]) as session:
+            self.client_session = session
+            try:
+                yield session
+            finally:
+                self.client_session = None
+
+def anotar_contexto(contexto: Dict[str, Any], resultado: str, nro_pedido_criado=None):
+    """Preenche o contexto de uma requisição de transação com o resultado e o pedido criado"""
+    if contexto is not None:
+        contexto['resultado'] = resultado
+        if nro_pedido_criado is not None:
+            contexto['pedido'] = nro_pedido_criado
+
+def ler_inicio_corpo(response: requests.Response) -> str:
+    """Lê só os primeiros LIMITE_CORPO bytes do corpo (resposta com stream=True) e libera a resposta"""
+    try:
+        inicio = response.raw.read(LIMITE_CORPO, decode_content=True) or b''
+    finally:
+        response.close()
+    return inicio.decode(response.encoding or 'utf-8', errors='replace')
+
+async def ler_inicio_corpo_async(response: aiohttp.ClientResponse) -> str:
+    """Lê só os primeiros LIMITE_CORPO bytes do corpo; com o corpo incompleto, a conexão não volta ao pool"""
+    inicio = b''
+    while len(inicio) < LIMITE_CORPO:
+        bloco = await response.content.read(LIMITE_CORPO - len(inicio))
+        if not bloco:
+            break
+        inicio += bloco
+    return inicio.decode(response.charset or 'utf-8', errors='replace')
+
+def _params_http(params: Dict[str, Any]):
+    """Converte os parâmetros de query para str, como o requests faz implicitamente"""
+    if not params:
+        return None
+    return {chave: str(valor) for chave, valor in params.items() if valor is not None}
+
+def criar_rastreamento_fases() -> aiohttp.TraceConfig:
+    """
+    Rastreamento que anota em trace_request_ctx (um dicionário por requisição)
+    o instante, em time.perf_counter, de cada marco da requisição.
+
+    O aiohttp não separa o handshake TLS da conexão TCP: os dois ficam no
+    intervalo conexao_inicio..conexao_fim.
+    """
+    def marcar(*nomes):
+        async def callback(session, contexto, params):
+            marcos = contexto.trace_request_ctx
+            if marcos is not None:
+                agora = time.perf_counter()
+                for nome in nomes:
+                    marcos[nome] = agora
+        return callback
+
+    rastreamento = aiohttp.TraceConfig()
+    rastreamento.on_request_start.append(marcar('inicio'))
+    rastreamento.on_connection_queued_start.append(marcar('fila_inicio'))
+    rastreamento.on_connection_queued_end.append(marcar('fila_fim'))
+    rastreamento.on_connection_create_start.append(marcar('conexao_inicio'))
+    rastreamento.on_dns_resolvehost_start.append(marcar('dns_inicio'))
+    rastreamento.on_dns_resolvehost_end.append(marcar('dns_fim'))
+    rastreamento.on_connection_create_end.append(marcar('conexao_fim', 'conectado'))
+    rastreamento.on_connection_reuseconn.append(marcar('conectado'))
+    # O último cabeçalho ou pedaço do corpo enviado marca o fim do envio
+    rastreamento.on_request_headers_sent.append(marcar('enviado'))
+    rastreamento.on_request_chunk_sent.append(marcar('enviado'))
+    rastreamento.on_request_end.append(marcar('primeiro_byte'))
+    return rastreamento
+
+def fases_requisicao(marcos: Dict[str, float]) -> Dict[str, float]:
+    """Converte os marcos anotados por criar_rastreamento_fases (e 'fim') nas durações de FASES"""
+    fases = {}
+    if 'fila_fim' in marcos:
+        fases['fila'] = marcos['fila_fim'] - marcos['fila_inicio']
+    dns = marcos['dns_fim'] - marcos['dns_inicio'] if 'dns_fim' in marcos else 0.0
+    if 'dns_fim' in marcos:
+        fases['dns'] = dns
+    if 'conexao_fim' in marcos:
+        fases['conexao'] = marcos['conexao_fim'] - marcos['conexao_inicio'] - dns
+    if 'enviado' in marcos:
+        fases['envio'] = marcos['enviado'] - marcos.get('conectado', marcos['inicio'])
+        if 'primeiro_byte' in marcos:
+            fases['espera'] = marcos['primeiro_byte'] - marcos['enviado']
+    if 'primeiro_byte' in marcos:
+        fases['download'] = marcos['fim'] - marcos['primeiro_byte']
+    return fases
+
+# Endpoints com parâmetro no caminho: prefixo -> template usado nas métricas
+TEMPLATES_PARAMETRIZADOS = {
+    '/Pedido/listarPedidosAbertos/': '/Pedido/listarPedidosAbertos/{codRepresentante}',
+    '/EditaItemPedido/recuperarObservacao/': '/EditaItemPedido/recuperarObservacao/{nroPedido}'
+}
+
+def template_endpoint(endpoint: str) -> str:
+    """Substitui o parâmetro do caminho pelo nome do placeholder, para agrupar as métricas"""
+    for prefixo, template in TEMPLATES_PARAMETRIZADOS.items():
+        if endpoint.startswith(prefixo):
+            return template
+    return endpoint
 
 def carregar_codigos_produto():
     """Função que carrega códigos de produto de um arquivo"""
@@ -371,7 +787,7 @@ def carregar_codigos_produto():
             # Retorna alguns códigos padrão caso o arquivo não exista
             return ['000001', '000002', '000003', '000004', '000005', '000006', '000007', '000008', '000009', '000010']
     except Exception as e:
-        print(f"Erro ao carregar códigos de produto: {str(e)}")
+        log.error("Erro ao carregar códigos de produto: %s", e)
         return ['000001', '000002', '000003', '000004', '000005']
 
 def carregar_cod_representantes():
@@ -402,160 +818,458 @@ def carregar_cod_transportadoras():
         1, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40, 41, 42, 43, 44, 45, 46, 48, 49, 50, 51, 52, 53, 54, 55, 56, 57, 58, 59, 60, 61, 62, 63, 64, 65, 66, 67, 68, 69, 70, 71, 72, 73, 74, 75, 76, 77, 78, 80, 82, 83, 84, 86, 87, 88, 89, 90, 91, 92, 93, 94, 95, 96, 97, 98, 99, 100, 101, 102, 103, 105, 106, 107, 108
     ]
 
-def main():
-    tester = APITester()
-    cod_representantes = carregar_cod_representantes()
-    cod_clientes = carregar_cod_clientes()
-    nro_pedidos = carregar_nro_pedidos()
-    cod_cond_pagamento = carregar_cod_cond_pagamento()
-    cod_transportadoras = carregar_cod_transportadoras()
-    
-    # Remova estas linhas se existirem:
-    # pedidos_clientes = {}
-    
-    # Remova o carregamento de pedidos_clientes aqui, pois já está na classe
+def carregar_referencias():
+    """Listas fixas de dados de referência usadas para montar as requisições (sem acesso à API)"""
+    return {
+        'representantes': carregar_cod_representantes(),
+        'clientes': carregar_cod_clientes(),
+        'cond_pagamento': carregar_cod_cond_pagamento(),
+        'transportadoras': carregar_cod_transportadoras(),
+        'produtos': carregar_codigos_produto()
+    }
+
+def carregar_cenario_padrao(cenario, referencias: Dict[str, list] = None) -> Cenario:
+    """
+    Compila o cenário com as listas de referência (padrão: carregar_referencias) e os pools de textos deste módulo
+
+    cenario é o caminho do arquivo ou a definição já lida (ex.: recebida do controlador no modo distribuído).
+    """
+    referencias = referencias or carregar_referencias()
+    if isinstance(cenario, dict):
+        return Cenario(cenario, referencias, textos)
+    return carregar_cenario(cenario, referencias, textos)
+
+def particionar(lista: list, worker_id: int, num_workers: int) -> list:
+    """Fatia disjunta da lista para o worker (a lista inteira, se ela tiver menos itens que workers)"""
+    return lista[worker_id::num_workers] if len(lista) >= num_workers else lista
+
+def executar_worker(worker_id: int, num_workers: int, opcoes: Dict[str, Any], fila):
+    """
+    Processo worker: roda um motor assíncrono próprio e envia parciais ao coordenador.
+
+    Usa só a sua partição dos pedidos (nro_pedido % num_workers) e dos
+    clientes. A cada segundo envia os contadores e histogramas acumulados
+    desde o envio anterior; ao terminar envia o último parcial.
+
+    No modo distribuído, opcoes também traz a API_BASE_URL do controlador e o
+    instante (time.time) combinado para o início da carga.
+    """
+    # Processos criados por fork herdam o estado do gerador aleatório do pai
+    random.seed(opcoes['semente'] + worker_id if opcoes.get('semente') is not None else None)
+    semear_faker(random.getrandbits(64))
+    # ... e os manipuladores de log, mas não a thread que grava o arquivo
+    configurar_registro(arquivo_worker(opcoes['log_arquivo'], worker_id), opcoes['log_nivel'], opcoes['log_fila'])
+
+    tester = AsyncAPITester()
+    if opcoes.get('api_base_url'):
+        tester.base_url = opcoes['api_base_url'].rstrip('/')
+    tester.restringir_particao(worker_id, num_workers)
+    tester.max_pedidos = opcoes.get('max_pedidos')
+    # Referências resolvidas pelo coordenador (ver obter_referencias), para todos usarem as mesmas listas
+    referencias = dict(opcoes.get('referencias') or carregar_referencias())
+    referencias['clientes'] = particionar(referencias['clientes'], worker_id, num_workers)
+    cenario = carregar_cenario_padrao(opcoes['cenario'], referencias)
+    if opcoes.get('inicio'):
+        time.sleep(max(0.0, opcoes['inicio'] - time.time()))
+        tester.metricas.inicio = time.time()
+    enviados = {'success': 0, 'errors': 0, 'expected_errors': 0, 'nao_enviadas': 0, 'sem_requisicao': 0}
+
+    def extrair_parcial():
+        parcial = {contador: tester.results[contador] - enviados[contador] for contador in enviados}
+        parcial['metricas'] = tester.metricas.extrair()
+        parcial['medidas'] = tester.medidas()
+        for contador in enviados:
+            enviados[contador] = tester.results[contador]
+        return parcial
+
+    async def reportar():
+        while True:
+            previsto = time.perf_counter() + 1
+            await asyncio.sleep(1)
+            tester.atraso_laco = max(0.0, time.perf_counter() - previsto)
+            fila.put({'tipo': 'parcial', 'worker': worker_id, 'parcial': extrair_parcial()})
+
+    async def executar():
+        reporter = asyncio.create_task(reportar())
+        try:
+            await tester.executar(cenario, opcoes)
+        finally:
+            reporter.cancel()
+
+    perfilador = Perfilador(arquivo_worker(opcoes['perfilar'], worker_id)) if opcoes.get('perfilar') else contextlib.nullcontext()
+    try:
+        with perfilador:
+            asyncio.run(executar())
+    finally:
+        tester.fechar()
+        fila.put({'tipo': 'fim', 'worker': worker_id, 'parcial': extrair_parcial()})
+        parar_registro()
+
+def opcoes_worker(opcoes: Dict[str, Any], worker_id: int, num_workers: int) -> Dict[str, Any]:
+    """Fatia da carga de um worker: parte dos usuários, da taxa de chegada e do limite de requisições em andamento"""
+    def fatia(total):
+        # Distribui o resto da divisão entre os primeiros workers
+        return total // num_workers + (1 if worker_id < total % num_workers else 0)
+
+    fatiadas = dict(opcoes)
+    fatiadas['usuarios'] = fatia(opcoes['usuarios'])
+    fatiadas['max_em_andamento'] = max(1, fatia(opcoes['max_em_andamento']))
+    if opcoes.get('perfil'):
+        fatiadas['perfil'] = escalar_perfil(opcoes['perfil'], 1 / num_workers)
+    return fatiadas
+
+def executar_multiprocesso(num_workers: int, opcoes: Dict[str, Any], painel: Painel = None, coordenador: APITester = None) -> APITester:
+    """
+    Coordenador: distribui a carga entre num_workers processos e mescla os resultados.
+
+    Cada worker grava diretamente no banco de estado compartilhado e no seu
+    próprio arquivo de log. Retorna um APITester (o coordenador, se informado)
+    com os resultados de todos os workers.
+    """
+    coordenador = coordenador or APITester()
+    fila = multiprocessing.Queue()
+    processos = []
+    for worker_id in range(num_workers):
+        processo = multiprocessing.Process(
+            target=executar_worker,
+            args=(worker_id, num_workers, opcoes_worker(opcoes, worker_id, num_workers), fila),
+            name=f"worker-{worker_id}"
+        )
+        processo.start()
+        processos.append(processo)
+
+    finalizados = set()
+    while len(finalizados) < num_workers:
+        try:
+            mensagem = fila.get(timeout=1)
+        except queue.Empty:
+            # Evita esperar para sempre por um worker que morreu sem enviar o resultado final
+            if all(not processo.is_alive() for processo in processos):
+                print(f"Aviso: {num_workers - len(finalizados)} worker(s) terminaram sem enviar resultados")
+                break
+            continue
+        coordenador.mesclar_parcial(mensagem['parcial'], mensagem['worker'])
+        if mensagem['tipo'] == 'fim':
+            finalizados.add(mensagem['worker'])
+        if painel:
+            painel.tique(coordenador)
+
+    for processo in processos:
+        processo.join()
+
+    return coordenador
+
+def executar_sincrono(tester: APITester, cenario: Cenario, duracao: float, painel: Painel = None):
+    """Motor síncrono original: um único usuário enviando uma requisição por vez"""
+    start_time = time.time()
     
+    while time.time() - start_time < duracao:
+        if painel:
+            painel.tique(tester)
+        requisicao = cenario.selecionar(tester)
+        if requisicao is None:
+            continue
+        nome = tester.executar_selecao(requisicao)
+        pausa = cenario.pausa(nome)
+        if pausa:
+            time.sleep(pausa)
+
+# Argumentos da carga guardados no ponto de controle do modo soak e restaurados por --resume
+ARGUMENTOS_SOAK = ('engine', 'workers', 'users', 'duration', 'scenario', 'load_profile', 'arrivals', 'max_in_flight', 'seed')
+
+def main():
+    parser = argparse.ArgumentParser(description="Robô de testes de carga da API SRPP")
+    parser.add_argument('--engine', choices=['async', 'sync'], default='async',
+                        help="Motor de carga: 'async' (usuários virtuais concorrentes) ou 'sync' (uma requisição por vez)")
+    parser.add_argument('--users', type=int, default=NUM_USUARIOS_SIMULTANEOS,
+                        help="Número de usuários virtuais simultâneos (padrão: NUM_USUARIOS_SIMULTANEOS)")
+    parser.add_argument('--duration', type=float, default=TEST_DURATION_SECONDS,
+                        help="Duração do teste em segundos (padrão: TEST_DURATION_SECONDS)")
+    parser.add_argument('--scenario', default=CENARIO,
+                        help="Arquivo de cenário com endpoints, pesos e geradores de payload (padrão: CENARIO ou cenario.json)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Número de processos geradores de carga (motor assíncrono); a carga é dividida entre eles")
+    parser.add_argument('--load-profile', default=PERFIL_CARGA,
+                        help="Perfil de carga em modelo aberto, ex.: '30s@50rps, 120s@200rps, 30s@0' ou '60s@10->200rps' "
+                             "(padrão: PERFIL_CARGA); substitui --users e --duration")
+    parser.add_argument('--arrivals', choices=[CHEGADAS_UNIFORMES, CHEGADAS_POISSON], default=CHEGADAS_UNIFORMES,
+                        help="Distribuição das chegadas no modelo aberto")
+    parser.add_argument('--max-in-flight', type=int, default=MAX_CONCURRENT_REQUESTS,
+                        help="Máximo de requisições em andamento no modelo aberto (padrão: MAX_CONCURRENT_REQUESTS)")
+    parser.add_argument('--log-file', default=LOG_ARQUIVO,
+                        help="Arquivo de log das requisições, '-' para stderr (padrão: LOG_ARQUIVO ou api_tester.log)")
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default=LOG_NIVEL.upper(),
+                        help="Nível do log; DEBUG inclui o corpo das respostas (padrão: LOG_NIVEL ou INFO)")
+    parser.add_argument('--no-dashboard', action='store_true',
+                        help="Não exibe o painel atualizado a cada segundo durante o teste")
+    parser.add_argument('--seed', type=int, default=SEMENTE,
+                        help="Semente dos geradores aleatórios, para repetir os mesmos payloads (padrão: SEMENTE)")
+    parser.add_argument('--export', default=EXPORTAR,
+                        help="Grava a cada segundo vazão, erros e p50/p95/p99 por endpoint neste arquivo (.jsonl ou .csv) "
+                             "e, ao final, o resumo .resumo.json usado pelo comparar.py (padrão: EXPORTAR)")
+    parser.add_argument('--export-parquet', action='store_true',
+                        help="Ao final, converte também a série de --export para Parquet (requer pyarrow)")
+    parser.add_argument('--find-capacity', action='store_true',
+                        help="Busca a capacidade da API: aumenta a carga em degraus até violar o SLO (--slo-p99, --slo-errors)")
+    parser.add_argument('--capacity-mode', choices=[MODO_TAXA, MODO_USUARIOS], default=MODO_TAXA,
+                        help="Carga aumentada a cada degrau: taxa de chegada (rate) ou usuários simultâneos (users)")
+    parser.add_argument('--capacity-start', type=float, default=10,
+                        help="Carga do primeiro degrau, em req/s ou usuários (padrão: 10)")
+    parser.add_argument('--capacity-factor', type=float, default=1.5,
+                        help="Multiplicador da carga entre degraus (padrão: 1.5)")
+    parser.add_argument('--capacity-max', type=float, default=None,
+                        help="Carga máxima da busca (padrão: sem limite)")
+    parser.add_argument('--step-window', type=float, default=5,
+                        help="Duração de cada janela de medição de um degrau, em segundos (padrão: 5)")
+    parser.add_argument('--slo-p99', type=float, default=SLO_P99,
+                        help="p99 máximo aceito, em segundos (padrão: SLO_P99 ou 2)")
+    parser.add_argument('--slo-errors', type=float, default=SLO_ERROS,
+                        help="Taxa máxima de erros aceita, em %% (padrão: SLO_ERROS ou 1)")
+    parser.add_argument('--record',
+                        help="Grava cada requisição enviada neste arquivo (JSON Lines; .gz para compactar) para --replay")
+    parser.add_argument('--replay',
+                        help="Reproduz uma gravação de --record, mapeando os pedidos gravados para os criados agora")
+    parser.add_argument('--replay-speed', type=float, default=1.0,
+                        help="Velocidade da reprodução: 1 = ritmo original, N = N vezes mais rápido, 0 = o mais rápido possível")
+    parser.add_argument('--agents', default=AGENTES,
+                        help="Agentes de carga em outras máquinas, ex.: 'host1:9100,host2:9100' (padrão: AGENTES); "
+                             "a carga é dividida entre os workers de todos eles (ver distribuido.py)")
+    parser.add_argument('--agent-token', default=AGENTES_TOKEN,
+                        help="Token enviado aos agentes (padrão: AGENTES_TOKEN)")
+    parser.add_argument('--metrics-port', type=int, default=METRICAS_PORTA,
+                        help="Atende GET /metrics (OpenMetrics/Prometheus) nesta porta local durante o teste, "
+                             "com as métricas por endpoint e a saúde do gerador (padrão: METRICAS_PORTA)")
+    parser.add_argument('--refresh-references', action='store_true',
+                        help="Busca clientes, representantes e produtos na API mesmo com o cache ainda válido")
+    parser.add_argument('--offline-references', action='store_true',
+                        help="Não busca os catálogos na API: usa as listas fixas de clientes, representantes e produtos")
+    parser.add_argument('--soak', action='store_true',
+                        help="Teste de resistência: estado dos pedidos limitado (SOAK_MAX_PEDIDOS), métricas em janelas "
+                             "de SOAK_JANELA segundos e ponto de controle a cada SOAK_INTERVALO segundos em --checkpoint")
+    parser.add_argument('--checkpoint', default=SOAK_CHECKPOINT,
+                        help="Ponto de controle do modo soak (padrão: SOAK_CHECKPOINT ou soak.checkpoint.json)")
+    parser.add_argument('--resume', metavar='CHECKPOINT',
+                        help="Retoma uma execução --soak interrompida a partir do ponto de controle, com os mesmos argumentos")
+    parser.add_argument('--profile', metavar='ARQUIVO',
+                        help="Grava um perfil cProfile do gerador (pstats) em ARQUIVO e resume onde vai a CPU do cliente; "
+                             "o perfil deixa o gerador mais lento")
+    args = parser.parse_args()
+    ponto = None
+    if args.resume:
+        try:
+            ponto = ler_ponto_controle(args.resume)
+        except (OSError, ValueError, KeyError) as e:
+            parser.error(f"Ponto de controle inválido ({args.resume}): {e}")
+        if ponto['concluido']:
+            parser.error(f"A execução de {args.resume} já foi concluída")
+        # A carga continua com os argumentos da execução interrompida
+        for nome, valor in ponto['argumentos'].items():
+            setattr(args, nome, valor)
+        args.soak, args.checkpoint = True, args.resume
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.workers < 1:
+        parser.error("--workers deve ser pelo menos 1")
+    if args.workers > 1 and args.engine != 'async':
+        parser.error("--workers só é suportado pelo motor assíncrono")
+    if args.agents and (args.engine != 'async' or args.workers > 1):
+        parser.error("--agents só é suportado pelo motor assíncrono e sem --workers (os workers são os dos agentes)")
+    if args.find_capacity:
+        if args.engine != 'async' or args.workers > 1 or args.agents or args.load_profile:
+            parser.error("--find-capacity só é suportado pelo motor assíncrono em um processo, sem --load-profile")
+        if args.capacity_start <= 0 or args.capacity_factor <= 1 or args.step_window <= 0:
+            parser.error("--capacity-start e --step-window devem ser positivos e --capacity-factor maior que 1")
+    if (args.record or args.replay) and (args.workers > 1 or args.agents):
+        parser.error("--record e --replay só são suportados em um processo, sem --workers ou --agents")
+    if args.replay and (args.engine != 'async' or args.load_profile or args.find_capacity or args.record):
+        parser.error("--replay usa o motor assíncrono e não se combina com --load-profile, --find-capacity ou --record")
+    if args.replay_speed < 0:
+        parser.error("--replay-speed não pode ser negativa")
+    if args.soak and (args.find_capacity or args.replay or args.agents):
+        parser.error("--soak e --resume não se combinam com --find-capacity, --replay ou --agents")
+    if args.profile and args.agents:
+        parser.error("--profile não se combina com --agents (os workers rodam nos agentes)")
+    if args.soak and not args.resume and os.path.exists(args.checkpoint):
+        try:
+            anterior = ler_ponto_controle(args.checkpoint)
+        except (OSError, ValueError, KeyError):
+            anterior = None
+        if anterior and not anterior['concluido']:
+            parser.error(f"{args.checkpoint} é de uma execução interrompida: continue com --resume {args.checkpoint} "
+                         "ou apague o arquivo")
+    perfil = None
+    if args.load_profile:
+        if args.engine != 'async':
+            parser.error("--load-profile só é suportado pelo motor assíncrono")
+        try:
+            perfil = interpretar_perfil(args.load_profile)
+        except ValueError as e:
+            parser.error(str(e))
+    if ponto:
+        restante = (duracao_total(perfil) if perfil else args.duration) - ponto['decorrido']
+        if restante <= 0:
+            parser.error(f"A duração de {args.resume} já se esgotou: não há carga a retomar")
+        if perfil:
+            perfil = recortar_perfil(perfil, ponto['decorrido'])
+        else:
+            args.duration = restante
+    # Antes de obter_referencias, para os avisos da busca e do cache irem para o log configurado
+    configurar_registro(args.log_file, args.log_level, LOG_FILA)
+    referencias = carregar_referencias()
+    if not args.offline_references:
+        referencias, origens = obter_referencias(API_BASE_URL, referencias, REFERENCIAS_CACHE, REFERENCIAS_TTL,
+                                                 args.refresh_references)
+        print("Referências: " + ', '.join(f"{nome} {len(referencias[nome])} ({origem})" for nome, origem in origens.items()))
+    try:
+        cenario = carregar_cenario_padrao(args.scenario, referencias)
+    except (OSError, ValueError, KeyError) as e:
+        parser.error(f"Cenário inválido ({args.scenario}): {e}")
+    opcoes = {
+        'cenario': args.scenario,
+        'usuarios': args.users,
+        'duracao': duracao_total(perfil) if perfil else args.duration,
+        'perfil': perfil,
+        'chegadas': args.arrivals,
+        'max_em_andamento': args.max_in_flight,
+        'log_arquivo': args.log_file,
+        'log_nivel': args.log_level,
+        'log_fila': LOG_FILA,
+        'semente': args.seed,
+        'referencias': referencias,
+        'max_pedidos': SOAK_MAX_PEDIDOS if args.soak else None,
+        'perfilar': args.profile
+    }
+
+    # Primeira série: o veredito sobre o gerador já está no tester quando as demais séries são fechadas
+    monitor = MonitorSaturacao(SATURACAO_CPU, SATURACAO_ATRASO_LACO, SATURACAO_ATRASO_ENVIO, SATURACAO_TOLERANCIA)
+    series = [monitor]
+    if args.export:
+        try:
+            series.append(SerieTemporal(args.export, args.export_parquet))
+        except (OSError, ValueError) as e:
+            parser.error(f"Exportação inválida: {e}")
+    elif args.export_parquet:
+        parser.error("--export-parquet requer --export")
+    exposicao = None
+    if args.metrics_port is not None:
+        try:
+            exposicao = ExposicaoMetricas(args.metrics_port, METRICAS_HOST)
+        except OSError as e:
+            parser.error(f"Não foi possível atender as métricas na porta {args.metrics_port}: {e}")
+        series.append(exposicao)
+    ponto_controle = None
+    if args.soak:
+        argumentos = ponto['argumentos'] if ponto else {nome: getattr(args, nome) for nome in ARGUMENTOS_SOAK}
+        try:
+            ponto_controle = PontoControle(args.checkpoint, argumentos, SOAK_INTERVALO, SOAK_JANELA, ponto)
+        except OSError as e:
+            parser.error(f"Não foi possível gravar o ponto de controle {args.checkpoint}: {e}")
+        series.append(ponto_controle)
+    registros = None
+    if args.replay:
+        try:
+            registros = ler_gravacao(args.replay)
+        except (OSError, ValueError, KeyError) as e:
+            parser.error(f"Gravação inválida ({args.replay}): {e}")
+    gravador = None
+    if args.record:
+        try:
+            gravador = Gravador(args.record)
+        except OSError as e:
+            parser.error(f"Não foi possível gravar em {args.record}: {e}")
+
+    painel = Painel(exibir=not args.no_dashboard, series=series)
     print("Iniciando testes de carga...")
-    print(f"Simulando {MAX_CONCURRENT_REQUESTS} usuários simultâneos...")
-    
-    start_time = time.time()
+    if args.log_file != '-':
+        print(f"Log das requisições em {args.log_file} (nível {args.log_level})")
+    if exposicao:
+        print(f"Métricas em {exposicao.endereco}")
+    if ponto:
+        print(f"Retomando {args.resume}: {ponto['decorrido']:.0f}s já executados, "
+              f"faltam {duracao_total(perfil) if perfil else args.duration:.0f}s")
+
+    def novo_tester(classe):
+        tester = classe()
+        tester.gravador = gravador
+        tester.max_pedidos = opcoes['max_pedidos']
+        if ponto:
+            retomar(tester, ponto)
+        return tester
     
-    while time.time() - start_time < TEST_DURATION_SECONDS:
-        # Seleciona um endpoint aleatório para testar
-        endpoints = [
-            '/Representante/listar',
-            '/Cliente/listar',
-            '/Produto/listar',
-            '/Pedido/listarPedidosAbertos/{codRepresentante}',
-            '/Pedido/Criar',
-            '/EditaItemPedido/alterarQuantidade',
-            '/EditaItemPedido/excluirItem',
-            '/EditaItemPedido/fecharPedido',
-            '/Pedido/imprime',
-            '/Pedido/imprimeFichaCadastral',
-            '/Produto/busca'
-        ]
-        
-        path = random.choice(endpoints)
-        
-        # Configurações específicas para cada endpoint
-        if path == '/Representante/listar':
-            tester.test_endpoint(path, 'GET')
-        elif path == '/Cliente/listar':
-            tester.test_endpoint(path, 'GET')
-        elif path == '/Produto/listar':
-            tester.test_endpoint(path, 'GET')
-        elif path == '/Pedido/listarPedidosAbertos/{codRepresentante}':
-            # Substitui o placeholder pelo código do representante
-            cod_representante_aleatorio = random.choice(cod_representantes)
-            endpoint = path.replace('{codRepresentante}', str(cod_representante_aleatorio))
-            tester.test_endpoint(endpoint, 'GET')
-        elif path == '/Pedido/Criar':
-            # Dados para criar um pedido
-            cod_cliente_aleatorio = random.choice(cod_clientes)
-            cod_representante_aleatorio = random.choice(cod_representantes)
-            cod_cond_pagamento_aleatorio = random.choice(cod_cond_pagamento)
-            cod_transportadora_aleatoria = random.choice(cod_transportadoras)
-            
-            data = {
-                'CodCliente': cod_cliente_aleatorio,
-                'CodRepresentante': cod_representante_aleatorio,
-                'CodCondPagamento': cod_cond_pagamento_aleatorio,
-                'CodTransportadora': cod_transportadora_aleatoria,
-                'TipoOperacao': 1,
-                'TipoFrete': 'C',
-                'Observacao': fake.text(max_nb_chars=100)
-            }
-            
-            tester.test_endpoint(path, 'POST', data)
-        elif path == '/EditaItemPedido/alterarQuantidade':
-            # Verifica se há pedidos criados
-            if not tester.pedidos_criados:
-                continue
-                
-            # Seleciona um pedido aleatório
-            nro_pedido_aleatorio = tester.obter_pedido_aleatorio()
-            
-            # Verifica se o pedido tem um cliente associado
-            if nro_pedido_aleatorio not in tester.pedidos_clientes:
-                continue
-                
-            cod_cliente = tester.pedidos_clientes[nro_pedido_aleatorio]
-            
-            # Seleciona um produto aleatório
-            # AQUI ESTÁ A CORREÇÃO: usar tester.codigos_produto em vez de codigos_produto
-            cod_produto_aleatorio = random.choice(tester.codigos_produto)
-            qtd_vendida_aleatoria = random.randint(1, 500)
-            desconto_individual_aleatorio = round(random.uniform(1.0, 20.0), 2)
-            
-            data = {
-                'nroPedido': nro_pedido_aleatorio,
-                'codCliente': cod_cliente,
-                'codProduto': cod_produto_aleatorio,
-                'qtdVendida': qtd_vendida_aleatoria,
-                'descontoIndividual': desconto_individual_aleatorio,
-                'tabelaPreco': 1,
-                'codCondPagamento': random.choice(cod_cond_pagamento),
-                'codTransportadora': random.choice(cod_transportadoras),
-                'tipoOperacao': 1
+    # Com --workers, perfila só os workers (o coordenador apenas mescla as parciais); ver combinar_perfis_workers
+    perfilador = Perfilador(args.profile) if args.profile and args.workers == 1 else contextlib.nullcontext()
+    with perfilador:
+        if args.find_capacity:
+            busca = {
+                'modo': args.capacity_mode,
+                'inicial': args.capacity_start,
+                'fator': args.capacity_factor,
+                'maximo': args.capacity_max,
+                'janela': args.step_window,
+                'slo_p99': args.slo_p99,
+                'slo_erros': args.slo_errors,
+                'chegadas': args.arrivals,
+                'max_em_andamento': args.max_in_flight
             }
-            
-            tester.test_endpoint(path, 'POST', data)
-        elif path == '/EditaItemPedido/excluirItem':
-            # Verifica se há pedidos criados
-            if not tester.pedidos_criados:
-                continue
-                
-            # Seleciona um pedido aleatório
-            nro_pedido_aleatorio = tester.obter_pedido_aleatorio()
-            
-            # Verifica se o pedido tem itens
-            if nro_pedido_aleatorio not in tester.itens_por_pedido or not tester.itens_por_pedido[nro_pedido_aleatorio]:
-                continue
-                
-            # Seleciona um item aleatório do pedido
-            cod_produto_aleatorio = tester.obter_item_aleatorio_do_pedido(nro_pedido_aleatorio)
-            
-            params = {
-                'nroPedido': nro_pedido_aleatorio,
-                'codigo': cod_produto_aleatorio
-            }
-            
-            tester.test_endpoint(path, 'DELETE', None, params)
-        elif path == '/EditaItemPedido/fecharPedido':
-            # Verifica se há pedidos criados
-            if not tester.pedidos_criados:
-                print("Não há pedidos criados para fechar. Pulando endpoint.")
-                continue
-                
-            # Seleciona um pedido aleatório
-            nro_pedido_aleatorio = tester.obter_pedido_aleatorio()
-            
-            data = {
-                'nroPedido': nro_pedido_aleatorio
-            }
-            
-            tester.test_endpoint(path, 'POST', data)
-        elif path == '/Pedido/imprime' or path == '/Pedido/imprimeFichaCadastral':
-            # Verifica se há pedidos criados
-            if not tester.pedidos_criados:
-                continue
-                
-            # Seleciona um pedido aleatório
-            nro_pedido_aleatorio = tester.obter_pedido_aleatorio()
-            
-            data = {
-                'nroPedido': nro_pedido_aleatorio
-            }
-            
-            tester.test_endpoint(path, 'POST', data)
-        elif path == '/Produto/busca':
-            # AQUI ESTÁ A CORREÇÃO: usar tester.codigos_produto em vez de codigos_produto
-            codigo_aleatorio = random.choice(tester.codigos_produto)
-            data = {'codigo': codigo_aleatorio}
-            tester.test_endpoint(path, 'POST', data)
-    
+            print(f"Buscando a capacidade ({'taxa de chegada' if args.capacity_mode == MODO_TAXA else 'usuários simultâneos'}, "
+                  f"a partir de {args.capacity_start:g}, fator {args.capacity_factor:g})...")
+            tester = AsyncAPITester()
+            tester.gravador = gravador
+            degraus = asyncio.run(buscar_capacidade(tester, cenario, busca, painel))
+        elif args.replay:
+            velocidade = 'o mais rápido possível' if args.replay_speed == 0 else f"{args.replay_speed:g}x"
+            print(f"Reproduzindo {len(registros)} requisições de {args.replay} ({velocidade})...")
+            tester = AsyncAPITester()
+            reproducao = Reproducao(tester, registros, args.replay_speed, args.max_in_flight)
+            asyncio.run(reproducao.executar(painel))
+        elif args.engine == 'sync':
+            tester = novo_tester(APITester)
+            print("Simulando 1 usuário (motor síncrono)...")
+            executar_sincrono(tester, cenario, args.duration, painel)
+        else:
+            if perfil:
+                print(f"Perfil de carga (modelo aberto, chegadas {args.arrivals}): {', '.join(map(repr, perfil))}")
+            else:
+                print(f"Simulando {args.users} usuários simultâneos...")
+            if args.agents:
+                # Importado aqui: distribuido importa este módulo
+                from distribuido import executar_distribuido, interpretar_agentes
+                try:
+                    tester = asyncio.run(executar_distribuido(interpretar_agentes(args.agents), opcoes, painel, args.agent_token))
+                except (RuntimeError, ValueError) as e:
+                    parar_registro()
+                    print(f"Erro: {e}")
+                    sys.exit(1)
+            elif args.workers > 1:
+                print(f"Distribuindo a carga entre {args.workers} processos...")
+                tester = executar_multiprocesso(args.workers, opcoes, painel, novo_tester(APITester))
+            else:
+                tester = novo_tester(AsyncAPITester)
+                asyncio.run(tester.executar(cenario, opcoes, painel))
+
+    # As séries fecham antes do banco: o último ponto de controle ainda confirma o estado dos pedidos
+    painel.encerrar(tester)
+    tester.fechar()
+    if gravador:
+        gravador.fechar()
+    if args.profile and args.workers > 1:
+        combinar_perfis_workers(args.profile, args.workers)
+    parar_registro()
     tester.print_results()
+    monitor.imprimir()
+    if args.find_capacity:
+        imprimir_capacidade(degraus, busca)
+    if args.replay and reproducao.ignoradas:
+        print(f"\nRequisições não reproduzidas (a criação do pedido referenciado falhou): {reproducao.ignoradas}")
+    if gravador:
+        print(f"\n{gravador.total} requisições gravadas em {args.record}")
+    if args.export:
+        print(f"\nSérie por segundo em {args.export}; resumo em {caminho_resumo(args.export)}")
+    if ponto_controle:
+        print(f"\nJanelas de {SOAK_JANELA:g}s em {ponto_controle.janelas}; ponto de controle em {args.checkpoint}")
+    if args.profile and os.path.exists(args.profile):
+        imprimir_perfil(args.profile)
+        print(f"\nPerfil completo em {args.profile} (python -m pstats {args.profile})")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,303 @@
+"""
+Benchmark do próprio gerador de carga.
+
+Sobe o servidor_mock.py com latência zero em outro processo e mede, para cada
+motor do api_tester.py, a vazão máxima, o tempo de CPU do gerador por requisição
+e o crescimento de memória (RSS) por 100 mil requisições depois do aquecimento.
+Também mede, sem rede, o custo de cada etapa de contabilidade de uma requisição
+(sorteio do cenário, processamento da resposta, registro nas métricas).
+
+Os resultados são gravados em JSON para comparar versões:
+
+    python benchmark.py --duration 10
+    python benchmark.py --engines async,open --compare benchmark_resultados/anterior.json
+
+O log das requisições vai para um arquivo temporário, no nível INFO, como numa
+execução normal; a saída restante do robô no terminal é descartada.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import threading
+import contextlib
+import subprocess
+
+MOTORES = ['sync', 'async', 'open', 'workers']
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+
+def rss_atual() -> int:
+    """Memória residente do processo em bytes (0 se não for possível medir)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        try:
+            import resource
+            # ru_maxrss é o pico (KB no Linux, bytes no macOS); serve como aproximação
+            fator = 1 if sys.platform == 'darwin' else 1024
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * fator
+        except ImportError:
+            return 0
+
+
+def tempo_cpu() -> float:
+    """CPU (usuário + sistema) deste processo e dos filhos já finalizados"""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class AmostradorMemoria:
+    """
+    Amostra (requisições, RSS) em segundo plano durante uma medição.
+
+    O crescimento por requisição é a inclinação entre a primeira e a última
+    amostra da segunda metade da execução, o que exclui as alocações de
+    aquecimento (pool de conexões, caches do Faker, histogramas novos).
+    """
+
+    def __init__(self, contador, intervalo: float = 0.25):
+        self.contador = contador
+        self.intervalo = intervalo
+        self.amostras = []
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            self.amostras.append((self.contador(), rss_atual()))
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *excecao):
+        self._parar.set()
+        self._thread.join()
+
+    def bytes_por_requisicao(self):
+        estaveis = self.amostras[len(self.amostras) // 2:]
+        if len(estaveis) < 2 or estaveis[-1][0] <= estaveis[0][0]:
+            return None
+        return (estaveis[-1][1] - estaveis[0][1]) / (estaveis[-1][0] - estaveis[0][0])
+
+
+def porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def iniciar_mock(porta: int, processos: int) -> subprocess.Popen:
+    """Sobe o servidor mock com latência zero e espera a porta aceitar conexões"""
+    servidor = subprocess.Popen(
+        [sys.executable, os.path.join(DIRETORIO, 'servidor_mock.py'), '--port', str(porta), '--processos', str(processos)],
+        cwd=DIRETORIO, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    limite = time.time() + 30
+    while time.time() < limite:
+        with contextlib.suppress(OSError), socket.create_connection(('127.0.0.1', porta), timeout=0.2):
+            return servidor
+        time.sleep(0.1)
+    servidor.terminate()
+    raise RuntimeError("O servidor mock não subiu em 30 segundos")
+
+
+@contextlib.contextmanager
+def saida_descartada():
+    """Descarta a saída por requisição do robô durante uma medição"""
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        yield
+
+
+def medir_motor(api_tester, motor: str, duracao: float, usuarios: int, workers: int, taxa: float, arquivo_log: str) -> dict:
+    """Roda um motor contra o mock e retorna vazão, CPU por requisição e crescimento de memória"""
+    cenario = api_tester.carregar_cenario_padrao(os.path.join(DIRETORIO, 'cenario.json'))
+    opcoes = {
+        'cenario': os.path.join(DIRETORIO, 'cenario.json'),
+        'usuarios': usuarios,
+        'duracao': duracao,
+        'perfil': None,
+        'chegadas': api_tester.CHEGADAS_UNIFORMES,
+        'max_em_andamento': api_tester.MAX_CONCURRENT_REQUESTS,
+        'log_arquivo': arquivo_log,
+        'log_nivel': 'INFO',
+        'log_fila': api_tester.LOG_FILA
+    }
+    if motor == 'open':
+        opcoes['perfil'] = api_tester.interpretar_perfil(f"{duracao}s@{taxa}rps")
+
+    with saida_descartada():
+        tester = None if motor == 'workers' else (api_tester.APITester() if motor == 'sync' else api_tester.AsyncAPITester())
+        cpu_inicial = tempo_cpu()
+        inicio = time.perf_counter()
+        if motor == 'workers':
+            # A memória dos workers fica nos processos filhos; só vazão e CPU são medidas
+            tester = api_tester.executar_multiprocesso(workers, opcoes)
+            memoria = None
+        else:
+            with AmostradorMemoria(lambda: tester.results['success'] + tester.results['errors'] + tester.results['expected_errors']) as amostrador:
+                if motor == 'sync':
+                    api_tester.executar_sincrono(tester, cenario, duracao)
+                else:
+                    asyncio.run(tester.executar(cenario, opcoes))
+            memoria = amostrador.bytes_por_requisicao()
+        decorrido = time.perf_counter() - inicio
+        cpu = tempo_cpu() - cpu_inicial
+        tester.fechar()
+
+    requisicoes = tester.results['success'] + tester.results['errors'] + tester.results['expected_errors']
+    resultado = {
+        'requisicoes': requisicoes,
+        'erros': tester.results['errors'],
+        'duracao_s': round(decorrido, 3),
+        'rps': round(requisicoes / decorrido, 1) if decorrido else 0,
+        'cpu_us_por_requisicao': round(cpu / requisicoes * 1e6, 1) if requisicoes else None,
+        'memoria_bytes_por_100k': round(memoria * 100000) if memoria is not None else None
+    }
+    if tester.results.get('nao_enviadas'):
+        resultado['nao_enviadas'] = tester.results['nao_enviadas']
+    if tester.results.get('sem_requisicao'):
+        resultado['sem_requisicao'] = tester.results['sem_requisicao']
+    if tester.metricas.atraso_envio.total:
+        resultado['atraso_envio_p99_ms'] = round(tester.metricas.atraso_envio.percentil(99) * 1000, 2)
+    return resultado
+
+
+def medir_micro(api_tester, repeticoes: int) -> dict:
+    """Custo em microssegundos de cada etapa de contabilidade, sem rede"""
+    from payloads import obter_faker
+    cenario = api_tester.carregar_cenario_padrao(os.path.join(DIRETORIO, 'cenario.json'))
+    with saida_descartada():
+        tester = api_tester.APITester()
+        dados_criar = {'CodCliente': 1, 'CodRepresentante': 105, 'CodCondPagamento': 711,
+                       'CodTransportadora': 1, 'TipoOperacao': 1, 'TipoFrete': 'C', 'Observacao': 'x'}
+        lista = json.dumps([{'codCliente': i, 'nome': f'Cliente {i}'} for i in range(100)])
+        contador = iter(range(10 ** 9, 2 * 10 ** 9))
+        faker = obter_faker()
+
+        etapas = {
+            'cenario_selecionar': lambda: cenario.selecionar(tester),
+            'processar_resposta_listagem': lambda: tester.processar_resposta('/Cliente/listar', 200, lista),
+            'processar_resposta_criar': lambda: tester.processar_resposta(
+                '/Pedido/Criar', 200, '{"pedidoNumero": %d}' % next(contador), dados_criar),
+            'metricas_registrar': lambda: tester.metricas.registrar('/Cliente/listar', 'success', 0.0123),
+            'faker_texto': lambda: faker.text(max_nb_chars=100),
+            'texto_do_pool': lambda: api_tester.textos.sortear(100)
+        }
+        resultado = {}
+        for nome, etapa in etapas.items():
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                etapa()
+            resultado[nome] = round((time.perf_counter() - inicio) / repeticoes * 1e6, 2)
+        tester.fechar()
+    return resultado
+
+
+def versao() -> str:
+    """Commit atual do repositório (com '-dirty' se houver alterações), para identificar o resultado"""
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=DIRETORIO,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconhecida'
+
+
+def comparar(atual: dict, anterior: dict):
+    """Imprime a variação de vazão e de CPU por requisição em relação a um resultado anterior"""
+    print(f"\n=== Comparação com {anterior.get('versao')} ({anterior.get('data')}) ===")
+    print(f"{'Motor':<10}{'rps antes':>12}{'rps agora':>12}{'var.':>9}{'µs/req antes':>15}{'µs/req agora':>15}{'var.':>9}")
+
+    def variacao(antes, agora):
+        return f"{(agora - antes) / antes * 100:+.1f}%" if antes and agora is not None else '-'
+
+    for motor, agora in atual['motores'].items():
+        antes = anterior.get('motores', {}).get(motor)
+        if not antes:
+            continue
+        print(f"{motor:<10}{antes['rps']:>12}{agora['rps']:>12}{variacao(antes['rps'], agora['rps']):>9}"
+              f"{str(antes['cpu_us_por_requisicao']):>15}{str(agora['cpu_us_por_requisicao']):>15}"
+              f"{variacao(antes['cpu_us_por_requisicao'], agora['cpu_us_por_requisicao']):>9}")
+    for etapa, agora in atual['micro'].items():
+        antes = anterior.get('micro', {}).get(etapa)
+        if antes:
+            print(f"  {etapa:<32}{antes:>10} µs -> {agora:>10} µs ({variacao(antes, agora)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do gerador de carga contra um servidor local de latência zero")
+    parser.add_argument('--engines', default=','.join(MOTORES),
+                        help=f"Motores a medir, separados por vírgula ({', '.join(MOTORES)})")
+    parser.add_argument('--duration', type=float, default=10, help="Duração de cada medição em segundos")
+    parser.add_argument('--users', type=int, default=200, help="Usuários virtuais dos motores async e workers")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help="Processos do motor workers")
+    parser.add_argument('--rate', type=float, default=50000, help="Taxa alvo (req/s) do motor open, acima do que o gerador alcança")
+    parser.add_argument('--server-processes', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Processos do servidor mock")
+    parser.add_argument('--micro-repetitions', type=int, default=20000, help="Repetições de cada etapa do micro-benchmark")
+    parser.add_argument('--output', help="Arquivo JSON de saída (padrão: benchmark_resultados/<data>-<versão>.json)")
+    parser.add_argument('--compare', help="Resultado anterior para comparação")
+    args = parser.parse_args()
+    motores = [m.strip() for m in args.engines.split(',') if m.strip()]
+    invalidos = set(motores) - set(MOTORES)
+    if invalidos:
+        parser.error(f"Motores desconhecidos: {', '.join(sorted(invalidos))}")
+
+    porta = porta_livre()
+    diretorio_estado = tempfile.mkdtemp(prefix='benchmark_estado_')
+    # Configura o api_tester antes de importá-lo: ele lê o ambiente na importação
+    os.environ['API_BASE_URL'] = f"http://127.0.0.1:{porta}"
+    os.environ['ESTADO_DB'] = os.path.join(diretorio_estado, 'estado_pedidos.db')
+    os.chdir(DIRETORIO)
+    import api_tester
+    arquivo_log = os.path.join(diretorio_estado, 'api_tester.log')
+    api_tester.configurar_registro(arquivo_log, 'INFO', api_tester.LOG_FILA)
+
+    servidor = iniciar_mock(porta, args.server_processes)
+    try:
+        resultado = {
+            'versao': versao(),
+            'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count(),
+            'parametros': vars(args),
+            'motores': {},
+            'micro': {}
+        }
+        print(f"Versão {resultado['versao']}, {resultado['cpus']} CPUs, servidor mock na porta {porta}")
+        for motor in motores:
+            print(f"Medindo motor {motor} por {args.duration:g}s...", flush=True)
+            resultado['motores'][motor] = medida = medir_motor(api_tester, motor, args.duration, args.users, args.workers, args.rate, arquivo_log)
+            print(f"  {medida['rps']} req/s, {medida['cpu_us_por_requisicao']} µs de CPU por requisição, "
+                  f"{medida['memoria_bytes_por_100k']} bytes de RSS a cada 100 mil requisições")
+        print("Medindo etapas de contabilidade (sem rede)...", flush=True)
+        resultado['micro'] = medir_micro(api_tester, args.micro_repetitions)
+        for etapa, custo in resultado['micro'].items():
+            print(f"  {etapa:<32}{custo:>10} µs")
+    finally:
+        servidor.terminate()
+        servidor.wait()
+        api_tester.parar_registro()
+
+    saida = args.output or os.path.join(DIRETORIO, 'benchmark_resultados',
+                                        f"{time.strftime('%Y%m%d-%H%M%S')}-{resultado['versao']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"Resultados gravados em {saida}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            comparar(resultado, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Busca automática de capacidade da API (--find-capacity).
+
+Aumenta a carga em degraus, com o mix de endpoints do cenário: a taxa de
+chegada (modelo aberto, MODO_TAXA) ou o número de usuários virtuais (modelo
+fechado, MODO_USUARIOS), multiplicada por um fator a cada degrau.
+
+Cada degrau roda em janelas de alguns segundos até o p99 de duas janelas
+seguidas variar menos que TOLERANCIA_ESTAVEL (ou até MAX_JANELAS janelas); as
+métricas do degrau são as das janelas depois da primeira, que serve de
+aquecimento. A busca para no primeiro degrau que viola o SLO (p99 ou taxa de
+erros), que deixa chegadas sem enviar (o gerador ou o limite de requisições em
+andamento não acompanhou) ou ao atingir a carga máxima.
+
+O joelho é o último degrau dentro do SLO: a maior vazão sustentável e a
+concorrência média nele (lei de Little: vazão x latência média).
+"""
+import time
+import asyncio
+
+from agendador import Estagio
+from metricas import Metricas, ERRO
+from registro import log
+
+MODO_TAXA = 'rate'
+MODO_USUARIOS = 'users'
+# Variação relativa máxima do p99 entre duas janelas seguidas para o degrau ser considerado estável
+TOLERANCIA_ESTAVEL = 0.2
+MAX_JANELAS = 6
+MAX_DEGRAUS = 30
+# Fração de chegadas não enviadas (relativa às requisições do degrau) a partir da qual o gerador está saturado;
+# algumas chegadas na virada de cada janela podem ficar para trás mesmo sem saturação
+LIMITE_NAO_ENVIADAS = 0.01
+
+
+class Degrau:
+    """Carga e resultado de um degrau da busca"""
+
+    def __init__(self, carga: float, metricas: Metricas, duracao: float, nao_enviadas: int, janelas: int, estavel: bool):
+        self.carga = carga
+        histograma = metricas.combinado()
+        self.requisicoes = histograma.total
+        self.vazao = histograma.total / duracao if duracao > 0 else 0.0
+        self.concorrencia = self.vazao * histograma.media()
+        self.p50, self.p95, self.p99 = (histograma.percentil(p) for p in (50, 95, 99))
+        self.erros = 100 * metricas.contagem(resultado=ERRO) / histograma.total if histograma.total else 0.0
+        self.nao_enviadas = nao_enviadas
+        self.janelas = janelas
+        self.estavel = estavel
+        self.violacao = None
+
+    def avaliar(self, slo_p99: float, slo_erros: float) -> bool:
+        """Verifica o SLO e guarda em `violacao` o motivo, se houver; retorna True se o degrau é sustentável"""
+        if not self.requisicoes:
+            self.violacao = "nenhuma requisição concluída"
+        elif self.p99 > slo_p99:
+            self.violacao = f"p99 {self.p99 * 1000:.0f} ms > {slo_p99 * 1000:.0f} ms"
+        elif self.erros > slo_erros:
+            self.violacao = f"erros {self.erros:.2f}% > {slo_erros:g}%"
+        elif self.nao_enviadas > LIMITE_NAO_ENVIADAS * self.requisicoes:
+            self.violacao = f"{self.nao_enviadas} chegadas não enviadas (gerador saturado)"
+        return self.violacao is None
+
+
+def _copia(metricas: Metricas) -> Metricas:
+    copia = Metricas()
+    copia.mesclar(metricas)
+    return copia
+
+
+def _estavel(p99s: list) -> bool:
+    anterior, atual = p99s[-2], p99s[-1]
+    return anterior > 0 and abs(atual - anterior) / anterior <= TOLERANCIA_ESTAVEL
+
+
+async def _janela(tester, cenario, modo: str, carga: float, opcoes: dict):
+    if modo == MODO_TAXA:
+        await tester.run_open_model(cenario, [Estagio(opcoes['janela'], carga)], opcoes['chegadas'], opcoes['max_em_andamento'])
+    else:
+        await tester.run_virtual_users(cenario, int(carga), opcoes['janela'])
+
+
+async def executar_degrau(tester, cenario, carga: float, opcoes: dict) -> Degrau:
+    """Roda o degrau em janelas até o p99 estabilizar e retorna as métricas depois do aquecimento"""
+    p99s = []
+    marco = inicio = nao_enviadas = None
+    for janela in range(MAX_JANELAS):
+        antes = _copia(tester.metricas)
+        await _janela(tester, cenario, opcoes['modo'], carga, opcoes)
+        p99s.append(tester.metricas.diferenca(antes).combinado().percentil(99))
+        if janela == 0:
+            # A primeira janela é aquecimento: o degrau é medido a partir daqui
+            marco, inicio, nao_enviadas = _copia(tester.metricas), time.time(), tester.results['nao_enviadas']
+        elif _estavel(p99s):
+            break
+    estavel = len(p99s) > 1 and _estavel(p99s)
+    return Degrau(carga, tester.metricas.diferenca(marco), time.time() - inicio,
+                  tester.results['nao_enviadas'] - nao_enviadas, len(p99s), estavel)
+
+
+async def buscar_capacidade(tester, cenario, opcoes: dict, painel=None) -> list:
+    """
+    Executa os degraus com um AsyncAPITester, numa única sessão, até violar o SLO.
+
+    opcoes: modo, inicial, fator, maximo (ou None), janela (s), slo_p99 (s),
+    slo_erros (%), chegadas e max_em_andamento (MODO_TAXA). Retorna a lista de Degrau.
+    """
+    degraus = []
+    atualizador = asyncio.create_task(tester.atualizar_painel(painel)) if painel else None
+    try:
+        async with tester.abrir_sessao():
+            carga = opcoes['inicial']
+            for _ in range(MAX_DEGRAUS):
+                degrau = await executar_degrau(tester, cenario, carga, opcoes)
+                degraus.append(degrau)
+                sustentavel = degrau.avaliar(opcoes['slo_p99'], opcoes['slo_erros'])
+                log.info("Capacidade: carga %g -> %.1f req/s, p99 %.1f ms, erros %.2f%%%s", carga, degrau.vazao,
+                         degrau.p99 * 1000, degrau.erros, '' if sustentavel else f" (SLO violado: {degrau.violacao})")
+                if not sustentavel or (opcoes['maximo'] and carga >= opcoes['maximo']):
+                    break
+                proxima = carga * opcoes['fator']
+                if opcoes['modo'] == MODO_USUARIOS:
+                    proxima = max(carga + 1, round(proxima))
+                carga = min(proxima, opcoes['maximo']) if opcoes['maximo'] else proxima
+    finally:
+        if atualizador:
+            atualizador.cancel()
+    return degraus
+
+
+def imprimir_capacidade(degraus: list, opcoes: dict):
+    """Imprime a curva de latência por degrau e o joelho encontrado"""
+    unidade = 'rps' if opcoes['modo'] == MODO_TAXA else 'usuários'
+    print(f"\n=== Busca de capacidade (SLO: p99 <= {opcoes['slo_p99'] * 1000:.0f} ms, erros <= {opcoes['slo_erros']:g}%) ===")
+    print(f"{'Carga (' + unidade + ')':>16}{'req/s':>10}{'Conc.':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'Erros':>8}{'Janelas':>9}  Situação")
+    for degrau in degraus:
+        situacao = degrau.violacao or ('ok' if degrau.estavel else 'ok (p99 não estabilizou)')
+        print(f"{degrau.carga:>16.1f}{degrau.vazao:>10.1f}{degrau.concorrencia:>8.1f}{degrau.p50 * 1000:>9.1f}"
+              f"{degrau.p95 * 1000:>9.1f}{degrau.p99 * 1000:>9.1f}{degrau.erros:>7.2f}%{degrau.janelas:>9}  {situacao}")
+
+    sustentaveis = [degrau for degrau in degraus if degrau.violacao is None]
+    if not sustentaveis:
+        print(f"\nNenhum degrau dentro do SLO; reduza a carga inicial (--capacity-start {opcoes['inicial']:g}).")
+        return
+    joelho = max(sustentaveis, key=lambda degrau: degrau.vazao)
+    print(f"\nMaior vazão sustentável: {joelho.vazao:.1f} req/s com carga {joelho.carga:g} {unidade} "
+          f"(concorrência média {joelho.concorrencia:.1f}, p99 {joelho.p99 * 1000:.1f} ms)")
+    if degraus[-1].violacao:
+        print(f"SLO violado com carga {degraus[-1].carga:g} {unidade}: {degraus[-1].violacao}")
+    else:
+        print("O SLO não foi violado até a carga máxima; aumente --capacity-max para continuar a busca.")
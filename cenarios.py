@@ -0,0 +1,426 @@
+"""
+Cenários de carga declarativos.
+
+O cenário (cenario.json, ou YAML se o PyYAML estiver instalado) lista os
+endpoints com peso, método, pausa (think time) e os geradores de cada campo do
+payload. Ele é compilado uma única vez em uma tabela de despacho: o endpoint é
+sorteado em O(1) por uma tabela de alias (método de Vose) e cada campo vira uma
+função ou constante, sem cadeias de if/elif por requisição. Os textos vêm de
+um pool gerado na compilação (payloads.PoolTextos).
+
+Geradores disponíveis nos valores de "path", "data" e "params":
+
+    $representante, $cliente, $cond_pagamento, $transportadora, $produto
+        valor aleatório da lista de referência correspondente
+    $pedido             pedido criado aleatório (sem pedidos, a requisição é pulada)
+    $cliente_do_pedido  cliente associado ao $pedido (sem cliente, pula)
+    $item_do_pedido     item aleatório do $pedido (sem itens, pula)
+    $texto:N            texto aleatório com até N caracteres (sorteado de um pool pré-gerado)
+    $int:A:B            inteiro entre A e B
+    $decimal:A:B:C      número entre A e B com C casas decimais
+
+Qualquer outro valor é enviado literalmente.
+
+O bloco opcional "ciclo_pedido" sorteia, com o seu peso, uma transação completa
+sobre um pedido novo em vez de uma requisição avulsa:
+
+    criar -> itens -> alterar -> excluir -> fechar -> imprimir
+
+    "ciclo_pedido": {
+        "peso": 1,
+        "itens": [1, 5],          quantidade de itens adicionados (sorteada entre os limites)
+        "itens_paralelos": 3,     itens adicionados ao mesmo tempo (motor assíncrono)
+        "alteracoes": [0, 1],     alterações de quantidade de itens já adicionados
+        "exclusoes": [0, 1],      exclusões de itens
+        "imprimir": true,
+        "think_time": [0, 0]
+    }
+
+Cada etapa usa a definição do endpoint correspondente (ENDPOINTS_CICLO) da lista
+de endpoints, com $pedido fixado no pedido criado pela transação; os endpoints
+usados só pelo ciclo podem ter peso 0. Nos itens, o cliente, a condição de
+pagamento e a transportadora repetem os enviados no Criar (CAMPOS_DO_PEDIDO).
+"""
+import os
+import json
+import time
+import random
+from typing import Any, Dict
+
+from metricas import SUCESSO, ERRO_ESPERADO, ERRO
+
+# Listas de referência aceitas pelos geradores de mesmo nome
+REFERENCIAS_GERADORES = {
+    '$representante': 'representantes',
+    '$cliente': 'clientes',
+    '$cond_pagamento': 'cond_pagamento',
+    '$transportadora': 'transportadoras',
+    '$produto': 'produtos'
+}
+
+
+# Etapas do ciclo de vida de um pedido, na ordem em que acontecem
+CRIAR = 'criar'
+ITENS = 'itens'
+ALTERAR = 'alterar'
+EXCLUIR = 'excluir'
+FECHAR = 'fechar'
+IMPRIMIR = 'imprimir'
+ETAPAS_CICLO = (CRIAR, ITENS, ALTERAR, EXCLUIR, FECHAR, IMPRIMIR)
+
+# Endpoint do cenário usado em cada etapa do ciclo
+ENDPOINTS_CICLO = {
+    CRIAR: '/Pedido/Criar',
+    ITENS: '/EditaItemPedido/alterarQuantidade',
+    ALTERAR: '/EditaItemPedido/alterarQuantidade',
+    EXCLUIR: '/EditaItemPedido/excluirItem',
+    FECHAR: '/EditaItemPedido/fecharPedido',
+    IMPRIMIR: '/Pedido/imprime'
+}
+# Campo do produto na alteração de quantidade (na etapa ALTERAR, recebe um item já adicionado)
+CAMPO_PRODUTO = 'codProduto'
+# Campos dos itens (alterarQuantidade) -> campo do Criar cujo valor eles repetem na transação
+CAMPOS_DO_PEDIDO = {
+    'codCliente': 'CodCliente',
+    'codCondPagamento': 'CodCondPagamento',
+    'codTransportadora': 'CodTransportadora'
+}
+
+# Nome da transação nas métricas; as etapas são registradas como 'pedido/<etapa>'
+TRANSACAO_PEDIDO = 'pedido'
+
+# Ordem de gravidade dos resultados, para combinar os resultados das etapas
+GRAVIDADE = {SUCESSO: 0, ERRO_ESPERADO: 1, ERRO: 2}
+
+
+class RequisicaoIndisponivel(Exception):
+    """O endpoint sorteado depende de um estado que ainda não existe (ex.: nenhum pedido criado)"""
+
+
+class TabelaAlias:
+    """Sorteio ponderado em O(1) pelo método de alias de Vose"""
+
+    def __init__(self, pesos: list):
+        n = len(pesos)
+        total = float(sum(pesos))
+        escalados = [peso * n / total for peso in pesos]
+        self.probabilidades = [0.0] * n
+        self.alias = [0] * n
+        pequenos = [i for i, p in enumerate(escalados) if p < 1.0]
+        grandes = [i for i, p in enumerate(escalados) if p >= 1.0]
+        while pequenos and grandes:
+            menor = pequenos.pop()
+            maior = grandes.pop()
+            self.probabilidades[menor] = escalados[menor]
+            self.alias[menor] = maior
+            escalados[maior] -= 1.0 - escalados[menor]
+            (pequenos if escalados[maior] < 1.0 else grandes).append(maior)
+        # Sobras por arredondamento ficam com probabilidade 1
+        for i in grandes + pequenos:
+            self.probabilidades[i] = 1.0
+
+    def sortear(self, rng=random) -> int:
+        i = int(rng.random() * len(self.probabilidades))
+        return i if rng.random() < self.probabilidades[i] else self.alias[i]
+
+
+def _pedido(tester, contexto: Dict[str, Any]):
+    """Pedido da requisição corrente, sorteado na primeira vez que um gerador precisa dele"""
+    if 'pedido' not in contexto:
+        nro_pedido = tester.estado.pedido_aleatorio()
+        if nro_pedido is None:
+            raise RequisicaoIndisponivel()
+        contexto['pedido'] = nro_pedido
+    return contexto['pedido']
+
+
+def _cliente_do_pedido(tester, contexto):
+    cod_cliente = tester.estado.cliente_do_pedido(_pedido(tester, contexto))
+    if cod_cliente is None:
+        raise RequisicaoIndisponivel()
+    return cod_cliente
+
+
+def _item_do_pedido(tester, contexto):
+    item = tester.obter_item_aleatorio_do_pedido(_pedido(tester, contexto))
+    if item is None:
+        raise RequisicaoIndisponivel()
+    return item
+
+
+def compilar_valor(valor, referencias: Dict[str, list], gerar_textos, onde: str):
+    """Converte o valor declarado no cenário em um gerador (tester, contexto) -> valor, ou em uma constante"""
+    if not isinstance(valor, str) or not valor.startswith('$'):
+        return valor
+
+    nome, _, argumentos = valor.partition(':')
+    argumentos = argumentos.split(':') if argumentos else []
+    try:
+        if nome in REFERENCIAS_GERADORES:
+            lista = referencias[REFERENCIAS_GERADORES[nome]]
+            return lambda tester, contexto: random.choice(lista)
+        if nome == '$pedido':
+            return _pedido
+        if nome == '$cliente_do_pedido':
+            return _cliente_do_pedido
+        if nome == '$item_do_pedido':
+            return _item_do_pedido
+        if nome == '$texto':
+            textos = gerar_textos(int(argumentos[0]))
+            return lambda tester, contexto: random.choice(textos)
+        if nome == '$int':
+            minimo, maximo = int(argumentos[0]), int(argumentos[1])
+            return lambda tester, contexto: random.randint(minimo, maximo)
+        if nome == '$decimal':
+            minimo, maximo, casas = float(argumentos[0]), float(argumentos[1]), int(argumentos[2])
+            return lambda tester, contexto: round(random.uniform(minimo, maximo), casas)
+    except (IndexError, ValueError):
+        raise ValueError(f"Argumentos inválidos para o gerador '{valor}' em {onde}")
+    raise ValueError(f"Gerador desconhecido '{valor}' em {onde}")
+
+
+def _compilar_campos(campos: Dict[str, Any], referencias, gerar_textos, onde: str):
+    """Compila um dicionário de campos em uma lista (nome, gerador ou constante)"""
+    if campos is None:
+        return None
+    return [(nome, compilar_valor(valor, referencias, gerar_textos, f"{onde}.{nome}"))
+            for nome, valor in campos.items()]
+
+
+def _montar_campos(campos_compilados, tester, contexto):
+    if campos_compilados is None:
+        return None
+    return {nome: gerador(tester, contexto) if callable(gerador) else gerador
+            for nome, gerador in campos_compilados}
+
+
+class EndpointCompilado:
+    """Endpoint do cenário pronto para gerar requisições"""
+
+    def __init__(self, definicao: Dict[str, Any], referencias: Dict[str, list], gerar_textos, think_time_padrao):
+        self.template = definicao['endpoint']
+        self.method = definicao.get('method', 'GET').upper()
+        self.peso = float(definicao.get('peso', 1))
+        think_time = definicao.get('think_time', think_time_padrao)
+        self.think_time = (float(think_time[0]), float(think_time[1])) if think_time else (0.0, 0.0)
+        self.path = _compilar_campos(definicao.get('path'), referencias, gerar_textos, f"{self.template} path")
+        self.data = _compilar_campos(definicao.get('data'), referencias, gerar_textos, f"{self.template} data")
+        self.params = _compilar_campos(definicao.get('params'), referencias, gerar_textos, f"{self.template} params")
+
+    def montar(self, tester, contexto: Dict[str, Any] = None):
+        """
+        Retorna (endpoint, method, data, params, template) ou levanta RequisicaoIndisponivel
+
+        contexto pode trazer valores já fixados (ex.: o 'pedido' de uma transação).
+        """
+        contexto = {} if contexto is None else contexto
+        endpoint = self.template
+        if self.path:
+            endpoint = self.template.format(**_montar_campos(self.path, tester, contexto))
+        data = _montar_campos(self.data, tester, contexto)
+        params = _montar_campos(self.params, tester, contexto)
+        return endpoint, self.method, data, params, self.template
+
+
+def _intervalo(valor, onde: str) -> tuple:
+    try:
+        minimo, maximo = int(valor[0]), int(valor[1])
+    except (TypeError, IndexError, ValueError):
+        raise ValueError(f"{onde} deve ser uma lista [mínimo, máximo]")
+    if not 0 <= minimo <= maximo:
+        raise ValueError(f"{onde} deve ter 0 <= mínimo <= máximo")
+    return minimo, maximo
+
+
+class CicloPedido:
+    """Configuração compilada do bloco "ciclo_pedido" do cenário"""
+
+    def __init__(self, definicao: Dict[str, Any], endpoints: Dict[str, EndpointCompilado], think_time_padrao):
+        self.peso = float(definicao.get('peso', 1))
+        self.itens = _intervalo(definicao.get('itens', [1, 5]), 'ciclo_pedido.itens')
+        self.alteracoes = _intervalo(definicao.get('alteracoes', [0, 0]), 'ciclo_pedido.alteracoes')
+        self.exclusoes = _intervalo(definicao.get('exclusoes', [0, 0]), 'ciclo_pedido.exclusoes')
+        self.itens_paralelos = max(1, int(definicao.get('itens_paralelos', 1)))
+        self.imprimir = bool(definicao.get('imprimir', True))
+        think_time = definicao.get('think_time', think_time_padrao)
+        self.think_time = (float(think_time[0]), float(think_time[1])) if think_time else (0.0, 0.0)
+
+        usadas = {CRIAR: True, ITENS: self.itens[1] > 0, ALTERAR: self.alteracoes[1] > 0,
+                  EXCLUIR: self.exclusoes[1] > 0, FECHAR: True, IMPRIMIR: self.imprimir}
+        self.endpoints = {}
+        for etapa, usada in usadas.items():
+            if not usada:
+                continue
+            template = ENDPOINTS_CICLO[etapa]
+            if template not in endpoints:
+                raise ValueError(f"O ciclo_pedido usa o endpoint {template}, que não está na lista de endpoints")
+            self.endpoints[etapa] = endpoints[template]
+
+    def iniciar(self) -> 'TransacaoPedido':
+        return TransacaoPedido(self)
+
+
+class TransacaoPedido:
+    """
+    Máquina de estados do ciclo de vida de um pedido, independente do motor.
+
+    O motor pede as requisições da etapa corrente com proximo_lote, executa-as
+    (em paralelo, se puder) passando a cada uma o seu contexto, e devolve o
+    lote com concluir_lote; test_endpoint preenche no contexto o 'resultado' e,
+    no Criar, o 'pedido' criado. Sem pedido criado a transação termina; se o
+    fecharPedido falhar, o pedido não é impresso.
+
+    O resultado da transação é o pior entre o Criar e o fecharPedido (pedido
+    criado e fechado). As durações de cada etapa ficam em `etapas`.
+    """
+
+    def __init__(self, ciclo: CicloPedido):
+        self.ciclo = ciclo
+        self.etapa = CRIAR
+        self.nro_pedido = None
+        # Corpo enviado no Criar, de onde os itens copiam CAMPOS_DO_PEDIDO
+        self.dados_pedido = {}
+        self.resultado = SUCESSO
+        self.restantes = {
+            CRIAR: 1,
+            ITENS: random.randint(*ciclo.itens),
+            ALTERAR: random.randint(*ciclo.alteracoes),
+            EXCLUIR: random.randint(*ciclo.exclusoes),
+            FECHAR: 1,
+            IMPRIMIR: 1 if ciclo.imprimir else 0
+        }
+        # etapa -> (resultado, duração) das etapas executadas
+        self.etapas = {}
+        self._inicio_etapa = None
+        self._resultado_etapa = SUCESSO
+
+    def proximo_lote(self, tester) -> list:
+        """Pares (requisição, contexto) da etapa corrente; lista vazia quando a transação terminou"""
+        while self.etapa is not None:
+            if not self.restantes[self.etapa]:
+                self._avancar()
+                continue
+            quantidade = min(self.restantes[self.etapa], self.ciclo.itens_paralelos if self.etapa == ITENS else 1)
+            self.restantes[self.etapa] -= quantidade
+            lote = [par for par in (self._montar(tester) for _ in range(quantidade)) if par]
+            if lote:
+                if self._inicio_etapa is None:
+                    self._inicio_etapa = time.perf_counter()
+                return lote
+        return []
+
+    def concluir_lote(self, lote: list):
+        for _, contexto in lote:
+            resultado = contexto.get('resultado', ERRO)
+            if GRAVIDADE[resultado] > GRAVIDADE[self._resultado_etapa]:
+                self._resultado_etapa = resultado
+        if self.etapa == CRIAR:
+            requisicao, contexto = lote[0]
+            self.nro_pedido = contexto.get('pedido')
+            if isinstance(requisicao[2], dict):
+                self.dados_pedido = requisicao[2]
+            if self.nro_pedido is None:
+                self._piorar(ERRO if self._resultado_etapa == SUCESSO else self._resultado_etapa)
+                self._encerrar()
+        elif self.etapa == FECHAR:
+            self._piorar(self._resultado_etapa)
+            if self._resultado_etapa != SUCESSO:
+                self._encerrar()
+
+    def _montar(self, tester):
+        contexto = {} if self.etapa == CRIAR else {'pedido': self.nro_pedido}
+        try:
+            requisicao = self.ciclo.endpoints[self.etapa].montar(tester, contexto)
+        except RequisicaoIndisponivel:
+            return None
+        if self.etapa in (ITENS, ALTERAR) and isinstance(requisicao[2], dict):
+            # Os itens seguem as condições do pedido, como no Criar
+            for campo, campo_pedido in CAMPOS_DO_PEDIDO.items():
+                if campo in requisicao[2] and campo_pedido in self.dados_pedido:
+                    requisicao[2][campo] = self.dados_pedido[campo_pedido]
+        if self.etapa == ALTERAR:
+            # Altera a quantidade de um item que o pedido já tem
+            item = tester.obter_item_aleatorio_do_pedido(self.nro_pedido)
+            if item is None or not isinstance(requisicao[2], dict):
+                return None
+            requisicao[2][CAMPO_PRODUTO] = item
+        return requisicao, contexto
+
+    def _piorar(self, resultado: str):
+        if GRAVIDADE[resultado] > GRAVIDADE[self.resultado]:
+            self.resultado = resultado
+
+    def _fechar_etapa(self):
+        if self._inicio_etapa is not None:
+            self.etapas[self.etapa] = (self._resultado_etapa, time.perf_counter() - self._inicio_etapa)
+        self._inicio_etapa = None
+        self._resultado_etapa = SUCESSO
+
+    def _avancar(self):
+        self._fechar_etapa()
+        indice = ETAPAS_CICLO.index(self.etapa) + 1
+        self.etapa = ETAPAS_CICLO[indice] if indice < len(ETAPAS_CICLO) else None
+
+    def _encerrar(self):
+        self._fechar_etapa()
+        self.etapa = None
+
+
+class Cenario:
+    """Tabela de despacho compilada a partir do arquivo de cenário"""
+
+    def __init__(self, definicao: Dict[str, Any], referencias: Dict[str, list], gerar_textos):
+        think_time_padrao = definicao.get('think_time')
+        compilados = [EndpointCompilado(d, referencias, gerar_textos, think_time_padrao) for d in definicao['endpoints']]
+        self.ciclo = None
+        if definicao.get('ciclo_pedido'):
+            self.ciclo = CicloPedido(definicao['ciclo_pedido'], {e.template: e for e in compilados}, think_time_padrao)
+        # Opções sorteadas: os endpoints com peso positivo e, por último, o ciclo do pedido
+        self.endpoints = [e for e in compilados if e.peso > 0]
+        pesos = [e.peso for e in self.endpoints]
+        if self.ciclo and self.ciclo.peso > 0:
+            pesos.append(self.ciclo.peso)
+        if not pesos:
+            raise ValueError("O cenário não tem nenhum endpoint com peso positivo")
+        self.tabela = TabelaAlias(pesos)
+        self.think_times = {e.template: e.think_time for e in self.endpoints}
+        if self.ciclo:
+            self.think_times[TRANSACAO_PEDIDO] = self.ciclo.think_time
+
+    def selecionar(self, tester):
+        """
+        Sorteia um endpoint pelo peso e monta a requisição correspondente.
+
+        Retorna uma tupla (endpoint, method, data, params, template), uma
+        TransacaoPedido quando o sorteado é o ciclo do pedido, ou None quando o
+        endpoint sorteado não pode ser testado no momento (ex.: ainda não há pedidos).
+        """
+        indice = self.tabela.sortear()
+        if indice == len(self.endpoints):
+            return self.ciclo.iniciar()
+        try:
+            return self.endpoints[indice].montar(tester)
+        except RequisicaoIndisponivel:
+            return None
+
+    def pausa(self, template: str) -> float:
+        """Think time sorteado para depois de uma requisição ao template (ou de uma TRANSACAO_PEDIDO)"""
+        minimo, maximo = self.think_times.get(template, (0.0, 0.0))
+        return random.uniform(minimo, maximo) if maximo > 0 else 0.0
+
+
+def ler_definicao(caminho: str) -> Dict[str, Any]:
+    """Lê o arquivo de cenário em JSON ou, pela extensão .yml/.yaml, em YAML"""
+    with open(caminho, 'r', encoding='utf-8') as f:
+        if os.path.splitext(caminho)[1].lower() in ('.yml', '.yaml'):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError(f"Instale o PyYAML para usar o cenário {caminho} (pip install pyyaml)")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def carregar_cenario(caminho: str, referencias: Dict[str, list], gerar_textos) -> Cenario:
+    """Lê e compila o cenário; gerar_textos(max_caracteres) retorna o pool de textos de $texto"""
+    return Cenario(ler_definicao(caminho), referencias, gerar_textos)
@@ -0,0 +1,82 @@
+"""
+Classificação das respostas de erro esperadas.
+
+Algumas respostas de erro da API SRPP são consequência normal do teste (ex.:
+excluir um item que outro usuário já excluiu) e não falhas da API. Elas são
+descritas em regras num arquivo JSON (erros_esperados.json, ou o indicado em
+ERROS_ESPERADOS), cada uma com:
+
+    endpoint  template do endpoint, como no cenário
+    status    status HTTP da resposta
+    contem    (opcional) trecho que o início do corpo deve conter
+    mensagem  texto registrado, com {campo} preenchido pelo corpo ou query da requisição
+
+As regras são compiladas numa tabela (template, status) -> regras: uma resposta
+só é comparada com as regras do seu endpoint e status. Do corpo das respostas de
+erro só são lidos os primeiros LIMITE_CORPO bytes; o trecho de "contem" é
+procurado como está e também escapado em JSON (\\u00f3), como a API pode enviá-lo.
+"""
+import json
+from typing import Any, Dict
+
+# Bytes lidos do corpo das respostas de erro (classificação e log)
+LIMITE_CORPO = 4096
+
+
+class _Campos(dict):
+    def __missing__(self, chave):
+        return 'desconhecido'
+
+
+class Regra:
+    """Regra compilada de um erro esperado"""
+
+    __slots__ = ('template', 'status', 'trechos', 'mensagem')
+
+    def __init__(self, definicao: Dict[str, Any]):
+        try:
+            self.template = definicao['endpoint']
+            self.status = int(definicao['status'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Regra de erro esperado sem endpoint ou status válido: {definicao}")
+        contem = definicao.get('contem')
+        self.trechos = tuple({contem, json.dumps(contem)[1:-1]}) if contem else ()
+        self.mensagem = definicao.get('mensagem', f"Erro esperado {self.status} em {self.template}")
+
+    def aplica(self, corpo: str) -> bool:
+        return not self.trechos or any(trecho in corpo for trecho in self.trechos)
+
+    def descrever(self, data: Dict[str, Any] = None, params: Dict[str, Any] = None) -> str:
+        campos = _Campos()
+        for origem in (params, data):
+            if isinstance(origem, dict):
+                campos.update(origem)
+        return self.mensagem.format_map(campos)
+
+
+class Classificador:
+    """Tabela (template, status) -> regras de erro esperado"""
+
+    def __init__(self, regras: list):
+        self.tabela: Dict[tuple, list] = {}
+        for definicao in regras:
+            regra = Regra(definicao)
+            self.tabela.setdefault((regra.template, regra.status), []).append(regra)
+
+    def classificar(self, template: str, status: int, corpo: str):
+        """Regra de erro esperado que corresponde à resposta, ou None se a resposta não é um erro esperado"""
+        regras = self.tabela.get((template, status))
+        if regras:
+            for regra in regras:
+                if regra.aplica(corpo):
+                    return regra
+        return None
+
+
+def carregar_classificador(caminho: str) -> Classificador:
+    """Lê as regras do arquivo; sem o arquivo, nenhuma resposta de erro é considerada esperada"""
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return Classificador(json.load(f))
+    except FileNotFoundError:
+        return Classificador([])
@@ -0,0 +1,92 @@
+"""
+Compara duas execuções do robô e falha se a atual regrediu em relação à base.
+
+Usa os resumos gravados com api_tester.py --export (arquivo .resumo.json, ou o
+próprio arquivo da série). Para cada endpoint com requisições suficientes nas
+duas execuções, compara o p99 e a taxa de erros (sem os erros esperados):
+
+    python comparar.py base.jsonl atual.jsonl
+    python comparar.py base.jsonl atual.jsonl --max-p99-increase 20 --max-error-increase 0.5
+
+Sai com código 1 se algum endpoint (ou o total) regrediu além dos limites, para
+servir de portão na implantação de uma nova versão da API; 0 caso contrário.
+"""
+import sys
+import argparse
+
+from exportacao import ler_resumo
+from metricas import Metricas, ERRO
+
+TOTAL = '(total)'
+
+
+def taxa_erros(metricas: Metricas, endpoint: str = None) -> float:
+    total = metricas.contagem(endpoint)
+    return 100 * metricas.contagem(endpoint, ERRO) / total if total else 0.0
+
+
+def comparar(base: Metricas, atual: Metricas, max_p99: float, max_erros: float, min_requisicoes: int) -> list:
+    """
+    Retorna as regressões encontradas e imprime a comparação por endpoint.
+
+    max_p99 é o aumento máximo do p99 em %, max_erros o aumento máximo da taxa
+    de erros em pontos percentuais.
+    """
+    regressoes = []
+    print(f"{'Endpoint':<50}{'Reqs base':>10}{'Reqs atual':>11}{'p99 base':>10}{'p99 atual':>10}{'var.':>8}"
+          f"{'Erros base':>11}{'Erros atual':>12}")
+    for endpoint in sorted(set(base.endpoints()) | set(atual.endpoints())) + [TOTAL]:
+        filtro = None if endpoint == TOTAL else endpoint
+        h_base, h_atual = base.combinado(filtro), atual.combinado(filtro)
+        if h_base.total < min_requisicoes or h_atual.total < min_requisicoes:
+            print(f"{endpoint:<50}{h_base.total:>10}{h_atual.total:>11}   (requisições insuficientes para comparar)")
+            continue
+        p99_base, p99_atual = h_base.percentil(99), h_atual.percentil(99)
+        variacao = (p99_atual / p99_base - 1) * 100 if p99_base else 0.0
+        erros_base, erros_atual = taxa_erros(base, filtro), taxa_erros(atual, filtro)
+        motivos = []
+        if variacao > max_p99:
+            motivos.append(f"p99 {variacao:+.1f}%")
+        if erros_atual - erros_base > max_erros:
+            motivos.append(f"erros {erros_atual - erros_base:+.2f} p.p.")
+        print(f"{endpoint:<50}{h_base.total:>10}{h_atual.total:>11}{p99_base * 1000:>10.1f}{p99_atual * 1000:>10.1f}"
+              f"{variacao:>+7.1f}%{erros_base:>10.2f}%{erros_atual:>11.2f}%"
+              + (f"  REGRESSÃO: {', '.join(motivos)}" if motivos else ''))
+        if motivos:
+            regressoes.append((endpoint, motivos))
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara duas execuções do robô (resumos de --export)")
+    parser.add_argument('base', help="Execução de referência (.resumo.json ou o arquivo da série)")
+    parser.add_argument('atual', help="Execução a avaliar (.resumo.json ou o arquivo da série)")
+    parser.add_argument('--max-p99-increase', type=float, default=10.0,
+                        help="Aumento máximo aceito do p99, em %% (padrão: 10)")
+    parser.add_argument('--max-error-increase', type=float, default=1.0,
+                        help="Aumento máximo aceito da taxa de erros, em pontos percentuais (padrão: 1)")
+    parser.add_argument('--min-requests', type=int, default=100,
+                        help="Requisições mínimas de um endpoint nas duas execuções para compará-lo (padrão: 100)")
+    args = parser.parse_args()
+    try:
+        base, atual = ler_resumo(args.base), ler_resumo(args.atual)
+    except (OSError, ValueError, KeyError) as e:
+        parser.error(f"Resumo inválido: {e}")
+
+    print(f"Base: {args.base} ({base['duracao']:.0f}s)  Atual: {args.atual} ({atual['duracao']:.0f}s)\n")
+    for nome, resumo in (('base', base), ('atual', atual)):
+        gerador = resumo.get('gerador')
+        if gerador and not gerador['valida']:
+            print(f"Aviso: a execução {nome} foi marcada como inválida (gerador saturado em "
+                  f"{gerador['intervalos_saturados']} de {gerador['intervalos']} intervalos); as latências dela estão infladas\n")
+    regressoes = comparar(base['metricas'], atual['metricas'], args.max_p99_increase,
+                          args.max_error_increase, args.min_requests)
+    if regressoes:
+        print(f"\n{len(regressoes)} regressão(ões) além dos limites (p99 +{args.max_p99_increase:g}%, "
+              f"erros +{args.max_error_increase:g} p.p.)")
+        sys.exit(1)
+    print("\nSem regressões além dos limites")
+
+
+if __name__ == "__main__":
+    main()
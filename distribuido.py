@@ -0,0 +1,251 @@
+"""
+Modo distribuído: um controlador dirige agentes de carga em várias máquinas.
+
+Cada agente é um servidor HTTP (python distribuido.py --host 0.0.0.0 --port 9100)
+com um número fixo de processos worker. O controlador
+(python api_tester.py --agents host1:9100,host2:9100) faz:
+
+    GET  /info      quantos workers o agente tem e se está ocupado
+    POST /executar  inicia os workers indicados com as opções da carga; a
+                    resposta é um fluxo com uma linha JSON por parcial
+
+Os workers de todos os agentes são numerados globalmente e cada um recebe a sua
+fatia da carga (usuários, taxa de chegada, limite de requisições em andamento),
+dos pedidos (nro_pedido % total de workers) e dos clientes, como no modo
+--workers. O controlador combina um instante de início comum, envia o cenário,
+a API_BASE_URL e os dados de referência que ele obteve (ver
+referencias.obter_referencias) e mescla as parciais por segundo num único painel
+e num único relatório final.
+
+O início sincronizado usa o relógio de cada máquina: mantenha-os sincronizados
+(NTP). O log e o banco de estado dos pedidos são os locais de cada agente. Com
+AGENTES_TOKEN definido, agente e controlador exigem o mesmo token no cabeçalho
+X-Token.
+"""
+import os
+import hmac
+import json
+import time
+import queue
+import asyncio
+import argparse
+import multiprocessing
+
+import aiohttp
+from aiohttp import web
+
+import api_tester
+from agendador import Estagio
+from cenarios import ler_definicao
+from metricas import Metricas
+
+PORTA_PADRAO = 9100
+CABECALHO_TOKEN = 'X-Token'
+# Folga entre o envio das opções e o início da carga, para os workers de todos os agentes se prepararem
+ATRASO_INICIO = float(os.getenv('AGENTES_ATRASO_INICIO', 5.0))
+# Sem nenhuma parcial de um agente por este tempo (s), o controlador desiste dele
+TEMPO_SEM_PARCIAIS = 60
+
+# Opções da carga repassadas aos agentes como estão (as demais são convertidas ou locais)
+OPCOES_REPASSADAS = ('usuarios', 'duracao', 'chegadas', 'max_em_andamento', 'semente', 'log_nivel', 'log_fila', 'referencias')
+
+
+def opcoes_para_envio(opcoes: dict, inicio: float) -> dict:
+    """Opções da carga em JSON: o cenário vai já lido e o perfil, como lista de estágios"""
+    enviadas = {chave: opcoes[chave] for chave in OPCOES_REPASSADAS}
+    enviadas['cenario'] = ler_definicao(opcoes['cenario'])
+    enviadas['perfil'] = [[e.duracao, e.taxa_inicial, e.taxa_final] for e in opcoes['perfil']] if opcoes.get('perfil') else None
+    enviadas['api_base_url'] = api_tester.API_BASE_URL
+    enviadas['inicio'] = inicio
+    return enviadas
+
+
+def opcoes_recebidas(enviadas: dict) -> dict:
+    """Reconstrói no agente as opções de executar_worker a partir de opcoes_para_envio"""
+    opcoes = dict(enviadas)
+    opcoes['perfil'] = [Estagio(*estagio) for estagio in enviadas['perfil']] if enviadas.get('perfil') else None
+    opcoes['log_arquivo'] = api_tester.LOG_ARQUIVO
+    return opcoes
+
+
+def _ler_fila(fila):
+    try:
+        return fila.get(timeout=1)
+    except queue.Empty:
+        return None
+
+
+class Agente:
+    """Servidor de controle de um agente: executa uma carga por vez com os seus workers"""
+
+    def __init__(self, num_workers: int, token: str = ''):
+        self.num_workers = num_workers
+        self.token = token
+        self.ocupado = False
+        # spawn: o agente tem threads (laço de eventos, executor) e fork com threads não é seguro
+        self.contexto = multiprocessing.get_context('spawn')
+
+    def criar_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.autenticar])
+        app.router.add_get('/info', self.info)
+        app.router.add_post('/executar', self.executar)
+        return app
+
+    @web.middleware
+    async def autenticar(self, request, handler):
+        if self.token and not hmac.compare_digest(request.headers.get(CABECALHO_TOKEN, ''), self.token):
+            return web.json_response({'errorMessage': 'Token inválido'}, status=401)
+        return await handler(request)
+
+    async def info(self, request):
+        return web.json_response({'workers': self.num_workers, 'ocupado': self.ocupado})
+
+    async def executar(self, request):
+        if self.ocupado:
+            return web.json_response({'errorMessage': 'Agente ocupado com outra carga'}, status=409)
+        self.ocupado = True
+        processos = []
+        try:
+            pedido = await request.json()
+            workers, num_workers = pedido['workers'], pedido['num_workers']
+            opcoes = opcoes_recebidas(pedido['opcoes'])
+            resposta = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+            await resposta.prepare(request)
+
+            fila = self.contexto.Queue()
+            for worker_id in workers:
+                processo = self.contexto.Process(
+                    target=api_tester.executar_worker,
+                    args=(worker_id, num_workers, api_tester.opcoes_worker(opcoes, worker_id, num_workers), fila),
+                    name=f"worker-{worker_id}"
+                )
+                processo.start()
+                processos.append(processo)
+            print(f"Executando os workers {workers} de {num_workers}")
+
+            loop = asyncio.get_running_loop()
+            finalizados = set()
+            while len(finalizados) < len(workers):
+                mensagem = await loop.run_in_executor(None, _ler_fila, fila)
+                if mensagem is None:
+                    if all(not processo.is_alive() for processo in processos):
+                        print(f"Aviso: {len(workers) - len(finalizados)} worker(s) terminaram sem enviar resultados")
+                        break
+                    continue
+                mensagem['parcial']['metricas'] = mensagem['parcial']['metricas'].para_dict()
+                await resposta.write(json.dumps(mensagem).encode() + b'\n')
+                if mensagem['tipo'] == 'fim':
+                    finalizados.add(mensagem['worker'])
+            await resposta.write_eof()
+            print("Carga concluída")
+            return resposta
+        finally:
+            # Se o controlador desconectou no meio da carga, os workers não têm mais para quem reportar
+            for processo in processos:
+                if processo.is_alive():
+                    processo.terminate()
+                processo.join()
+            self.ocupado = False
+
+
+async def _info(sessao: aiohttp.ClientSession, agente: str) -> dict:
+    try:
+        async with sessao.get(f"http://{agente}/info") as resposta:
+            dados = await resposta.json()
+            if resposta.status != 200:
+                raise RuntimeError(f"Agente {agente} recusou a conexão: {dados.get('errorMessage', resposta.status)}")
+            if dados['ocupado']:
+                raise RuntimeError(f"Agente {agente} está ocupado com outra carga")
+            return dados
+    except aiohttp.ClientError as e:
+        raise RuntimeError(f"Agente {agente} inacessível: {e}")
+
+
+async def executar_distribuido(agentes: list, opcoes: dict, painel=None, token: str = api_tester.AGENTES_TOKEN) -> api_tester.APITester:
+    """
+    Controlador: distribui a carga entre os workers dos agentes e mescla as parciais recebidas.
+
+    agentes é a lista "host:porta". Retorna um APITester com os resultados de todos os agentes.
+    """
+    coordenador = api_tester.APITester()
+    cabecalhos = {CABECALHO_TOKEN: token} if token else {}
+    tempo_limite = aiohttp.ClientTimeout(total=None, connect=10, sock_read=ATRASO_INICIO + TEMPO_SEM_PARCIAIS)
+    async with aiohttp.ClientSession(headers=cabecalhos, timeout=tempo_limite) as sessao:
+        infos = await asyncio.gather(*(_info(sessao, agente) for agente in agentes))
+        num_workers = sum(info['workers'] for info in infos)
+        workers_por_agente, proximo = [], 0
+        for info in infos:
+            workers_por_agente.append(list(range(proximo, proximo + info['workers'])))
+            proximo += info['workers']
+
+        inicio = time.time() + ATRASO_INICIO
+        coordenador.metricas.inicio = inicio
+        enviadas = opcoes_para_envio(opcoes, inicio)
+        print(f"Distribuindo a carga entre {num_workers} workers de {len(agentes)} agentes; início em {ATRASO_INICIO:g}s")
+
+        finalizados = set()
+
+        def receber(mensagem: dict):
+            parcial = mensagem['parcial']
+            parcial['metricas'] = Metricas.de_dict(parcial['metricas'])
+            coordenador.mesclar_parcial(parcial, mensagem['worker'])
+            if mensagem['tipo'] == 'fim':
+                finalizados.add(mensagem['worker'])
+            if painel:
+                painel.tique(coordenador)
+
+        async def acompanhar(agente: str, workers: list):
+            corpo = {'workers': workers, 'num_workers': num_workers, 'opcoes': enviadas}
+            try:
+                async with sessao.post(f"http://{agente}/executar", json=corpo) as resposta:
+                    if resposta.status != 200:
+                        print(f"Aviso: agente {agente} recusou a carga ({resposta.status}): {await resposta.text()}")
+                        return
+                    # Uma parcial por linha; as linhas podem ser maiores que o buffer de leitura
+                    pendente = b''
+                    async for dados in resposta.content.iter_any():
+                        *linhas, pendente = (pendente + dados).split(b'\n')
+                        for linha in linhas:
+                            if linha:
+                                receber(json.loads(linha))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Aviso: conexão com o agente {agente} perdida: {e!r}")
+
+        await asyncio.gather(*(acompanhar(agente, workers) for agente, workers in zip(agentes, workers_por_agente)))
+
+    if len(finalizados) < num_workers:
+        print(f"Aviso: {num_workers - len(finalizados)} worker(s) não enviaram o resultado final")
+    return coordenador
+
+
+def interpretar_agentes(texto: str) -> list:
+    """Converte "host1:9100,host2" em ["host1:9100", "host2:9100"]"""
+    agentes = []
+    for agente in texto.split(','):
+        agente = agente.strip()
+        if agente:
+            agentes.append(agente if ':' in agente else f"{agente}:{PORTA_PADRAO}")
+    if not agentes:
+        raise ValueError("Nenhum agente informado")
+    return agentes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agente de carga do modo distribuído (controlado por api_tester.py --agents)")
+    parser.add_argument('--host', default='127.0.0.1', help="Endereço de escuta (0.0.0.0 para aceitar outras máquinas)")
+    parser.add_argument('--port', type=int, default=PORTA_PADRAO, help="Porta de controle")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Processos worker deste agente")
+    parser.add_argument('--token', default=api_tester.AGENTES_TOKEN, help="Token exigido do controlador (padrão: AGENTES_TOKEN)")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers deve ser pelo menos 1")
+    if not args.token and args.host not in ('127.0.0.1', 'localhost', '::1'):
+        print("Aviso: agente acessível pela rede sem token; qualquer um que alcance a porta pode disparar cargas")
+
+    agente = Agente(args.workers, args.token)
+    print(f"Agente com {args.workers} workers escutando em {args.host}:{args.port}")
+    web.run_app(agente.criar_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
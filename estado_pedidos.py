@@ -0,0 +1,453 @@
+"""
+Estado dos pedidos criados pelo robô de testes.
+
+EstadoPedidos guarda em memória os pedidos, seus itens e clientes, com
+inclusão, consulta, sorteio e remoção em O(1) e locks por fatia de pedidos.
+
+ArmazemPedidos é a persistência desse estado. Substitui a regravação completa
+de pedidos_criados.json, itens_por_pedido.json e pedidos_clientes.json a cada
+requisição por um banco SQLite em modo WAL: cada alteração é um INSERT/DELETE de
+custo constante e os commits (e o fsync que cada um implica) são feitos em
+lotes. Vários processos podem abrir o mesmo banco. Pedidos fechados no modo
+soak continuam no banco, marcados em pedidos_fechados, e não são carregados de
+novo.
+"""
+import os
+import json
+import time
+import random
+import sqlite3
+import argparse
+import threading
+from collections import deque
+
+ARQUIVO_PEDIDOS_CRIADOS = 'pedidos_criados.json'
+ARQUIVO_ITENS_POR_PEDIDO = 'itens_por_pedido.json'
+ARQUIVO_PEDIDOS_CLIENTES = 'pedidos_clientes.json'
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS pedidos_criados (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    nro_pedido INTEGER NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS pedidos_clientes (
+    nro_pedido INTEGER PRIMARY KEY,
+    cod_cliente
+);
+CREATE TABLE IF NOT EXISTS itens_pedido (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    nro_pedido INTEGER NOT NULL,
+    cod_produto TEXT NOT NULL,
+    UNIQUE (nro_pedido, cod_produto)
+);
+CREATE TABLE IF NOT EXISTS pedidos_fechados (
+    nro_pedido INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS meta (
+    chave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+
+class ConjuntoIndexado:
+    """
+    Conjunto com inclusão, pertinência, sorteio uniforme e remoção em O(1).
+
+    Os elementos ficam numa lista e um dicionário guarda a posição de cada um;
+    a remoção move o último elemento para a posição liberada.
+    """
+
+    __slots__ = ('_elementos', '_posicoes')
+
+    def __init__(self, elementos=()):
+        self._elementos = []
+        self._posicoes = {}
+        for elemento in elementos:
+            self.adicionar(elemento)
+
+    def adicionar(self, elemento) -> bool:
+        if elemento in self._posicoes:
+            return False
+        self._posicoes[elemento] = len(self._elementos)
+        self._elementos.append(elemento)
+        return True
+
+    def remover(self, elemento) -> bool:
+        posicao = self._posicoes.pop(elemento, None)
+        if posicao is None:
+            return False
+        ultimo = self._elementos.pop()
+        if posicao < len(self._elementos):
+            self._elementos[posicao] = ultimo
+            self._posicoes[ultimo] = posicao
+        return True
+
+    def sortear(self):
+        """Elemento aleatório (uniforme) ou None se o conjunto estiver vazio"""
+        return random.choice(self._elementos) if self._elementos else None
+
+    def __contains__(self, elemento) -> bool:
+        return elemento in self._posicoes
+
+    def __len__(self) -> int:
+        return len(self._elementos)
+
+    def __iter__(self):
+        return iter(list(self._elementos))
+
+
+class _Fatia:
+    """Pedidos com o mesmo nro_pedido % NUM_FATIAS, protegidos por um único lock"""
+
+    __slots__ = ('lock', 'pedidos', 'itens', 'clientes')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pedidos = ConjuntoIndexado()
+        self.itens = {}
+        self.clientes = {}
+
+
+class EstadoPedidos:
+    """
+    Pedidos criados, itens de cada pedido e cliente de cada pedido, em memória.
+
+    Os pedidos são distribuídos em NUM_FATIAS fatias por nro_pedido, cada uma
+    com seu próprio lock: threads que alteram pedidos diferentes raramente
+    disputam o mesmo lock. Todas as operações são O(1), exceto o sorteio de um
+    pedido, que percorre o tamanho das fatias (O(NUM_FATIAS)).
+
+    Com um ArmazemPedidos, cada alteração efetiva também é gravada no banco.
+
+    A ordem de criação dos pedidos é guardada para retirar_antigos (modo soak),
+    que mantém o estado limitado descartando os pedidos mais antigos. Pedidos
+    retirados saem só da memória; os fechados (fechar_pedido) também são
+    marcados no banco, para não voltarem ao estado na próxima execução.
+    """
+
+    NUM_FATIAS = 64
+
+    def __init__(self, armazem: 'ArmazemPedidos' = None):
+        self.armazem = armazem
+        self._fatias = [_Fatia() for _ in range(self.NUM_FATIAS)]
+        # Pedidos em ordem de criação; pode conter pedidos já removidos (ver retirar_antigos)
+        self._ordem = deque()
+        self._lock_ordem = threading.Lock()
+
+    def _fatia(self, nro_pedido: int) -> _Fatia:
+        return self._fatias[nro_pedido % self.NUM_FATIAS]
+
+    def carregar(self, pedidos_criados: list, itens_por_pedido: dict, pedidos_clientes: dict):
+        """Acrescenta o estado lido do banco (ou dos arquivos JSON antigos), sem regravá-lo"""
+        for nro in pedidos_criados:
+            nro = int(nro)
+            if self._fatia(nro).pedidos.adicionar(nro):
+                self._ordem.append(nro)
+        for nro, itens in itens_por_pedido.items():
+            nro = int(nro)
+            conjunto = self._fatia(nro).itens.setdefault(nro, ConjuntoIndexado())
+            for cod_produto in itens:
+                conjunto.adicionar(cod_produto)
+        for nro, cod_cliente in pedidos_clientes.items():
+            nro = int(nro)
+            self._fatia(nro).clientes[nro] = cod_cliente
+
+    def restringir(self, pertence):
+        """Descarta os pedidos para os quais pertence(nro_pedido) é falso"""
+        for fatia in self._fatias:
+            with fatia.lock:
+                for nro in fatia.pedidos:
+                    if not pertence(nro):
+                        fatia.pedidos.remover(nro)
+                fatia.itens = {nro: itens for nro, itens in fatia.itens.items() if pertence(nro)}
+                fatia.clientes = {nro: cliente for nro, cliente in fatia.clientes.items() if pertence(nro)}
+        with self._lock_ordem:
+            self._ordem = deque(nro for nro in self._ordem if pertence(nro))
+
+    def adicionar_pedido(self, nro_pedido: int) -> bool:
+        nro_pedido = int(nro_pedido)
+        fatia = self._fatia(nro_pedido)
+        with fatia.lock:
+            novo = fatia.pedidos.adicionar(nro_pedido)
+        if novo:
+            # retirar_antigos pode trocar a fila enquanto segura o lock: sem ele a inclusão se perderia
+            with self._lock_ordem:
+                self._ordem.append(nro_pedido)
+            if self.armazem:
+                self.armazem.adicionar_pedido(nro_pedido)
+        return novo
+
+    def remover_pedido(self, nro_pedido: int) -> bool:
+        """Retira o pedido, seus itens e seu cliente da memória (o banco não é alterado)"""
+        nro_pedido = int(nro_pedido)
+        fatia = self._fatia(nro_pedido)
+        with fatia.lock:
+            removido = fatia.pedidos.remover(nro_pedido)
+            fatia.itens.pop(nro_pedido, None)
+            fatia.clientes.pop(nro_pedido, None)
+        return removido
+
+    def fechar_pedido(self, nro_pedido: int) -> bool:
+        """Retira da memória um pedido fechado na API e o marca como fechado no banco"""
+        removido = self.remover_pedido(nro_pedido)
+        if self.armazem:
+            self.armazem.marcar_fechado(nro_pedido)
+        return removido
+
+    def retirar_antigos(self, maximo: int) -> int:
+        """Remove os pedidos mais antigos até restarem no máximo `maximo`; retorna quantos foram removidos"""
+        retirados = 0
+        with self._lock_ordem:
+            while len(self) > maximo and self._ordem:
+                if self.remover_pedido(self._ordem.popleft()):
+                    retirados += 1
+            # Pedidos removidos por fora (ex.: fechados) continuam na fila até ela passar do dobro do estado
+            if len(self._ordem) > 2 * max(len(self), maximo):
+                self._ordem = deque(nro for nro in self._ordem if self.contem_pedido(nro))
+        return retirados
+
+    def contem_pedido(self, nro_pedido: int) -> bool:
+        nro_pedido = int(nro_pedido)
+        return nro_pedido in self._fatia(nro_pedido).pedidos
+
+    def pedido_aleatorio(self):
+        """Pedido sorteado uniformemente entre todos, ou None se não houver pedidos"""
+        while True:
+            tamanhos = [len(fatia.pedidos) for fatia in self._fatias]
+            total = sum(tamanhos)
+            if not total:
+                return None
+            sorteado = random.randrange(total)
+            for fatia, tamanho in zip(self._fatias, tamanhos):
+                if sorteado < tamanho:
+                    break
+                sorteado -= tamanho
+            with fatia.lock:
+                nro_pedido = fatia.pedidos.sortear()
+            # A fatia pode ter sido esvaziada por outra thread depois da leitura dos tamanhos
+            if nro_pedido is not None:
+                return nro_pedido
+
+    def associar_cliente(self, nro_pedido: int, cod_cliente):
+        nro_pedido = int(nro_pedido)
+        fatia = self._fatia(nro_pedido)
+        with fatia.lock:
+            fatia.clientes[nro_pedido] = cod_cliente
+        if self.armazem:
+            self.armazem.associar_cliente(nro_pedido, cod_cliente)
+
+    def cliente_do_pedido(self, nro_pedido: int):
+        """Cliente usado na criação do pedido, ou None se não for conhecido"""
+        nro_pedido = int(nro_pedido)
+        return self._fatia(nro_pedido).clientes.get(nro_pedido)
+
+    def adicionar_item(self, nro_pedido: int, cod_produto) -> bool:
+        nro_pedido = int(nro_pedido)
+        fatia = self._fatia(nro_pedido)
+        with fatia.lock:
+            # Resposta atrasada de um pedido já retirado (modo soak): não recria os seus itens
+            if nro_pedido not in fatia.pedidos:
+                return False
+            itens = fatia.itens.get(nro_pedido)
+            if itens is None:
+                itens = fatia.itens[nro_pedido] = ConjuntoIndexado()
+            novo = itens.adicionar(cod_produto)
+        if novo and self.armazem:
+            self.armazem.adicionar_item(nro_pedido, cod_produto)
+        return novo
+
+    def remover_item(self, nro_pedido: int, cod_produto) -> bool:
+        nro_pedido = int(nro_pedido)
+        fatia = self._fatia(nro_pedido)
+        with fatia.lock:
+            itens = fatia.itens.get(nro_pedido)
+            removido = itens is not None and itens.remover(cod_produto)
+        if removido and self.armazem:
+            self.armazem.remover_item(nro_pedido, cod_produto)
+        return removido
+
+    def item_aleatorio(self, nro_pedido: int):
+        """Código de produto aleatório entre os itens do pedido, ou None se ele não tiver itens"""
+        nro_pedido = int(nro_pedido)
+        fatia = self._fatia(nro_pedido)
+        with fatia.lock:
+            itens = fatia.itens.get(nro_pedido)
+            return itens.sortear() if itens is not None else None
+
+    def __len__(self) -> int:
+        return sum(len(fatia.pedidos) for fatia in self._fatias)
+
+    def pedidos_com_itens(self) -> int:
+        return sum(1 for fatia in self._fatias for itens in list(fatia.itens.values()) if itens)
+
+    def pedidos_com_cliente(self) -> int:
+        return sum(len(fatia.clientes) for fatia in self._fatias)
+
+
+class ArmazemPedidos:
+    """
+    Estado dos pedidos em SQLite (WAL) com commits em lote.
+
+    As alterações são acumuladas em memória e gravadas numa única transação
+    curta a cada lote_commit operações ou intervalo_commit segundos, o que vier
+    primeiro; assim o lock de escrita do banco só é segurado durante a gravação
+    e outros processos não ficam bloqueados entre um lote e outro. Um processo
+    que morre perde no máximo o lote corrente; o SQLite garante que o banco
+    volta consistente na próxima abertura.
+    """
+
+    def __init__(self, caminho: str = 'estado_pedidos.db', lote_commit: int = 200, intervalo_commit: float = 1.0):
+        self.caminho = caminho
+        self.lote_commit = lote_commit
+        self.intervalo_commit = intervalo_commit
+        self._lock = threading.Lock()
+        self._pendentes = []
+        self._ultimo_commit = time.monotonic()
+        # isolation_level=None: as transações são controladas explicitamente com BEGIN/COMMIT
+        self.conexao = sqlite3.connect(caminho, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=FULL")
+        self.conexao.executescript(ESQUEMA)
+
+    def carregar(self) -> tuple[list, dict, dict]:
+        """
+        Retorna (pedidos_criados, itens_por_pedido, pedidos_clientes), incluindo as alterações pendentes.
+
+        Os pedidos fechados (e seus itens e clientes) ficam de fora.
+        """
+        ativo = "nro_pedido NOT IN (SELECT nro_pedido FROM pedidos_fechados)"
+        with self._lock:
+            self._commit()
+            pedidos_criados = [nro for (nro,) in self.conexao.execute(
+                f"SELECT nro_pedido FROM pedidos_criados WHERE {ativo} ORDER BY seq")]
+            itens_por_pedido = {}
+            for nro, cod_produto in self.conexao.execute(
+                    f"SELECT nro_pedido, cod_produto FROM itens_pedido WHERE {ativo} ORDER BY seq"):
+                itens_por_pedido.setdefault(nro, []).append(cod_produto)
+            pedidos_clientes = dict(self.conexao.execute(
+                f"SELECT nro_pedido, cod_cliente FROM pedidos_clientes WHERE {ativo}"))
+        return pedidos_criados, itens_por_pedido, pedidos_clientes
+
+    def _executar(self, sql: str, parametros: tuple):
+        """Acumula uma alteração e grava o lote se ele estiver cheio ou antigo"""
+        with self._lock:
+            self._pendentes.append((sql, parametros))
+            if len(self._pendentes) >= self.lote_commit or time.monotonic() - self._ultimo_commit >= self.intervalo_commit:
+                self._commit()
+
+    def _commit(self):
+        if self._pendentes:
+            self.conexao.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, parametros in self._pendentes:
+                    self.conexao.execute(sql, parametros)
+                self.conexao.execute("COMMIT")
+            except Exception:
+                self.conexao.execute("ROLLBACK")
+                raise
+            self._pendentes = []
+        self._ultimo_commit = time.monotonic()
+
+    def commit(self):
+        """Confirma imediatamente as alterações pendentes"""
+        with self._lock:
+            self._commit()
+
+    def adicionar_pedido(self, nro_pedido: int):
+        self._executar("INSERT OR IGNORE INTO pedidos_criados (nro_pedido) VALUES (?)", (int(nro_pedido),))
+
+    def associar_cliente(self, nro_pedido: int, cod_cliente):
+        self._executar("INSERT OR REPLACE INTO pedidos_clientes (nro_pedido, cod_cliente) VALUES (?, ?)",
+                       (int(nro_pedido), cod_cliente))
+
+    def adicionar_item(self, nro_pedido: int, cod_produto: str):
+        self._executar("INSERT OR IGNORE INTO itens_pedido (nro_pedido, cod_produto) VALUES (?, ?)",
+                       (int(nro_pedido), cod_produto))
+
+    def remover_item(self, nro_pedido: int, cod_produto: str):
+        self._executar("DELETE FROM itens_pedido WHERE nro_pedido = ? AND cod_produto = ?",
+                       (int(nro_pedido), cod_produto))
+
+    def marcar_fechado(self, nro_pedido: int):
+        self._executar("INSERT OR IGNORE INTO pedidos_fechados (nro_pedido) VALUES (?)", (int(nro_pedido),))
+
+    def migrado(self) -> bool:
+        """Indica se os arquivos JSON antigos já foram importados neste banco"""
+        with self._lock:
+            linha = self.conexao.execute("SELECT valor FROM meta WHERE chave = 'migrado_json'").fetchone()
+        return linha is not None
+
+    def importar_json(self, diretorio: str = '.') -> int:
+        """
+        Importa pedidos_criados.json, itens_por_pedido.json e pedidos_clientes.json.
+
+        Os arquivos não são alterados. Retorna o número de pedidos importados.
+        """
+        def ler(nome, padrao):
+            caminho = os.path.join(diretorio, nome)
+            if not os.path.exists(caminho):
+                return padrao
+            with open(caminho, 'r') as f:
+                return json.load(f)
+
+        pedidos_criados = ler(ARQUIVO_PEDIDOS_CRIADOS, [])
+        itens_por_pedido = ler(ARQUIVO_ITENS_POR_PEDIDO, {})
+        pedidos_clientes = ler(ARQUIVO_PEDIDOS_CLIENTES, {})
+
+        with self._lock:
+            self._commit()
+            self.conexao.execute("BEGIN")
+            try:
+                self.conexao.executemany("INSERT OR IGNORE INTO pedidos_criados (nro_pedido) VALUES (?)",
+                                         ((int(nro),) for nro in pedidos_criados))
+                self.conexao.executemany("INSERT OR IGNORE INTO itens_pedido (nro_pedido, cod_produto) VALUES (?, ?)",
+                                         ((int(nro), cod) for nro, itens in itens_por_pedido.items() for cod in itens))
+                self.conexao.executemany("INSERT OR REPLACE INTO pedidos_clientes (nro_pedido, cod_cliente) VALUES (?, ?)",
+                                         ((int(nro), cliente) for nro, cliente in pedidos_clientes.items()))
+                self.conexao.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES ('migrado_json', ?)",
+                                     (time.strftime('%Y-%m-%dT%H:%M:%S'),))
+                self.conexao.execute("COMMIT")
+            except Exception:
+                self.conexao.execute("ROLLBACK")
+                raise
+        return len(pedidos_criados)
+
+    def exportar_json(self, diretorio: str = '.'):
+        """Grava o estado atual nos três arquivos JSON no formato antigo"""
+        pedidos_criados, itens_por_pedido, pedidos_clientes = self.carregar()
+        for nome, dados in ((ARQUIVO_PEDIDOS_CRIADOS, pedidos_criados),
+                            (ARQUIVO_ITENS_POR_PEDIDO, itens_por_pedido),
+                            (ARQUIVO_PEDIDOS_CLIENTES, pedidos_clientes)):
+            with open(os.path.join(diretorio, nome), 'w') as f:
+                json.dump(dados, f)
+
+    def fechar(self):
+        """Confirma as alterações pendentes e fecha o banco"""
+        with self._lock:
+            self._commit()
+            self.conexao.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manutenção do banco de estado dos pedidos")
+    parser.add_argument('acao', choices=['importar', 'exportar'],
+                        help="'importar' lê os arquivos JSON para o banco; 'exportar' grava o banco nos arquivos JSON")
+    parser.add_argument('--db', default=os.getenv('ESTADO_DB', 'estado_pedidos.db'), help="Caminho do banco SQLite")
+    parser.add_argument('--dir', default='.', help="Diretório dos arquivos JSON")
+    args = parser.parse_args()
+
+    armazem = ArmazemPedidos(args.db)
+    try:
+        if args.acao == 'importar':
+            total = armazem.importar_json(args.dir)
+            print(f"Importados {total} pedidos para {args.db}")
+        else:
+            armazem.exportar_json(args.dir)
+            print(f"Estado de {args.db} exportado para {args.dir}")
+    finally:
+        armazem.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Exportação dos resultados para análise e comparação entre execuções.
+
+Durante o teste, SerieTemporal grava a cada intervalo do painel uma linha por
+endpoint (e uma linha '*' com o total) com as requisições, a vazão, os erros,
+os percentis do intervalo e o p50/p99 de cada fase medida (fila, conexao,
+espera...; colunas <fase>_p50_ms, vazias sem amostras da fase), em JSON Lines
+(.jsonl) ou CSV (.csv). Cada linha é
+gravada e descarregada no disco assim que calculada: se o processo morrer, a
+série até ali continua no arquivo.
+
+Ao final, grava ao lado da série o resumo da execução (arquivo .resumo.json),
+com os contadores e os histogramas completos, usado pelo comparar.py, e,
+opcionalmente, a série em Parquet (requer pyarrow, que não faz parte do
+requirements.txt).
+"""
+import os
+import csv
+import json
+import time
+
+from metricas import Metricas, Histograma, FASES, ERRO, ERRO_ESPERADO
+
+PERCENTIS_SERIE = (50, 95, 99)
+PERCENTIS_FASES = (50, 99)
+ENDPOINT_TOTAL = '*'
+CAMPOS = ('instante', 'tempo', 'endpoint', 'requisicoes', 'rps', 'erros', 'erros_esperados') + \
+    tuple(f"p{p}_ms" for p in PERCENTIS_SERIE) + \
+    tuple(f"{fase}_p{p}_ms" for fase in FASES for p in PERCENTIS_FASES)
+FORMATOS = ('.jsonl', '.csv')
+# Contadores de tester.results guardados nos resumos
+CONTADORES = ('success', 'errors', 'expected_errors', 'nao_enviadas', 'sem_requisicao')
+
+
+def caminho_resumo(caminho: str) -> str:
+    """Resumo de uma série: resultados.jsonl -> resultados.resumo.json (um .resumo.json é mantido)"""
+    if caminho.endswith('.resumo.json'):
+        return caminho
+    return os.path.splitext(caminho)[0] + '.resumo.json'
+
+
+def ler_resumo(caminho: str) -> dict:
+    """Lê o resumo de uma execução (aceita o caminho da série ou do próprio resumo)"""
+    with open(caminho_resumo(caminho), encoding='utf-8') as f:
+        resumo = json.load(f)
+    resumo['metricas'] = Metricas.de_dict(resumo['metricas'])
+    return resumo
+
+
+def histograma_fase(metricas: Metricas, endpoint, fase: str) -> Histograma:
+    """Fase de um endpoint ou, com endpoint None, a fase somada de todos os endpoints"""
+    if endpoint is not None:
+        return metricas.fase(endpoint, fase)
+    combinado = Histograma()
+    for (_, nome), histograma in metricas.fases.items():
+        if nome == fase:
+            combinado.mesclar(histograma)
+    return combinado
+
+
+def linha_serie(instante: float, tempo: float, endpoint: str, metricas: Metricas, decorrido: float) -> dict:
+    filtro = None if endpoint == ENDPOINT_TOTAL else endpoint
+    histograma = metricas.combinado(filtro)
+    linha = {
+        'instante': round(instante, 3),
+        'tempo': round(tempo, 3),
+        'endpoint': endpoint,
+        'requisicoes': histograma.total,
+        'rps': round(histograma.total / decorrido, 2) if decorrido > 0 else 0.0,
+        'erros': metricas.contagem(filtro, ERRO),
+        'erros_esperados': metricas.contagem(filtro, ERRO_ESPERADO)
+    }
+    for p in PERCENTIS_SERIE:
+        linha[f"p{p}_ms"] = round(histograma.percentil(p) * 1000, 3)
+    for fase in FASES:
+        histograma = histograma_fase(metricas, filtro, fase)
+        if histograma.total:
+            for p in PERCENTIS_FASES:
+                linha[f"{fase}_p{p}_ms"] = round(histograma.percentil(p) * 1000, 3)
+    return linha
+
+
+class SerieTemporal:
+    """Série por intervalo das métricas de um tester, gravada em JSON Lines ou CSV conforme a extensão"""
+
+    def __init__(self, caminho: str, parquet: bool = False):
+        self.formato = os.path.splitext(caminho)[1].lower()
+        if self.formato not in FORMATOS:
+            raise ValueError(f"Formato da série não suportado: {caminho} (use {' ou '.join(FORMATOS)})")
+        self.caminho = caminho
+        self.parquet = parquet
+        self.arquivo = open(caminho, 'w', encoding='utf-8', newline='')
+        self._csv = None
+        if self.formato == '.csv':
+            self._csv = csv.DictWriter(self.arquivo, fieldnames=CAMPOS)
+            self._csv.writeheader()
+        # Cópia acumulada das métricas até a última linha gravada
+        self._anterior = Metricas()
+        self._ultimo = None
+
+    def gravar(self, tester):
+        """Grava as linhas do intervalo desde a última chamada"""
+        metricas = tester.metricas
+        agora = time.time()
+        # No modo distribuído o início combinado pode estar no futuro
+        if agora <= metricas.inicio:
+            return
+        delta = metricas.diferenca(self._anterior)
+        self._anterior.mesclar(delta)
+        decorrido = agora - (self._ultimo or metricas.inicio)
+        self._ultimo = agora
+
+        tempo = agora - metricas.inicio
+        for endpoint in delta.endpoints() + [ENDPOINT_TOTAL]:
+            linha = linha_serie(agora, tempo, endpoint, delta, decorrido)
+            if self._csv:
+                self._csv.writerow(linha)
+            else:
+                self.arquivo.write(json.dumps(linha, ensure_ascii=False) + '\n')
+        self.arquivo.flush()
+
+    def fechar(self, tester):
+        """Grava o último intervalo, o resumo da execução e, se pedido, a série em Parquet"""
+        self.gravar(tester)
+        self.arquivo.close()
+        gravar_resumo(caminho_resumo(self.caminho), tester)
+        if self.parquet:
+            try:
+                print(f"Série em Parquet: {converter_parquet(self.caminho)}")
+            except (RuntimeError, OSError, ValueError) as e:
+                print(f"Aviso: série em Parquet não gravada: {e}")
+
+
+def gravar_resumo(caminho: str, tester):
+    """Contadores e histogramas completos da execução, para comparar.py"""
+    metricas = tester.metricas
+    if metricas.fim is None:
+        metricas.fim = time.time()
+    resumo = {
+        'inicio': metricas.inicio,
+        'fim': metricas.fim,
+        'duracao': metricas.duracao(),
+        'results': {contador: tester.results[contador] for contador in CONTADORES},
+        'metricas': metricas.para_dict(),
+        # Saúde do gerador (saturacao.MonitorSaturacao): com 'valida' falso as latências não são confiáveis
+        'gerador': tester.saturacao
+    }
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(resumo, f, ensure_ascii=False)
+
+
+def converter_parquet(caminho: str) -> str:
+    """Converte a série (.jsonl ou .csv) em Parquet ao lado do original e retorna o novo caminho"""
+    try:
+        import pyarrow.parquet
+        import pyarrow.csv
+        import pyarrow.json
+    except ImportError:
+        raise RuntimeError("Exportação em Parquet requer o pacote pyarrow (pip install pyarrow)")
+    if caminho.lower().endswith('.csv'):
+        tabela = pyarrow.csv.read_csv(caminho)
+    else:
+        tabela = pyarrow.json.read_json(caminho)
+    destino = os.path.splitext(caminho)[0] + '.parquet'
+    pyarrow.parquet.write_table(tabela, destino, compression='zstd')
+    return destino
@@ -0,0 +1,174 @@
+"""
+Exposição das métricas da execução no formato OpenMetrics (Prometheus).
+
+Com --metrics-port, o robô atende GET /metrics numa porta local enquanto o
+teste roda, para os coletores já existentes acompanharem a carga no mesmo eixo
+de tempo das métricas do servidor da API:
+
+    srpp_requisicoes_total{endpoint, resultado}                 contador
+    srpp_requisicao_duracao_segundos{endpoint, resultado}       histograma
+    srpp_transacao_duracao_segundos{transacao, resultado}       histograma
+    srpp_chegadas_nao_enviadas_total                            contador
+    srpp_chegadas_sem_requisicao_total                          contador
+    srpp_requisicoes_em_andamento                               gauge
+    srpp_pedidos_rastreados                                     gauge
+    srpp_gerador_atraso_envio_segundos                          histograma (modelo aberto)
+    srpp_gerador_cpu_segundos_total{processo}                   contador
+    srpp_gerador_atraso_laco_segundos{processo}                 gauge (motor assíncrono)
+    srpp_gerador_fila_log{processo}                             gauge
+    srpp_gerador_logs_descartados_total                         contador
+
+O texto é montado a cada intervalo do painel (ExposicaoMetricas é uma série
+do Painel), na mesma thread ou laço de eventos que registra as métricas; a
+thread do servidor HTTP só devolve o último texto montado. Assim as requisições
+não disputam nenhum lock com a coleta, e cada coleta vê o estado de no máximo
+um intervalo atrás.
+
+Os buckets dos histogramas (LIMITES_BUCKETS) são somados a partir dos buckets
+logarítmicos de metricas.Histograma, com a mesma precisão de ~1%.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from metricas import Histograma
+from registro import log, logs_descartados
+
+PREFIXO = 'srpp'
+CAMINHO = '/metrics'
+TIPO_CONTEUDO = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+# Limites superiores (le) dos buckets exportados, em segundos
+LIMITES_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROCESSO_PRINCIPAL = 'principal'
+
+
+def _rotulos(**rotulos) -> str:
+    if not rotulos:
+        return ''
+    pares = []
+    for nome, valor in rotulos.items():
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pares.append(f'{nome}="{valor}"')
+    return '{' + ','.join(pares) + '}'
+
+
+def contagens_acumuladas(histograma: Histograma, limites: tuple = LIMITES_BUCKETS) -> list:
+    """Amostras com duração até cada limite (o bucket logarítmico conta pelo seu limite superior)"""
+    acumuladas = []
+    indices = sorted(histograma.contagens)
+    posicao = acumulado = 0
+    for limite in limites:
+        while posicao < len(indices) and Histograma.limite_superior(indices[posicao]) <= limite:
+            acumulado += histograma.contagens[indices[posicao]]
+            posicao += 1
+        acumuladas.append(acumulado)
+    return acumuladas
+
+
+class _Texto:
+    """Linhas de uma exposição OpenMetrics"""
+
+    def __init__(self):
+        self.linhas = []
+
+    def familia(self, nome: str, tipo: str, ajuda: str):
+        self.linhas.append(f"# TYPE {PREFIXO}_{nome} {tipo}")
+        self.linhas.append(f"# HELP {PREFIXO}_{nome} {ajuda}")
+
+    def amostra(self, nome: str, valor, **rotulos):
+        self.linhas.append(f"{PREFIXO}_{nome}{_rotulos(**rotulos)} {valor}")
+
+    def histograma(self, nome: str, histograma: Histograma, **rotulos):
+        for limite, acumulado in zip(LIMITES_BUCKETS, contagens_acumuladas(histograma)):
+            self.amostra(f"{nome}_bucket", acumulado, **rotulos, le=limite)
+        self.amostra(f"{nome}_bucket", histograma.total, **rotulos, le='+Inf')
+        self.amostra(f"{nome}_count", histograma.total, **rotulos)
+        self.amostra(f"{nome}_sum", repr(histograma.soma), **rotulos)
+
+    def final(self) -> bytes:
+        return ('\n'.join(self.linhas) + '\n# EOF\n').encode('utf-8')
+
+
+def montar_exposicao(tester) -> bytes:
+    """Texto OpenMetrics com as métricas e a saúde do gerador de um tester"""
+    metricas = tester.metricas
+    texto = _Texto()
+
+    texto.familia('requisicoes', 'counter', "Requisições concluídas por endpoint e resultado")
+    for (endpoint, resultado), histograma in sorted(metricas.histogramas.items()):
+        texto.amostra('requisicoes_total', histograma.total, endpoint=endpoint, resultado=resultado)
+    texto.familia('requisicao_duracao_segundos', 'histogram', "Tempo de resposta por endpoint e resultado")
+    for (endpoint, resultado), histograma in sorted(metricas.histogramas.items()):
+        texto.histograma('requisicao_duracao_segundos', histograma, endpoint=endpoint, resultado=resultado)
+    if metricas.transacoes:
+        texto.familia('transacao_duracao_segundos', 'histogram', "Duração das transações por nome e resultado")
+        for (nome, resultado), histograma in sorted(metricas.transacoes.items()):
+            texto.histograma('transacao_duracao_segundos', histograma, transacao=nome, resultado=resultado)
+    texto.familia('chegadas_nao_enviadas', 'counter', "Chegadas do modelo aberto descartadas sem envio")
+    texto.amostra('chegadas_nao_enviadas_total', tester.results['nao_enviadas'])
+    texto.familia('chegadas_sem_requisicao', 'counter',
+                  "Chegadas do modelo aberto sem requisição disponível (endpoints dependentes de pedidos)")
+    texto.amostra('chegadas_sem_requisicao_total', tester.results['sem_requisicao'])
+
+    texto.familia('requisicoes_em_andamento', 'gauge', "Requisições enviadas e ainda sem resposta")
+    texto.amostra('requisicoes_em_andamento', tester.em_andamento)
+    texto.familia('pedidos_rastreados', 'gauge', "Pedidos no estado mantido pelos geradores")
+    texto.amostra('pedidos_rastreados', tester.pedidos_rastreados())
+
+    if metricas.atraso_envio.total:
+        texto.familia('gerador_atraso_envio_segundos', 'histogram',
+                      "Atraso entre o envio previsto e o envio de fato (modelo aberto)")
+        texto.histograma('gerador_atraso_envio_segundos', metricas.atraso_envio)
+    processos = [(PROCESSO_PRINCIPAL, tester.medidas())] + \
+        [(f"worker-{worker}", medidas) for worker, medidas in sorted(tester.medidas_workers.items())]
+    texto.familia('gerador_cpu_segundos', 'counter', "Tempo de CPU de cada processo do gerador")
+    for processo, medidas in processos:
+        texto.amostra('gerador_cpu_segundos_total', repr(medidas['cpu']), processo=processo)
+    texto.familia('gerador_atraso_laco_segundos', 'gauge',
+                  "Atraso do laço de eventos na última medição (tempo em que ele ficou sem responder)")
+    for processo, medidas in processos:
+        if medidas['atraso_laco'] is not None:
+            texto.amostra('gerador_atraso_laco_segundos', repr(medidas['atraso_laco']), processo=processo)
+    texto.familia('gerador_fila_log', 'gauge', "Mensagens de log na fila aguardando gravação")
+    for processo, medidas in processos:
+        texto.amostra('gerador_fila_log', medidas['fila_log'], processo=processo)
+    texto.familia('gerador_logs_descartados', 'counter', "Mensagens de log descartadas por fila cheia")
+    texto.amostra('gerador_logs_descartados_total', logs_descartados())
+    return texto.final()
+
+
+class ExposicaoMetricas:
+    """Servidor local de /metrics; como série do Painel, remonta o texto a cada intervalo"""
+
+    def __init__(self, porta: int, host: str = '127.0.0.1'):
+        exposicao = self
+        self._texto = _Texto().final()
+
+        class Manipulador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != CAMINHO:
+                    self.send_error(404)
+                    return
+                corpo = exposicao._texto
+                self.send_response(200)
+                self.send_header('Content-Type', TIPO_CONTEUDO)
+                self.send_header('Content-Length', str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, formato, *args):
+                log.debug("Métricas: %s", formato % args)
+
+        self.servidor = ThreadingHTTPServer((host, porta), Manipulador)
+        self.servidor.daemon_threads = True
+        self.endereco = f"http://{host}:{self.servidor.server_address[1]}{CAMINHO}"
+        self._thread = threading.Thread(target=self.servidor.serve_forever, name='metricas', daemon=True)
+        self._thread.start()
+
+    def gravar(self, tester):
+        # Troca a referência de uma vez: a thread do servidor sempre vê um texto completo
+        self._texto = montar_exposicao(tester)
+
+    def fechar(self, tester):
+        self.gravar(tester)
+        self.servidor.shutdown()
+        self.servidor.server_close()
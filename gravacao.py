@@ -0,0 +1,195 @@
+"""
+Gravação e reprodução do tráfego gerado pelo robô.
+
+Com --record, cada requisição enviada vira uma linha JSON (JSON Lines, ou JSON
+Lines compactado com gzip se o arquivo terminar em .gz):
+
+    t       instante do envio (previsto, no modelo aberto), em segundos desde o início
+    m       método HTTP
+    e       caminho do endpoint, já com os placeholders preenchidos
+    tpl     template do endpoint (ex.: /Pedido/listarPedidosAbertos/{codRepresentante})
+    d, p    corpo JSON e parâmetros de query (omitidos quando ausentes)
+    pedido  número do pedido referenciado pela requisição (CAMPOS_PEDIDO, no corpo, na query ou no caminho)
+    criado  número do pedido criado pela resposta (/Pedido/Criar)
+
+A linha é gravada quando a resposta chega, para incluir o pedido criado; por
+isso a reprodução ordena as requisições por t.
+
+Com --replay, as requisições são reenviadas na mesma ordem e no mesmo ritmo
+(ou N vezes mais rápido, ou o mais rápido possível). Os pedidos criados na
+gravação recebem números novos da API; a reprodução mapeia cada número gravado
+para o número devolvido agora e substitui os CAMPOS_PEDIDO das requisições
+seguintes, inclusive os do caminho (ex.: /Pedido/{nroPedido}, preenchido de
+novo a partir do template). Uma requisição que referencia um pedido ainda em criação espera a
+resposta do Criar correspondente; se essa criação falhou, ela é ignorada.
+
+Para repetir os payloads de uma execução sem gravá-la, use --seed.
+"""
+import re
+import gzip
+import json
+import time
+import asyncio
+import functools
+from typing import Any, Dict
+
+from registro import log
+
+# Campos (do corpo e da query) que levam o número do pedido
+CAMPOS_PEDIDO = ('nroPedido',)
+
+
+def _abrir(caminho: str, modo: str):
+    if caminho.endswith('.gz'):
+        return gzip.open(caminho, modo, encoding='utf-8')
+    return open(caminho, modo, encoding='utf-8')
+
+
+@functools.lru_cache(maxsize=None)
+def _padrao_template(template: str):
+    """Expressão que casa o caminho preenchido do template e captura os seus placeholders"""
+    partes = re.split(r'\{(\w+)\}', template)
+    # As partes ímpares são os nomes dos placeholders
+    return re.compile(''.join(f"(?P<{parte}>[^/]+)" if i % 2 else re.escape(parte) for i, parte in enumerate(partes)) + '$')
+
+
+def parametros_caminho(template: str, endpoint: str) -> Dict[str, str]:
+    """Valores dos placeholders do template no caminho preenchido (vazio se o caminho não casar)"""
+    if not template or '{' not in template:
+        return {}
+    casamento = _padrao_template(template).match(endpoint)
+    return casamento.groupdict() if casamento else {}
+
+
+def pedido_referenciado(data, params, template: str = None, endpoint: str = None):
+    """Número do pedido usado pela requisição (None se ela não referencia um pedido)"""
+    for campos in (data, params):
+        if isinstance(campos, dict):
+            for campo in CAMPOS_PEDIDO:
+                if campos.get(campo) is not None:
+                    return campos[campo]
+    caminho = parametros_caminho(template, endpoint)
+    for campo in CAMPOS_PEDIDO:
+        if caminho.get(campo) is not None:
+            valor = caminho[campo]
+            return int(valor) if valor.isdigit() else valor
+    return None
+
+
+class Gravador:
+    """Grava as requisições enviadas por um tester (atributo gravador) em JSON Lines"""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.arquivo = _abrir(caminho, 'wt')
+        self.inicio = time.perf_counter()
+        self.total = 0
+
+    def registrar(self, inicio_envio: float, method: str, endpoint: str, template: str,
+                  data: Dict[str, Any] = None, params: Dict[str, Any] = None, nro_pedido_criado=None):
+        """inicio_envio no relógio time.perf_counter"""
+        registro = {'t': round(inicio_envio - self.inicio, 6), 'm': method, 'e': endpoint, 'tpl': template}
+        if data is not None:
+            registro['d'] = data
+        if params is not None:
+            registro['p'] = params
+        pedido = pedido_referenciado(data, params, template, endpoint)
+        if pedido is not None:
+            registro['pedido'] = pedido
+        if nro_pedido_criado is not None:
+            registro['criado'] = nro_pedido_criado
+        self.arquivo.write(json.dumps(registro, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.total += 1
+
+    def fechar(self):
+        self.arquivo.close()
+
+
+def ler_gravacao(caminho: str) -> list:
+    """Requisições gravadas, em ordem de envio"""
+    with _abrir(caminho, 'rt') as arquivo:
+        registros = [json.loads(linha) for linha in arquivo if linha.strip()]
+    registros.sort(key=lambda registro: registro['t'])
+    return registros
+
+
+def _remapear(campos, original, novo):
+    if not isinstance(campos, dict):
+        return campos
+    return {nome: novo if nome in CAMPOS_PEDIDO and valor == original else valor for nome, valor in campos.items()}
+
+
+def _remapear_caminho(template: str, endpoint: str, original, novo) -> str:
+    """Caminho com os CAMPOS_PEDIDO iguais ao pedido original trocados pelo novo"""
+    caminho = parametros_caminho(template, endpoint)
+    if not any(nome in CAMPOS_PEDIDO and valor == str(original) for nome, valor in caminho.items()):
+        return endpoint
+    return template.format(**_remapear(caminho, str(original), novo))
+
+
+class Reproducao:
+    """Reenvia uma gravação com um AsyncAPITester, mapeando os pedidos gravados para os criados agora"""
+
+    def __init__(self, tester, registros: list, velocidade: float = 1.0, max_em_andamento: int = 10):
+        self.tester = tester
+        self.registros = registros
+        # 0: o mais rápido possível (limitado por max_em_andamento)
+        self.velocidade = velocidade
+        self.max_em_andamento = max_em_andamento
+        # Número gravado -> futuro com o número criado na reprodução (None se a criação falhou)
+        self.criacoes = {}
+        self.ignoradas = 0
+
+    async def executar(self, painel=None):
+        loop = asyncio.get_running_loop()
+        for registro in self.registros:
+            if registro.get('criado') is not None:
+                self.criacoes[registro['criado']] = loop.create_future()
+
+        atualizador = asyncio.create_task(self.tester.atualizar_painel(painel)) if painel else None
+        try:
+            async with self.tester.abrir_sessao():
+                limite = asyncio.Semaphore(self.max_em_andamento)
+                pendentes = set()
+                inicio = time.perf_counter()
+                for registro in self.registros:
+                    inicio_previsto = None
+                    if self.velocidade > 0:
+                        inicio_previsto = inicio + registro['t'] / self.velocidade
+                        await asyncio.sleep(max(inicio_previsto - time.perf_counter(), 0))
+                    await limite.acquire()
+                    tarefa = asyncio.create_task(self._reenviar(registro, inicio_previsto, limite))
+                    pendentes.add(tarefa)
+                    tarefa.add_done_callback(pendentes.discard)
+                if pendentes:
+                    await asyncio.gather(*pendentes)
+        finally:
+            if atualizador:
+                atualizador.cancel()
+            # Criações que não chegaram a ser reenviadas
+            for futuro in self.criacoes.values():
+                if not futuro.done():
+                    futuro.set_result(None)
+
+    async def _reenviar(self, registro: dict, inicio_previsto: float, limite: asyncio.Semaphore):
+        try:
+            endpoint, data, params = registro['e'], registro.get('d'), registro.get('p')
+            pedido = registro.get('pedido')
+            if pedido in self.criacoes:
+                novo = await self.criacoes[pedido]
+                if novo is None:
+                    self.ignoradas += 1
+                    log.info("Reprodução: %s ignorada, a criação do pedido %s falhou", registro['e'], pedido)
+                    return
+                data, params = _remapear(data, pedido, novo), _remapear(params, pedido, novo)
+                endpoint = _remapear_caminho(registro.get('tpl'), endpoint, pedido, novo)
+
+            contexto = {}
+            await self.tester.test_endpoint_async(endpoint, registro['m'], data, params, registro.get('tpl'),
+                                                  inicio_previsto=inicio_previsto, contexto=contexto)
+            criado = registro.get('criado')
+            if criado is not None and not self.criacoes[criado].done():
+                self.criacoes[criado].set_result(contexto.get('pedido'))
+                log.debug("Reprodução: pedido gravado %s -> %s", criado, contexto.get('pedido'))
+        finally:
+            limite.release()
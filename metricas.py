@@ -0,0 +1,282 @@
+"""
+Métricas de latência com memória constante.
+
+Cada combinação (endpoint, resultado) tem um histograma com buckets logarítmicos
+de ~1% de precisão relativa, no estilo HDR: a memória é limitada pelo número de
+buckets (e não pelo número de requisições) e histogramas de threads ou processos
+diferentes são mesclados somando as contagens.
+
+Além da latência total, cada endpoint tem um histograma por fase da requisição
+(FASES), medidas com relógio monotônico. As transações (ex.: o ciclo de vida de
+um pedido, do Criar ao fecharPedido) têm histogramas próprios por (nome,
+resultado), fora das contagens de requisições.
+"""
+import math
+import time
+from typing import Dict, Tuple
+
+# Resultados possíveis de uma requisição
+SUCESSO = 'success'
+ERRO_ESPERADO = 'expected_error'
+ERRO = 'error'
+RESULTADOS = (SUCESSO, ERRO_ESPERADO, ERRO)
+
+PERCENTIS_RELATORIO = (50, 90, 99, 99.9)
+
+# Fases de uma requisição, na ordem em que acontecem:
+#   fila      espera por uma conexão livre no pool
+#   dns       resolução do nome (só em conexões novas, fora do cache)
+#   conexao   abertura da conexão TCP e handshake TLS (só em conexões novas)
+#   envio     envio dos cabeçalhos e do corpo da requisição
+#   espera    do fim do envio ao primeiro byte da resposta (processamento no servidor)
+#   download  do primeiro ao último byte do corpo da resposta
+FASES = ('fila', 'dns', 'conexao', 'envio', 'espera', 'download')
+
+
+class Histograma:
+    """
+    Histograma de durações (em segundos) com buckets em progressão geométrica.
+
+    O bucket i cobre [VALOR_MINIMO * BASE**(i-1), VALOR_MINIMO * BASE**i); o
+    bucket 0 recebe tudo abaixo de VALOR_MINIMO e o último, tudo acima do
+    intervalo coberto. As contagens ficam num dicionário esparso, com no
+    máximo NUM_BUCKETS entradas.
+    """
+
+    PRECISAO = 0.01
+    BASE = 1 + PRECISAO
+    VALOR_MINIMO = 1e-6  # 1 µs
+    VALOR_MAXIMO = 3600.0  # 1 h
+    NUM_BUCKETS = int(math.log(VALOR_MAXIMO / VALOR_MINIMO) / math.log(BASE)) + 2
+    _LOG_BASE = math.log(BASE)
+
+    __slots__ = ('contagens', 'total', 'soma', 'minimo', 'maximo')
+
+    def __init__(self):
+        self.contagens: Dict[int, int] = {}
+        self.total = 0
+        self.soma = 0.0
+        self.minimo = math.inf
+        self.maximo = 0.0
+
+    @classmethod
+    def indice(cls, valor: float) -> int:
+        if valor < cls.VALOR_MINIMO:
+            return 0
+        return min(int(math.log(valor / cls.VALOR_MINIMO) / cls._LOG_BASE) + 1, cls.NUM_BUCKETS - 1)
+
+    @classmethod
+    def limite_superior(cls, indice: int) -> float:
+        return cls.VALOR_MINIMO * cls.BASE ** indice
+
+    def registrar(self, valor: float):
+        i = self.indice(valor)
+        self.contagens[i] = self.contagens.get(i, 0) + 1
+        self.total += 1
+        self.soma += valor
+        if valor < self.minimo:
+            self.minimo = valor
+        if valor > self.maximo:
+            self.maximo = valor
+
+    def mesclar(self, outro: 'Histograma'):
+        for i, contagem in outro.contagens.items():
+            self.contagens[i] = self.contagens.get(i, 0) + contagem
+        self.total += outro.total
+        self.soma += outro.soma
+        self.minimo = min(self.minimo, outro.minimo)
+        self.maximo = max(self.maximo, outro.maximo)
+
+    def media(self) -> float:
+        return self.soma / self.total if self.total else 0.0
+
+    def diferenca(self, anterior: 'Histograma') -> 'Histograma':
+        """
+        Amostras registradas depois de `anterior`, uma cópia acumulada anterior deste histograma.
+
+        O mínimo e o máximo do intervalo não são conhecidos: usa os limites dos buckets ocupados.
+        """
+        delta = Histograma()
+        for i, contagem in self.contagens.items():
+            contagem -= anterior.contagens.get(i, 0)
+            if contagem:
+                delta.contagens[i] = contagem
+        delta.total = self.total - anterior.total
+        delta.soma = self.soma - anterior.soma
+        if delta.contagens:
+            menor = min(delta.contagens)
+            delta.minimo = self.limite_superior(menor - 1) if menor else 0.0
+            delta.maximo = self.limite_superior(max(delta.contagens))
+        return delta
+
+    def para_dict(self) -> dict:
+        """Representação serializável em JSON (buckets como pares [índice, contagem])"""
+        return {
+            'contagens': [[i, c] for i, c in self.contagens.items()],
+            'total': self.total,
+            'soma': self.soma,
+            'minimo': self.minimo if self.total else None,
+            'maximo': self.maximo
+        }
+
+    @classmethod
+    def de_dict(cls, dados: dict) -> 'Histograma':
+        histograma = cls()
+        histograma.contagens = {int(i): c for i, c in dados['contagens']}
+        histograma.total = dados['total']
+        histograma.soma = dados['soma']
+        histograma.minimo = math.inf if dados['minimo'] is None else dados['minimo']
+        histograma.maximo = dados['maximo']
+        return histograma
+
+    def percentil(self, p: float) -> float:
+        """Retorna o valor abaixo do qual estão p% das amostras (erro relativo de até PRECISAO)"""
+        if not self.total:
+            return 0.0
+        alvo = max(1, math.ceil(self.total * p / 100))
+        acumulado = 0
+        for i in sorted(self.contagens):
+            acumulado += self.contagens[i]
+            if acumulado >= alvo:
+                return min(max(self.limite_superior(i), self.minimo), self.maximo)
+        return self.maximo
+
+
+class Metricas:
+    """
+    Conjunto de histogramas por (template do endpoint, resultado).
+
+    Não usa locks: cada thread ou processo deve registrar na sua própria
+    instância e as instâncias são combinadas com mesclar().
+    """
+
+    def __init__(self):
+        self.histogramas: Dict[Tuple[str, str], Histograma] = {}
+        # Durações de cada fase por (template do endpoint, fase)
+        self.fases: Dict[Tuple[str, str], Histograma] = {}
+        # Duração das transações (várias requisições) por (nome da transação, resultado)
+        self.transacoes: Dict[Tuple[str, str], Histograma] = {}
+        # Atraso entre o instante previsto de envio e o envio de fato (modelo aberto)
+        self.atraso_envio = Histograma()
+        self.inicio = time.time()
+        self.fim = None
+
+    def registrar(self, endpoint: str, resultado: str, duracao: float):
+        chave = (endpoint, resultado)
+        histograma = self.histogramas.get(chave)
+        if histograma is None:
+            histograma = self.histogramas[chave] = Histograma()
+        histograma.registrar(duracao)
+
+    def registrar_fases(self, endpoint: str, fases: Dict[str, float]):
+        for fase, duracao in fases.items():
+            chave = (endpoint, fase)
+            histograma = self.fases.get(chave)
+            if histograma is None:
+                histograma = self.fases[chave] = Histograma()
+            histograma.registrar(duracao)
+
+    def registrar_transacao(self, nome: str, resultado: str, duracao: float):
+        chave = (nome, resultado)
+        histograma = self.transacoes.get(chave)
+        if histograma is None:
+            histograma = self.transacoes[chave] = Histograma()
+        histograma.registrar(duracao)
+
+    def mesclar(self, outra: 'Metricas'):
+        for destino, origem in ((self.histogramas, outra.histogramas), (self.fases, outra.fases),
+                                (self.transacoes, outra.transacoes)):
+            for chave, histograma in origem.items():
+                if chave not in destino:
+                    destino[chave] = Histograma()
+                destino[chave].mesclar(histograma)
+        self.atraso_envio.mesclar(outra.atraso_envio)
+        self.inicio = min(self.inicio, outra.inicio)
+        if outra.fim is not None:
+            self.fim = max(self.fim or outra.fim, outra.fim)
+
+    def extrair(self) -> 'Metricas':
+        """Retorna as métricas acumuladas desde a última extração e recomeça a contagem"""
+        agora = time.time()
+        parcial = Metricas()
+        parcial.histogramas = self.histogramas
+        parcial.fases = self.fases
+        parcial.transacoes = self.transacoes
+        parcial.atraso_envio = self.atraso_envio
+        parcial.inicio = self.inicio
+        parcial.fim = agora
+        self.histogramas = {}
+        self.fases = {}
+        self.transacoes = {}
+        self.atraso_envio = Histograma()
+        self.inicio = agora
+        return parcial
+
+    def diferenca(self, anterior: 'Metricas') -> 'Metricas':
+        """Métricas registradas depois de `anterior`, uma cópia acumulada anterior destas métricas"""
+        delta = Metricas()
+        for destino, atuais, anteriores in ((delta.histogramas, self.histogramas, anterior.histogramas),
+                                            (delta.fases, self.fases, anterior.fases),
+                                            (delta.transacoes, self.transacoes, anterior.transacoes)):
+            for chave, histograma in atuais.items():
+                if histograma.total != (anteriores[chave].total if chave in anteriores else 0):
+                    destino[chave] = histograma.diferenca(anteriores.get(chave) or Histograma())
+        delta.atraso_envio = self.atraso_envio.diferenca(anterior.atraso_envio)
+        delta.inicio = anterior.fim or self.inicio
+        delta.fim = time.time()
+        return delta
+
+    def para_dict(self) -> dict:
+        """Representação serializável em JSON, para enviar as métricas entre máquinas ou gravá-las"""
+        return {
+            'histogramas': [[e, r, h.para_dict()] for (e, r), h in self.histogramas.items()],
+            'fases': [[e, f, h.para_dict()] for (e, f), h in self.fases.items()],
+            'transacoes': [[n, r, h.para_dict()] for (n, r), h in self.transacoes.items()],
+            'atraso_envio': self.atraso_envio.para_dict(),
+            'inicio': self.inicio,
+            'fim': self.fim
+        }
+
+    @classmethod
+    def de_dict(cls, dados: dict) -> 'Metricas':
+        metricas = cls()
+        metricas.histogramas = {(e, r): Histograma.de_dict(h) for e, r, h in dados['histogramas']}
+        metricas.fases = {(e, f): Histograma.de_dict(h) for e, f, h in dados['fases']}
+        metricas.transacoes = {(n, r): Histograma.de_dict(h) for n, r, h in dados.get('transacoes', [])}
+        metricas.atraso_envio = Histograma.de_dict(dados['atraso_envio'])
+        metricas.inicio = dados['inicio']
+        metricas.fim = dados['fim']
+        return metricas
+
+    def duracao(self) -> float:
+        return (self.fim or time.time()) - self.inicio
+
+    def endpoints(self) -> list:
+        return sorted({endpoint for endpoint, _ in self.histogramas})
+
+    def combinado(self, endpoint: str = None, resultados=RESULTADOS) -> Histograma:
+        """Histograma que soma os resultados escolhidos de um endpoint (ou de todos, se endpoint for None)"""
+        total = Histograma()
+        for (nome, resultado), histograma in self.histogramas.items():
+            if (endpoint is None or nome == endpoint) and resultado in resultados:
+                total.mesclar(histograma)
+        return total
+
+    def transacao(self, nome: str, resultados=RESULTADOS) -> Histograma:
+        """Histograma que soma os resultados escolhidos de uma transação"""
+        total = Histograma()
+        for resultado in resultados:
+            if (nome, resultado) in self.transacoes:
+                total.mesclar(self.transacoes[(nome, resultado)])
+        return total
+
+    def nomes_transacoes(self) -> list:
+        return sorted({nome for nome, _ in self.transacoes})
+
+    def fase(self, endpoint: str, fase: str) -> Histograma:
+        """Histograma de uma fase do endpoint (vazio se a fase nunca foi medida)"""
+        return self.fases.get((endpoint, fase)) or Histograma()
+
+    def contagem(self, endpoint: str = None, resultado: str = None) -> int:
+        return sum(h.total for (nome, res), h in self.histogramas.items()
+                   if (endpoint is None or nome == endpoint) and (resultado is None or res == resultado))
@@ -0,0 +1,85 @@
+"""
+Painel da execução no terminal.
+
+Uma vez por segundo mostra a vazão do último intervalo, as requisições em
+andamento e, por endpoint, o total, o p95 e os erros acumulados. Num terminal
+interativo o painel é redesenhado no mesmo lugar; com a saída redirecionada
+imprime uma linha de resumo por intervalo.
+
+No mesmo intervalo o painel grava as séries recebidas em `series` (séries
+temporais, exportacao.SerieTemporal, e a exposição do /metrics,
+exposicao.ExposicaoMetricas); com exibir=False ele só grava as séries. Uma
+série com o atributo `alerta` preenchido (saturacao.MonitorSaturacao) tem o
+alerta exibido na linha de resumo.
+
+O painel só lê as métricas e deve ser atualizado pela mesma thread (ou laço de
+eventos) que as registra.
+"""
+import sys
+import time
+
+from metricas import ERRO, ERRO_ESPERADO
+from registro import logs_descartados
+
+PERCENTIL_PAINEL = 95
+
+
+class Painel:
+    def __init__(self, saida=None, intervalo: float = 1.0, exibir: bool = True, series=()):
+        self.saida = saida or sys.stdout
+        self.intervalo = intervalo
+        self.exibir = exibir
+        self.series = list(series)
+        self.interativo = self.saida.isatty()
+        self._linhas_desenhadas = 0
+        self._ultimo = time.monotonic()
+        self._total_anterior = 0
+
+    def tique(self, tester):
+        """Atualiza o painel se já passou um intervalo desde a última atualização"""
+        if time.monotonic() - self._ultimo >= self.intervalo:
+            self.mostrar(tester)
+
+    def mostrar(self, tester):
+        for serie in self.series:
+            serie.gravar(tester)
+        if self.exibir:
+            self.desenhar(tester)
+        else:
+            self._ultimo = time.monotonic()
+
+    def encerrar(self, tester):
+        """Grava o último intervalo e fecha as séries"""
+        for serie in self.series:
+            serie.fechar(tester)
+
+    def desenhar(self, tester):
+        agora = time.monotonic()
+        total = tester.results['success'] + tester.results['errors'] + tester.results['expected_errors']
+        decorrido = agora - self._ultimo
+        vazao = (total - self._total_anterior) / decorrido if decorrido > 0 else 0.0
+        self._ultimo = agora
+        self._total_anterior = total
+
+        resumo = (f"[{tester.metricas.duracao():6.0f}s] {vazao:8.1f} req/s | {tester.em_andamento} em andamento | "
+                  f"{total} requisições | {tester.results['errors']} erros")
+        descartados = logs_descartados()
+        if descartados:
+            resumo += f" | {descartados} logs descartados"
+        for serie in self.series:
+            if getattr(serie, 'alerta', None):
+                resumo += f" | {serie.alerta}"
+        if not self.interativo:
+            print(resumo, file=self.saida, flush=True)
+            return
+
+        linhas = [resumo, f"{'Endpoint':<50}{'Reqs':>8}{'p' + str(PERCENTIL_PAINEL) + ' ms':>10}{'Erros':>8}{'Esper.':>8}"]
+        for endpoint in tester.metricas.endpoints():
+            histograma = tester.metricas.combinado(endpoint)
+            linhas.append(f"{endpoint:<50}{histograma.total:>8}{histograma.percentil(PERCENTIL_PAINEL) * 1000:>10.1f}"
+                          f"{tester.metricas.contagem(endpoint, ERRO):>8}{tester.metricas.contagem(endpoint, ERRO_ESPERADO):>8}")
+        # Volta ao início do painel anterior e apaga até o fim da tela antes de redesenhar
+        apagar = f"\x1b[{self._linhas_desenhadas}F\x1b[J" if self._linhas_desenhadas else ''
+        self.saida.write(apagar + '\n'.join(linhas) + '\n')
+        self.saida.flush()
+        self._linhas_desenhadas = len(linhas)
@@ -0,0 +1,50 @@
+"""
+Textos aleatórios dos payloads.
+
+O Faker só é importado e criado quando algum texto é necessário, e os textos são
+gerados uma única vez, na compilação do cenário, num pool por tamanho máximo;
+cada requisição apenas sorteia um texto do pool, em vez de chamar o Faker.
+
+Os textos e o Faker derivam do gerador global random: com random.seed(semente)
+antes da compilação do cenário, os pools são reproduzíveis.
+"""
+import random
+
+IDIOMA_FAKER = 'pt_BR'
+
+_faker = None
+
+
+def obter_faker():
+    """Faker compartilhado, importado e criado na primeira chamada"""
+    global _faker
+    if _faker is None:
+        from faker import Faker
+        _faker = Faker(IDIOMA_FAKER)
+        _faker.seed_instance(random.getrandbits(64))
+    return _faker
+
+
+def semear_faker(semente: int):
+    """Ressemeia o Faker já criado (ex.: num processo worker que o herdou do pai por fork)"""
+    if _faker is not None:
+        _faker.seed_instance(semente)
+
+
+class PoolTextos:
+    """Textos aleatórios pré-gerados, um pool de `tamanho` textos para cada tamanho máximo"""
+
+    def __init__(self, tamanho: int = 1000):
+        self.tamanho = tamanho
+        self._pools = {}
+
+    def __call__(self, max_caracteres: int) -> list:
+        """Pool de textos com até max_caracteres caracteres, gerado na primeira chamada"""
+        pool = self._pools.get(max_caracteres)
+        if pool is None:
+            faker = obter_faker()
+            pool = self._pools[max_caracteres] = [faker.text(max_nb_chars=max_caracteres) for _ in range(self.tamanho)]
+        return pool
+
+    def sortear(self, max_caracteres: int) -> str:
+        return random.choice(self(max_caracteres))
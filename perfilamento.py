@@ -0,0 +1,65 @@
+"""
+Perfil de CPU do próprio gerador (--profile).
+
+Com --profile <arquivo>, o motor roda sob o cProfile e o perfil é gravado no
+formato do pstats, para abrir com `python -m pstats <arquivo>` ou com o
+snakeviz. Com --workers, só os workers são perfilados: cada um grava o seu
+perfil (perfil.worker-N.prof) e o coordenador os soma no arquivo pedido.
+
+Ao fim, o relatório mostra as funções com mais tempo próprio (onde a CPU do
+cliente vai, incluindo aiohttp, json e sqlite) e o tempo acumulado das funções
+do próprio robô (test_endpoint, montagem dos payloads, atualização do estado e
+das métricas).
+
+Só a thread que executa a carga é perfilada (não a thread do log). O cProfile
+deixa o gerador bem mais lento: use o perfil para ver a distribuição do tempo
+no cliente, não as latências da mesma execução.
+"""
+import os
+import cProfile
+import pstats
+
+from registro import arquivo_worker
+
+# Funções listadas em cada parte do resumo do perfil
+LINHAS_PERFIL = 15
+# Módulos do robô no caminho das requisições (resumo por tempo acumulado)
+MODULOS_ROBO = r'(api_tester|cenarios|payloads|estado_pedidos|metricas|registro|classificacao)\.py'
+
+
+class Perfilador:
+    """Perfil cProfile do trecho executado dentro do bloco with, gravado em caminho ao sair"""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._perfil = cProfile.Profile()
+
+    def __enter__(self):
+        self._perfil.enable()
+        return self
+
+    def __exit__(self, *excecao):
+        self._perfil.disable()
+        self._perfil.dump_stats(self.caminho)
+
+
+def combinar_perfis_workers(caminho: str, num_workers: int):
+    """Soma em caminho os perfis gravados pelos workers e apaga os arquivos dos workers"""
+    arquivos = [arquivo_worker(caminho, worker_id) for worker_id in range(num_workers)]
+    arquivos = [arquivo for arquivo in arquivos if os.path.exists(arquivo)]
+    if not arquivos:
+        return
+    estatisticas = pstats.Stats(*arquivos)
+    estatisticas.dump_stats(caminho)
+    for arquivo in arquivos:
+        os.remove(arquivo)
+
+
+def imprimir_perfil(caminho: str, linhas: int = LINHAS_PERFIL):
+    print(f"\n=== Perfil do gerador ({caminho}) ===")
+    estatisticas = pstats.Stats(caminho)
+    estatisticas.strip_dirs()
+    print("Funções com mais tempo próprio:")
+    estatisticas.sort_stats(pstats.SortKey.TIME).print_stats(linhas)
+    print("Funções do robô por tempo acumulado:")
+    estatisticas.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(MODULOS_ROBO, linhas)
@@ -0,0 +1,134 @@
+"""
+Dados de referência (clientes, representantes e produtos) lidos da própria API.
+
+Na partida, cada catálogo de CATALOGOS é buscado uma vez no endpoint de
+listagem e guardado num cache em disco (JSON compactado com gzip) junto com a
+URL da API e o instante da busca. Nas execuções seguintes, enquanto o cache do
+catálogo tiver menos de `ttl` segundos e for da mesma API, ele é usado sem
+nenhuma requisição.
+
+Se a busca falhar (API fora do ar, status de erro ou lista vazia), vale o
+cache vencido, se houver, e por último a lista fixa do api_tester
+(carregar_referencias), como antes. Condições de pagamento e transportadoras
+não têm endpoint de listagem e continuam fixas.
+"""
+import os
+import gzip
+import json
+import time
+from typing import Any, Dict
+
+import requests
+
+from registro import log
+
+# Catálogo -> endpoint de listagem e campos candidatos ao código (sem diferenciar maiúsculas)
+CATALOGOS = {
+    'clientes': ('/Cliente/listar', ('codCliente', 'codigo')),
+    'representantes': ('/Representante/listar', ('codRepresentante', 'codigo')),
+    'produtos': ('/Produto/listar', ('codProduto', 'codigo'))
+}
+# Tempo máximo de cada busca, em segundos
+TIMEOUT_BUSCA = 30
+
+ORIGEM_CACHE = 'cache'
+ORIGEM_API = 'API'
+ORIGEM_CACHE_VENCIDO = 'cache vencido'
+ORIGEM_FIXA = 'lista fixa'
+
+
+def extrair_codigos(resposta: Any, campos: tuple) -> list:
+    """Códigos de uma listagem: lista de objetos (ou de códigos), direta ou dentro do primeiro campo lista"""
+    if isinstance(resposta, dict):
+        resposta = next((valor for valor in resposta.values() if isinstance(valor, list)), [])
+    if not isinstance(resposta, list):
+        return []
+    campos = tuple(campo.lower() for campo in campos)
+    codigos = []
+    vistos = set()
+    for item in resposta:
+        if isinstance(item, dict):
+            chaves = {chave.lower(): valor for chave, valor in item.items()}
+            codigo = next((chaves[campo] for campo in campos if chaves.get(campo) is not None), None)
+        else:
+            codigo = item
+        # Objetos e listas no lugar do código não servem de referência (e não entram no conjunto)
+        if codigo is None or isinstance(codigo, (dict, list)):
+            continue
+        if codigo not in vistos:
+            vistos.add(codigo)
+            codigos.append(codigo)
+    return codigos
+
+
+def ler_cache(caminho: str) -> Dict[str, Any]:
+    try:
+        with gzip.open(caminho, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        log.warning("Cache de referências ilegível (%s): %s", caminho, e)
+        return {}
+
+
+def gravar_cache(caminho: str, cache: Dict[str, Any]):
+    # Grava num temporário e troca, para um processo interrompido não deixar o cache pela metade
+    temporario = caminho + '.tmp'
+    with gzip.open(temporario, 'wt', encoding='utf-8') as f:
+        json.dump(cache, f, separators=(',', ':'))
+    os.replace(temporario, caminho)
+
+
+def buscar_catalogo(session: requests.Session, base_url: str, endpoint: str, campos: tuple) -> list:
+    """Códigos do catálogo lidos da API; levanta exceção se a resposta não trouxer nenhum"""
+    response = session.get(f"{base_url}/{endpoint.lstrip('/')}", timeout=TIMEOUT_BUSCA)
+    response.raise_for_status()
+    codigos = extrair_codigos(response.json(), campos)
+    if not codigos:
+        raise ValueError("resposta sem códigos")
+    return codigos
+
+
+def obter_referencias(base_url: str, fixas: Dict[str, list], caminho_cache: str, ttl: float,
+                      renovar: bool = False) -> tuple:
+    """
+    Listas de referência com os catálogos da API (ou do cache) no lugar das fixas.
+
+    renovar ignora o cache ainda válido. Retorna as listas e a origem de cada
+    catálogo (ORIGEM_CACHE, ORIGEM_API, ORIGEM_CACHE_VENCIDO ou ORIGEM_FIXA).
+    """
+    base_url = base_url.rstrip('/')
+    referencias = dict(fixas)
+    origens = {}
+    cache = ler_cache(caminho_cache) if ttl > 0 else {}
+    if cache.get('base_url') != base_url:
+        cache = {'base_url': base_url, 'catalogos': {}}
+    catalogos = cache.setdefault('catalogos', {})
+    agora = time.time()
+    alterado = False
+
+    with requests.Session() as session:
+        for nome, (endpoint, campos) in CATALOGOS.items():
+            guardado = catalogos.get(nome)
+            if guardado and not renovar and agora - guardado['gravado_em'] < ttl:
+                referencias[nome], origens[nome] = guardado['codigos'], ORIGEM_CACHE
+                continue
+            try:
+                referencias[nome] = buscar_catalogo(session, base_url, endpoint, campos)
+                origens[nome] = ORIGEM_API
+                catalogos[nome] = {'gravado_em': agora, 'codigos': referencias[nome]}
+                alterado = True
+            except (requests.RequestException, ValueError) as e:
+                log.warning("Não foi possível carregar %s de %s: %s", nome, endpoint, e)
+                if guardado:
+                    referencias[nome], origens[nome] = guardado['codigos'], ORIGEM_CACHE_VENCIDO
+                else:
+                    origens[nome] = ORIGEM_FIXA
+
+    if alterado and ttl > 0:
+        try:
+            gravar_cache(caminho_cache, cache)
+        except OSError as e:
+            log.warning("Cache de referências não gravado (%s): %s", caminho_cache, e)
+    return referencias, origens
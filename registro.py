@@ -0,0 +1,111 @@
+"""
+Registro (log) não bloqueante das requisições do robô de testes.
+
+As mensagens por requisição passam pelo logger 'api_tester' e são apenas
+colocadas numa fila limitada; uma thread em segundo plano as formata e grava no
+arquivo de log. Assim, um terminal ou arquivo lento não segura as requisições, e
+com a fila cheia as mensagens excedentes são descartadas (e contadas) em vez de
+bloquear o gerador de carga.
+
+Níveis usados:
+
+    DEBUG    corpo das respostas e detalhes de cada requisição
+    INFO     eventos de estado (pedido criado, itens adicionados, erros esperados)
+    WARNING  respostas de erro
+    ERROR    exceções
+"""
+import os
+import sys
+import queue
+import logging
+import logging.handlers
+
+log = logging.getLogger('api_tester')
+
+FORMATO = '%(asctime)s %(processName)s %(levelname)s %(message)s'
+
+# Registro ativo neste processo (configurado por configurar_registro)
+_ativo = None
+
+
+class ManipuladorFila(logging.handlers.QueueHandler):
+    """QueueHandler que descarta e conta os registros quando a fila está cheia, sem bloquear"""
+
+    def __init__(self, fila: queue.Queue):
+        super().__init__(fila)
+        self.descartados = 0
+
+    def prepare(self, record):
+        # A formatação fica para a thread de gravação; as mensagens usam argumentos imutáveis
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+class Registro:
+    """Fila limitada + thread de gravação do logger 'api_tester'"""
+
+    def __init__(self, arquivo: str, nivel: str = 'INFO', tamanho_fila: int = 10000):
+        self.arquivo = arquivo
+        if arquivo == '-':
+            self.destino = logging.StreamHandler(sys.stderr)
+        else:
+            self.destino = logging.FileHandler(arquivo, encoding='utf-8')
+        self.destino.setFormatter(logging.Formatter(FORMATO))
+        self.manipulador = ManipuladorFila(queue.Queue(tamanho_fila))
+        self.ouvinte = logging.handlers.QueueListener(self.manipulador.queue, self.destino)
+
+        log.handlers = [self.manipulador]
+        log.setLevel(nivel.upper())
+        log.propagate = False
+        self.ouvinte.start()
+
+    @property
+    def descartados(self) -> int:
+        return self.manipulador.descartados
+
+    def parar(self):
+        """Grava as mensagens ainda na fila e fecha o arquivo"""
+        self.ouvinte.stop()
+        self.destino.close()
+
+
+def configurar_registro(arquivo: str, nivel: str = 'INFO', tamanho_fila: int = 10000) -> Registro:
+    """
+    Direciona o logger 'api_tester' para arquivo ('-' para stderr) através da fila.
+
+    Pode ser chamada de novo (ex.: num processo worker criado por fork, que
+    herda os manipuladores mas não a thread de gravação do pai).
+    """
+    global _ativo
+    _ativo = Registro(arquivo, nivel, tamanho_fila)
+    return _ativo
+
+
+def parar_registro():
+    global _ativo
+    if _ativo is not None:
+        _ativo.parar()
+        _ativo = None
+
+
+def logs_descartados() -> int:
+    """Mensagens descartadas por fila cheia neste processo"""
+    return _ativo.descartados if _ativo is not None else 0
+
+
+def tamanho_fila_log() -> int:
+    """Mensagens na fila aguardando a thread de gravação neste processo"""
+    return _ativo.manipulador.queue.qsize() if _ativo is not None else 0
+
+
+def arquivo_worker(arquivo: str, worker_id: int) -> str:
+    """Arquivo de log de um processo worker: api_tester.log -> api_tester.worker-1.log"""
+    if arquivo == '-':
+        return arquivo
+    base, extensao = os.path.splitext(arquivo)
+    return f"{base}.worker-{worker_id}{extensao}"
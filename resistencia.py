@@ -0,0 +1,114 @@
+"""
+Teste de resistência (soak): execuções de horas com memória constante, pontos
+de controle e retomada.
+
+Com --soak, além de limitar o estado dos pedidos (os fechados e os mais
+antigos são retirados, ver APITester.max_pedidos), a execução grava:
+
+    <checkpoint>               ponto de controle: os argumentos da carga, o tempo
+                               decorrido, os contadores e os histogramas completos,
+                               regravado a cada `intervalo` segundos
+    <checkpoint>.janelas.jsonl uma linha por endpoint (e '*') a cada `janela`
+                               segundos, com requisições, vazão, erros e percentis
+                               da janela (mesmo formato de exportacao.SerieTemporal)
+
+Os histogramas de metricas.Histograma já têm memória limitada; as janelas vão
+para o disco e só a cópia das métricas no fim da última janela fica em memória.
+O estado dos pedidos está no banco (ESTADO_DB), confirmado a cada ponto de
+controle.
+
+Com --resume <checkpoint>, a carga recomeça com os mesmos argumentos pelo tempo
+que faltava, somando aos contadores e histogramas do ponto de controle. O tempo
+em que o robô ficou parado não entra na duração nem na vazão.
+"""
+import os
+import json
+import time
+
+from metricas import Metricas
+from exportacao import CONTADORES, ENDPOINT_TOTAL, linha_serie
+
+VERSAO = 1
+
+
+def caminho_janelas(caminho: str) -> str:
+    return os.path.splitext(caminho)[0] + '.janelas.jsonl'
+
+
+def ler_ponto_controle(caminho: str) -> dict:
+    """Lê um ponto de controle gravado por PontoControle (métricas já como Metricas)"""
+    with open(caminho, encoding='utf-8') as f:
+        ponto = json.load(f)
+    if ponto.get('versao') != VERSAO:
+        raise ValueError(f"versão {ponto.get('versao')} do ponto de controle não suportada")
+    ponto['metricas'] = Metricas.de_dict(ponto['metricas'])
+    return ponto
+
+
+def retomar(tester, ponto: dict):
+    """Continua a contagem de um tester a partir do ponto de controle"""
+    for contador in CONTADORES:
+        tester.results[contador] += ponto['results'].get(contador, 0)
+    tester.metricas = ponto['metricas']
+    tester.metricas.inicio = time.time() - ponto['decorrido']
+    tester.metricas.fim = None
+
+
+class PontoControle:
+    """Série do Painel que grava o ponto de controle e as janelas de um teste de resistência"""
+
+    def __init__(self, caminho: str, argumentos: dict, intervalo: float, janela: float, retomado: dict = None):
+        self.caminho = caminho
+        self.argumentos = argumentos
+        self.intervalo = intervalo
+        self.janela = janela
+        self.janelas = caminho_janelas(caminho)
+        # Retomando, as janelas continuam no mesmo arquivo e a primeira começa nas métricas do ponto de controle
+        self.arquivo = open(self.janelas, 'a' if retomado else 'w', encoding='utf-8')
+        self._anterior = Metricas()
+        if retomado:
+            self._anterior.mesclar(retomado['metricas'])
+        self._inicio_janela = self._ultimo_ponto = time.time()
+
+    def gravar(self, tester):
+        agora = time.time()
+        if agora - self._inicio_janela >= self.janela:
+            self._fechar_janela(tester, agora)
+        if agora - self._ultimo_ponto >= self.intervalo:
+            self.salvar(tester)
+
+    def fechar(self, tester):
+        self._fechar_janela(tester, time.time())
+        self.arquivo.close()
+        self.salvar(tester, concluido=True)
+
+    def _fechar_janela(self, tester, agora: float):
+        metricas = tester.metricas
+        delta = metricas.diferenca(self._anterior)
+        self._anterior.mesclar(delta)
+        decorrido = agora - self._inicio_janela
+        self._inicio_janela = agora
+        for endpoint in delta.endpoints() + [ENDPOINT_TOTAL]:
+            linha = linha_serie(agora, agora - metricas.inicio, endpoint, delta, decorrido)
+            self.arquivo.write(json.dumps(linha, ensure_ascii=False) + '\n')
+        self.arquivo.flush()
+
+    def salvar(self, tester, concluido: bool = False):
+        """Grava o ponto de controle num temporário e o troca pelo anterior, que nunca fica pela metade"""
+        self._ultimo_ponto = time.time()
+        tester.armazem.commit()
+        ponto = {
+            'versao': VERSAO,
+            'argumentos': self.argumentos,
+            'gravado_em': self._ultimo_ponto,
+            'decorrido': tester.metricas.duracao(),
+            'concluido': concluido,
+            'results': {contador: tester.results[contador] for contador in CONTADORES},
+            'metricas': tester.metricas.para_dict()
+        }
+        temporario = self.caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(ponto, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.caminho)
@@ -0,0 +1,153 @@
+"""
+Detecção da saturação do próprio gerador de carga.
+
+Se o robô não dá conta da carga (CPU no limite, laço de eventos travado pelo
+GIL ou por código síncrono), as requisições esperam no cliente e toda latência
+medida sai inflada. MonitorSaturacao é uma série do Painel que, a cada
+intervalo, confere em cada processo do gerador (o principal e os workers, pelas
+medidas de APITester.medidas):
+
+    CPU           fração de um núcleo usada no intervalo (o Python executa
+                  uma thread por vez, então perto de 100% o processo satura)
+    laço          atraso do laço de eventos na última medição: quanto tempo
+                  ele ficou sem responder (motor assíncrono)
+    envio         p99 do atraso entre o envio previsto e o de fato no
+                  intervalo (modelo aberto)
+
+Um intervalo em que alguma medida passa do seu limite é um intervalo saturado:
+o painel mostra o alerta e o log registra o início e o fim de cada período
+saturado. Se a fração de intervalos saturados passar da tolerância, a
+execução é marcada como inválida no relatório final e no resumo de --export.
+Um limite igual a zero desativa a verificação correspondente.
+"""
+from collections import Counter
+
+from metricas import Histograma
+from registro import log
+
+PROCESSO_PRINCIPAL = 'principal'
+# Intervalo mínimo entre duas medidas de um processo para calcular o uso de CPU, em segundos
+INTERVALO_MINIMO_CPU = 0.5
+
+MOTIVO_CPU = 'CPU'
+MOTIVO_LACO = 'laço de eventos'
+MOTIVO_ENVIO = 'atraso de envio'
+
+
+class MonitorSaturacao:
+    """Série do Painel que acompanha a saúde do gerador e avisa quando ele satura"""
+
+    def __init__(self, limite_cpu: float, limite_laco: float, limite_envio: float, tolerancia: float):
+        self.limite_cpu = limite_cpu
+        self.limite_laco = limite_laco
+        self.limite_envio = limite_envio
+        self.tolerancia = tolerancia
+        self.intervalos = 0
+        self.saturados = 0
+        # Intervalos saturados por motivo
+        self.motivos = Counter()
+        self.cpu_maximo = {}
+        self.atraso_laco = Histograma()
+        self.atraso_envio_maximo = 0.0
+        # Descrição do último intervalo, se saturado (exibida pelo painel)
+        self.alerta = None
+        self._cpu_anterior = {}
+        self._atraso_envio_anterior = None
+
+    def gravar(self, tester):
+        atraso_envio = tester.metricas.atraso_envio
+        if self._atraso_envio_anterior is None:
+            # Primeira chamada: só guarda as referências (retomando, as métricas já trazem o passado)
+            self._atraso_envio_anterior = Histograma()
+            self._atraso_envio_anterior.mesclar(atraso_envio)
+            for processo, medidas in self._processos(tester):
+                self._cpu_anterior[processo] = (medidas['instante'], medidas['cpu'])
+            return
+
+        motivos = []
+        for processo, medidas in self._processos(tester):
+            anterior = self._cpu_anterior.get(processo)
+            if anterior is None:
+                self._cpu_anterior[processo] = (medidas['instante'], medidas['cpu'])
+                continue
+            # Medidas de um worker que ainda não enviou outra parcial são avaliadas só uma vez
+            decorrido = medidas['instante'] - anterior[0]
+            if decorrido < INTERVALO_MINIMO_CPU:
+                continue
+            self._cpu_anterior[processo] = (medidas['instante'], medidas['cpu'])
+            uso = (medidas['cpu'] - anterior[1]) / decorrido
+            self.cpu_maximo[processo] = max(uso, self.cpu_maximo.get(processo, 0.0))
+            if self.limite_cpu and uso >= self.limite_cpu:
+                motivos.append((MOTIVO_CPU, f"CPU {uso:.0%} em {processo}"))
+            if medidas['atraso_laco'] is not None:
+                self.atraso_laco.registrar(medidas['atraso_laco'])
+                if self.limite_laco and medidas['atraso_laco'] >= self.limite_laco:
+                    motivos.append((MOTIVO_LACO, f"laço de eventos parado {medidas['atraso_laco'] * 1000:.0f} ms "
+                                                 f"em {processo}"))
+
+        delta = atraso_envio.diferenca(self._atraso_envio_anterior)
+        self._atraso_envio_anterior.mesclar(delta)
+        if delta.total:
+            p99 = delta.percentil(99)
+            self.atraso_envio_maximo = max(p99, self.atraso_envio_maximo)
+            if self.limite_envio and p99 >= self.limite_envio:
+                motivos.append((MOTIVO_ENVIO, f"atraso de envio p99 {p99 * 1000:.0f} ms"))
+
+        self.intervalos += 1
+        if motivos:
+            self.saturados += 1
+            self.motivos.update({motivo for motivo, _ in motivos})
+            descricao = ', '.join(texto for _, texto in motivos)
+            if self.alerta is None:
+                log.warning("Gerador saturado: %s; as latências medidas incluem espera no próprio cliente", descricao)
+            self.alerta = f"GERADOR SATURADO ({descricao})"
+        elif self.alerta is not None:
+            log.info("Gerador voltou a acompanhar a carga")
+            self.alerta = None
+
+    def fechar(self, tester):
+        self.gravar(tester)
+        tester.saturacao = self.resumo()
+
+    @staticmethod
+    def _processos(tester):
+        return [(PROCESSO_PRINCIPAL, tester.medidas())] + \
+            [(f"worker-{worker}", medidas) for worker, medidas in sorted(tester.medidas_workers.items())]
+
+    def fracao_saturada(self) -> float:
+        return self.saturados / self.intervalos if self.intervalos else 0.0
+
+    def valida(self) -> bool:
+        return self.fracao_saturada() <= self.tolerancia
+
+    def resumo(self) -> dict:
+        """Resumo serializável em JSON, gravado junto com as métricas da execução"""
+        return {
+            'valida': self.valida(),
+            'intervalos': self.intervalos,
+            'intervalos_saturados': self.saturados,
+            'motivos': dict(self.motivos),
+            'cpu_maximo': {processo: round(uso, 3) for processo, uso in self.cpu_maximo.items()},
+            'atraso_laco_maximo': self.atraso_laco.maximo,
+            'atraso_envio_p99_maximo': self.atraso_envio_maximo
+        }
+
+    def imprimir(self):
+        print("\n=== Saúde do gerador ===")
+        if self.cpu_maximo:
+            print("CPU por processo (máximo num intervalo, em núcleos): " +
+                  ', '.join(f"{processo} {uso:.0%}" for processo, uso in sorted(self.cpu_maximo.items())))
+        if self.atraso_laco.total:
+            print(f"Atraso do laço de eventos: p99 {self.atraso_laco.percentil(99) * 1000:.1f} ms, "
+                  f"máx {self.atraso_laco.maximo * 1000:.1f} ms")
+        if self.atraso_envio_maximo:
+            print(f"Atraso de envio: maior p99 de um intervalo {self.atraso_envio_maximo * 1000:.1f} ms")
+        motivos = ', '.join(f"{motivo} {quantidade}" for motivo, quantidade in self.motivos.most_common())
+        print(f"Intervalos saturados: {self.saturados} de {self.intervalos} ({self.fracao_saturada():.1%})"
+              + (f": {motivos}" if motivos else ''))
+        if not self.valida():
+            print(f"\n!!! EXECUÇÃO INVÁLIDA: o gerador ficou saturado em {self.fracao_saturada():.1%} dos intervalos "
+                  f"(tolerância {self.tolerancia:.0%}).\n!!! As latências medidas incluem espera no próprio cliente; "
+                  f"use mais --workers ou reduza a carga.")
+        elif self.saturados:
+            print("Aviso: o gerador saturou em alguns intervalos; as latências desses intervalos estão infladas")
@@ -0,0 +1,326 @@
+"""
+Servidor local que imita a API SRPP para benchmarks offline e CI.
+
+Implementa as rotas usadas pelo api_tester.py com estado dos pedidos em memória
+e reproduz os casos especiais tratados pelo robô: 404 em recuperarObservacao e
+excluirItem, 500 em imprime e "Código do Cliente foi alterado por outro usuário"
+(400 em fecharPedido, 500 em alterarQuantidade), além de 500 ao alterar um
+pedido já fechado. A latência e a taxa de erros injetados são configuráveis por
+rota.
+
+Uso:
+    python servidor_mock.py --port 8080
+    python servidor_mock.py --port 8080 --config mock_config.json --processos 4
+    API_BASE_URL=http://127.0.0.1:8080 python api_tester.py
+
+Exemplo de configuração (latências em ms):
+    {
+        "padrao": {"latencia": {"distribuicao": "fixa", "ms": 0}, "taxa_erro": 0},
+        "rotas": {
+            "/Pedido/imprime": {
+                "latencia": {"distribuicao": "lognormal", "mediana_ms": 200, "sigma": 0.6},
+                "taxa_erro": 0.05,
+                "tamanho_resposta": 65536
+            }
+        }
+    }
+
+Distribuições: fixa (ms), uniforme (min_ms, max_ms), exponencial (media_ms) e
+lognormal (mediana_ms, sigma).
+"""
+import sys
+import json
+import math
+import signal
+import random
+import asyncio
+import argparse
+import multiprocessing
+from aiohttp import web
+
+from api_tester import carregar_codigos_produto, carregar_cod_clientes, carregar_cod_representantes
+
+MENSAGEM_CLIENTE_ALTERADO = 'Código do Cliente foi alterado por outro usuário'
+
+ROTAS = [
+    ('GET', '/Representante/listar'),
+    ('GET', '/Cliente/listar'),
+    ('GET', '/Produto/listar'),
+    ('GET', '/Pedido/listarPedidosAbertos/{codRepresentante}'),
+    ('POST', '/Pedido/Criar'),
+    ('POST', '/EditaItemPedido/alterarQuantidade'),
+    ('DELETE', '/EditaItemPedido/excluirItem'),
+    ('GET', '/EditaItemPedido/recuperarObservacao/{nroPedido}'),
+    ('POST', '/EditaItemPedido/fecharPedido'),
+    ('POST', '/Pedido/imprime'),
+    ('POST', '/Pedido/imprimeFichaCadastral'),
+    ('POST', '/Produto/busca')
+]
+
+CONFIG_PADRAO = {
+    'padrao': {'latencia': {'distribuicao': 'fixa', 'ms': 0}, 'taxa_erro': 0.0, 'tamanho_resposta': 2048},
+    'rotas': {}
+}
+
+
+def _json(dados, status: int = 200) -> web.Response:
+    """Resposta JSON em UTF-8 sem escapes, como a da API real (o robô procura mensagens no texto)"""
+    return web.json_response(dados, status=status, dumps=lambda obj: json.dumps(obj, ensure_ascii=False))
+
+
+def criar_sorteio_latencia(latencia: dict):
+    """Converte a configuração de latência em uma função que retorna segundos"""
+    distribuicao = latencia.get('distribuicao', 'fixa')
+    if distribuicao == 'fixa':
+        valor = latencia.get('ms', 0) / 1000
+        return lambda: valor
+    if distribuicao == 'uniforme':
+        minimo, maximo = latencia['min_ms'] / 1000, latencia['max_ms'] / 1000
+        return lambda: random.uniform(minimo, maximo)
+    if distribuicao == 'exponencial':
+        taxa = 1000 / latencia['media_ms']
+        return lambda: random.expovariate(taxa)
+    if distribuicao == 'lognormal':
+        mu, sigma = math.log(latencia['mediana_ms'] / 1000), latencia.get('sigma', 0.5)
+        return lambda: random.lognormvariate(mu, sigma)
+    raise ValueError(f"Distribuição de latência desconhecida: {distribuicao}")
+
+
+class ConfigRota:
+    """Latência, taxa de erros injetados e tamanho da resposta de uma rota"""
+
+    def __init__(self, padrao: dict, especifica: dict):
+        config = dict(padrao)
+        config.update(especifica or {})
+        self.sortear_latencia = criar_sorteio_latencia(config.get('latencia', {}))
+        self.taxa_erro = float(config.get('taxa_erro', 0.0))
+        self.tamanho_resposta = int(config.get('tamanho_resposta', 2048))
+
+    def injetar_erro(self) -> bool:
+        return self.taxa_erro > 0 and random.random() < self.taxa_erro
+
+
+class Pedido:
+    __slots__ = ('cliente', 'representante', 'observacao', 'itens', 'fechado')
+
+    def __init__(self, cliente, representante=None, observacao=None):
+        self.cliente = cliente
+        self.representante = representante
+        self.observacao = observacao
+        self.itens = {}
+        self.fechado = False
+
+
+class ServidorMock:
+    """
+    Estado em memória e handlers das rotas.
+
+    No modo tolerante (padrão) pedidos desconhecidos, como os que o robô carrega
+    de execuções contra a API real, são criados no primeiro acesso e qualquer
+    código de produto é aceito; no modo estrito eles recebem 404/500 como
+    pedidos e produtos inexistentes.
+    """
+
+    def __init__(self, config: dict = None, estrito: bool = False, primeiro_pedido: int = 1000000, passo_pedido: int = 1):
+        config = config or CONFIG_PADRAO
+        padrao = dict(CONFIG_PADRAO['padrao'])
+        padrao.update(config.get('padrao', {}))
+        self.rotas = {caminho: ConfigRota(padrao, config.get('rotas', {}).get(caminho)) for _, caminho in ROTAS}
+        self.estrito = estrito
+        self.prefixo = ''
+        self.pedidos = {}
+        self.proximo_pedido = primeiro_pedido
+        self.passo_pedido = passo_pedido
+        self.produtos = carregar_codigos_produto()
+        self.conjunto_produtos = set(self.produtos)
+        self.clientes = [{'codCliente': cod, 'nome': f'Cliente {cod}'} for cod in carregar_cod_clientes()]
+        self.representantes = [{'codRepresentante': cod, 'nome': f'Representante {cod}'} for cod in carregar_cod_representantes()]
+        self.catalogo = [{'codigo': cod, 'descricao': f'Produto {cod}'} for cod in self.produtos]
+
+    def _pedido(self, nro_pedido, cliente=None):
+        """Retorna o pedido; no modo tolerante cria pedidos desconhecidos"""
+        try:
+            nro_pedido = int(nro_pedido)
+        except (TypeError, ValueError):
+            return None
+        pedido = self.pedidos.get(nro_pedido)
+        if pedido is None and not self.estrito:
+            pedido = self.pedidos[nro_pedido] = Pedido(cliente)
+        return pedido
+
+    def _caminho(self, request) -> str:
+        """Template da rota atendida, sem o prefixo (ex.: '/Pedido/listarPedidosAbertos/{codRepresentante}')"""
+        recurso = request.match_info.route.resource
+        if recurso is None:
+            return None
+        return recurso.canonical[len(self.prefixo):]
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        """Aplica a latência configurada e injeta erros antes de executar a rota"""
+        caminho = self._caminho(request)
+        rota = self.rotas.get(caminho)
+        if rota is not None:
+            atraso = rota.sortear_latencia()
+            if atraso > 0:
+                await asyncio.sleep(atraso)
+            if rota.injetar_erro():
+                return self._erro_injetado(caminho)
+        return await handler(request)
+
+    def _erro_injetado(self, caminho: str):
+        if caminho == '/EditaItemPedido/fecharPedido':
+            return _json({'errorMessage': MENSAGEM_CLIENTE_ALTERADO}, status=400)
+        if caminho == '/EditaItemPedido/alterarQuantidade':
+            return _json({'errorMessage': MENSAGEM_CLIENTE_ALTERADO}, status=500)
+        if caminho in ('/EditaItemPedido/excluirItem', '/EditaItemPedido/recuperarObservacao/{nroPedido}'):
+            return _json({'errorMessage': 'Não encontrado'}, status=404)
+        return _json({'errorMessage': 'Erro interno simulado'}, status=500)
+
+    async def listar_representantes(self, request):
+        return _json(self.representantes)
+
+    async def listar_clientes(self, request):
+        return _json(self.clientes)
+
+    async def listar_produtos(self, request):
+        return _json(self.catalogo)
+
+    async def listar_pedidos_abertos(self, request):
+        cod_representante = request.match_info['codRepresentante']
+        abertos = [{'nroPedido': nro, 'codCliente': p.cliente}
+                   for nro, p in self.pedidos.items()
+                   if not p.fechado and str(p.representante) == cod_representante]
+        return _json(abertos)
+
+    async def criar_pedido(self, request):
+        dados = await request.json()
+        nro_pedido = self.proximo_pedido
+        self.proximo_pedido += self.passo_pedido
+        self.pedidos[nro_pedido] = Pedido(dados.get('CodCliente'), dados.get('CodRepresentante'), dados.get('Observacao'))
+        return _json({'pedidoNumero': nro_pedido})
+
+    async def alterar_quantidade(self, request):
+        dados = await request.json()
+        pedido = self._pedido(dados.get('nroPedido'), dados.get('codCliente'))
+        if pedido is None:
+            return _json({'errorMessage': 'Pedido não encontrado'}, status=500)
+        if pedido.cliente is not None and pedido.cliente != dados.get('codCliente'):
+            return _json({'errorMessage': MENSAGEM_CLIENTE_ALTERADO}, status=500)
+        if pedido.fechado:
+            return _json({'errorMessage': 'Pedido já está fechado'}, status=500)
+        pedido.itens[dados.get('codProduto')] = dados.get('qtdVendida')
+        return _json({'sucesso': True, 'itens': len(pedido.itens)})
+
+    async def excluir_item(self, request):
+        pedido = self._pedido(request.query.get('nroPedido'))
+        codigo = request.query.get('codigo')
+        if pedido is None or codigo not in pedido.itens:
+            return _json({'errorMessage': 'Item não encontrado'}, status=404)
+        del pedido.itens[codigo]
+        return _json({'sucesso': True})
+
+    async def recuperar_observacao(self, request):
+        pedido = self._pedido(request.match_info['nroPedido'])
+        if pedido is None or not pedido.observacao:
+            return _json({'errorMessage': 'Pedido sem observações'}, status=404)
+        return _json({'observacao': pedido.observacao})
+
+    async def fechar_pedido(self, request):
+        dados = await request.json()
+        pedido = self._pedido(dados.get('nroPedido'))
+        if pedido is None:
+            return _json({'errorMessage': 'Pedido não encontrado'}, status=404)
+        pedido.fechado = True
+        return _json({'sucesso': True})
+
+    async def imprimir(self, request):
+        dados = await request.json()
+        pedido = self._pedido(dados.get('nroPedido'))
+        if pedido is None:
+            return _json({'errorMessage': 'Pedido não encontrado'}, status=500)
+        # Como na API real, o documento vem num JSON (aqui, tamanho_resposta caracteres de conteúdo base64)
+        tamanho = self.rotas[self._caminho(request)].tamanho_resposta
+        return _json({'nroPedido': dados.get('nroPedido'), 'arquivo': 'A' * tamanho})
+
+    async def buscar_produto(self, request):
+        dados = await request.json()
+        codigo = dados.get('codigo')
+        if self.estrito and codigo not in self.conjunto_produtos:
+            return _json({'errorMessage': 'Produto não encontrado'}, status=404)
+        return _json({'codigo': codigo, 'descricao': f'Produto {codigo}'})
+
+    def criar_app(self, prefixo: str = '') -> web.Application:
+        app = web.Application(middlewares=[self.middleware])
+        handlers = {
+            '/Representante/listar': self.listar_representantes,
+            '/Cliente/listar': self.listar_clientes,
+            '/Produto/listar': self.listar_produtos,
+            '/Pedido/listarPedidosAbertos/{codRepresentante}': self.listar_pedidos_abertos,
+            '/Pedido/Criar': self.criar_pedido,
+            '/EditaItemPedido/alterarQuantidade': self.alterar_quantidade,
+            '/EditaItemPedido/excluirItem': self.excluir_item,
+            '/EditaItemPedido/recuperarObservacao/{nroPedido}': self.recuperar_observacao,
+            '/EditaItemPedido/fecharPedido': self.fechar_pedido,
+            '/Pedido/imprime': self.imprimir,
+            '/Pedido/imprimeFichaCadastral': self.imprimir,
+            '/Produto/busca': self.buscar_produto
+        }
+        self.prefixo = prefixo.rstrip('/')
+        for metodo, caminho in ROTAS:
+            app.router.add_route(metodo, self.prefixo + caminho, handlers[caminho])
+        return app
+
+
+def carregar_config(caminho: str) -> dict:
+    if not caminho:
+        return CONFIG_PADRAO
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def executar_servidor(host: str, port: int, config: dict, estrito: bool, prefixo: str,
+                      indice: int = 0, num_processos: int = 1):
+    """Roda um processo do servidor; com vários processos a porta é compartilhada via SO_REUSEPORT"""
+    # Numeração intercalada para que processos diferentes nunca gerem o mesmo pedido
+    servidor = ServidorMock(config, estrito, primeiro_pedido=1000000 + indice, passo_pedido=num_processos)
+    web.run_app(servidor.criar_app(prefixo), host=host, port=port, access_log=None,
+                reuse_port=num_processos > 1, print=None if indice else print)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita a API SRPP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--config', help="Arquivo JSON com latência e taxa de erros por rota")
+    parser.add_argument('--prefix', default='', help="Prefixo das rotas (ex.: /SrppApi/api)")
+    parser.add_argument('--estrito', action='store_true',
+                        help="Responde pedidos desconhecidos como inexistentes em vez de criá-los")
+    parser.add_argument('--processos', type=int, default=1,
+                        help="Número de processos servindo a mesma porta (Linux/BSD)")
+    args = parser.parse_args()
+    config = carregar_config(args.config)
+
+    if args.processos <= 1:
+        executar_servidor(args.host, args.port, config, args.estrito, args.prefix)
+        return
+
+    processos = [multiprocessing.Process(target=executar_servidor,
+                                         args=(args.host, args.port, config, args.estrito, args.prefix, i, args.processos))
+                 for i in range(args.processos)]
+    for processo in processos:
+        processo.start()
+    # Encerrar o processo principal (Ctrl+C ou SIGTERM) também encerra os servidores filhos
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for processo in processos:
+            processo.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for processo in processos:
+            processo.terminate()
+
+
+if __name__ == "__main__":
+    main()
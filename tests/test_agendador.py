@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from agendador import (CHEGADAS_POISSON, Estagio, chegadas, duracao_total, escalar_perfil,
+                       interpretar_perfil, recortar_perfil)
+
+
+def test_interpretar_perfil():
+    estagios = interpretar_perfil("30s@50rps, 2m@10->200rps, 1h@0")
+    assert [e.duracao for e in estagios] == [30, 120, 3600]
+    assert (estagios[1].taxa_inicial, estagios[1].taxa_final) == (10, 200)
+    assert estagios[2].requisicoes() == 0
+    assert duracao_total(estagios) == 3750
+
+
+@pytest.mark.parametrize('texto', ['', ' , ', '30@', 'abc', '10x@5rps', '0s@5rps'])
+def test_interpretar_perfil_invalido(texto):
+    with pytest.raises(ValueError):
+        interpretar_perfil(texto)
+
+
+def test_chegadas_uniformes_em_estagio_constante():
+    instantes = list(chegadas([Estagio(10, 5)]))
+    assert len(instantes) == 50
+    assert instantes == pytest.approx([k / 5 for k in range(1, 51)])
+
+
+def test_chegadas_em_rampa_seguem_a_area_da_taxa():
+    estagios = interpretar_perfil("10s@0->20rps, 5s@0, 5s@4")
+    instantes = list(chegadas(estagios))
+    assert instantes == sorted(instantes)
+    assert len(instantes) == 100 + 20
+    # Na rampa a contagem acumulada é t², então a metade das requisições sai em t = √50
+    assert instantes[49] == pytest.approx(50 ** 0.5)
+    assert not [t for t in instantes if 10 < t < 15]
+
+
+def test_chegadas_poisson_com_semente():
+    estagios = [Estagio(100, 50)]
+    instantes = list(chegadas(estagios, CHEGADAS_POISSON, random.Random(11)))
+    assert instantes == sorted(instantes)
+    assert len(instantes) == pytest.approx(5000, rel=0.05)
+    assert instantes == list(chegadas(estagios, CHEGADAS_POISSON, random.Random(11)))
+
+
+def test_escalar_e_recortar_perfil():
+    estagios = interpretar_perfil("10s@100, 10s@0->100")
+    metade = escalar_perfil(estagios, 0.5)
+    assert [(e.taxa_inicial, e.taxa_final) for e in metade] == [(50, 50), (0, 50)]
+
+    restantes = recortar_perfil(estagios, 15)
+    assert len(restantes) == 1
+    assert restantes[0].duracao == 5
+    assert (restantes[0].taxa_inicial, restantes[0].taxa_final) == (50, 100)
+    assert recortar_perfil(estagios, 20) == []
+    assert len(list(chegadas(restantes))) == 375
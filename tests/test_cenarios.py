@@ -0,0 +1,61 @@
+import random
+from collections import Counter
+
+import pytest
+
+from cenarios import TabelaAlias, Cenario, RequisicaoIndisponivel, compilar_valor
+
+
+def test_tabela_alias_segue_os_pesos():
+    pesos = [1, 2, 3, 4]
+    tabela = TabelaAlias(pesos)
+    rng = random.Random(7)
+    sorteios = 200000
+    contagem = Counter(tabela.sortear(rng) for _ in range(sorteios))
+    for i, peso in enumerate(pesos):
+        assert contagem[i] / sorteios == pytest.approx(peso / sum(pesos), abs=0.005)
+
+
+def test_tabela_alias_com_uma_opcao_e_pesos_fracionarios():
+    assert {TabelaAlias([5]).sortear() for _ in range(100)} == {0}
+    tabela = TabelaAlias([0.1, 0.0, 0.9])
+    rng = random.Random(1)
+    assert 1 not in {tabela.sortear(rng) for _ in range(10000)}
+
+
+def test_compilar_valor_geradores_e_constantes():
+    referencias = {'produtos': ['A', 'B']}
+    assert compilar_valor(10, referencias, None, 'campo') == 10
+    assert compilar_valor('texto fixo', referencias, None, 'campo') == 'texto fixo'
+    produto = compilar_valor('$produto', referencias, None, 'campo')
+    assert produto(None, {}) in ('A', 'B')
+    inteiro = compilar_valor('$int:1:3', referencias, None, 'campo')
+    assert {inteiro(None, {}) for _ in range(200)} == {1, 2, 3}
+    with pytest.raises(ValueError):
+        compilar_valor('$desconhecido', referencias, None, 'campo')
+    with pytest.raises(ValueError):
+        compilar_valor('$int:1', referencias, None, 'campo')
+
+
+class _EstadoVazio:
+    def pedido_aleatorio(self):
+        return None
+
+
+class _Tester:
+    estado = _EstadoVazio()
+
+
+def test_cenario_pula_endpoints_sem_pedido_e_exige_peso():
+    definicao = {'endpoints': [
+        {'endpoint': '/Produto/listar', 'method': 'GET', 'peso': 0},
+        {'endpoint': '/Pedido/imprime', 'method': 'POST', 'peso': 1, 'data': {'nroPedido': '$pedido'}}
+    ]}
+    cenario = Cenario(definicao, {}, lambda tamanho: ['x'])
+    assert cenario.selecionar(_Tester()) is None
+    with pytest.raises(RequisicaoIndisponivel):
+        cenario.endpoints[0].montar(_Tester())
+
+    definicao['endpoints'][1]['peso'] = 0
+    with pytest.raises(ValueError):
+        Cenario(definicao, {}, lambda tamanho: ['x'])
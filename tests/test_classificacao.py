@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from classificacao import Classificador, Regra, carregar_classificador
+
+REGRAS = [
+    {'endpoint': '/Pedido/ExcluirItem/{nroPedido}', 'status': 400, 'contem': 'não encontrado',
+     'mensagem': 'Item {codProduto} do pedido {nroPedido} já excluído'},
+    {'endpoint': '/Pedido/ExcluirItem/{nroPedido}', 'status': 400, 'contem': 'bloqueado',
+     'mensagem': 'Pedido {nroPedido} bloqueado'},
+    {'endpoint': '/Pedido/Fechar', 'status': 409}
+]
+
+
+def test_classifica_por_template_e_status():
+    classificador = Classificador(REGRAS)
+    template = '/Pedido/ExcluirItem/{nroPedido}'
+    assert classificador.classificar(template, 400, 'Pedido bloqueado').mensagem == 'Pedido {nroPedido} bloqueado'
+    assert classificador.classificar(template, 400, 'outro erro') is None
+    assert classificador.classificar(template, 500, 'Pedido bloqueado') is None
+    assert classificador.classificar('/Pedido/Criar', 400, 'Pedido bloqueado') is None
+    # Sem "contem" qualquer corpo serve
+    assert classificador.classificar('/Pedido/Fechar', 409, '').template == '/Pedido/Fechar'
+
+
+def test_contem_aceita_o_trecho_escapado_em_json():
+    classificador = Classificador(REGRAS)
+    corpo = json.dumps({'mensagem': 'Item não encontrado'})
+    assert '\\u00e3' in corpo
+    regra = classificador.classificar('/Pedido/ExcluirItem/{nroPedido}', 400, corpo)
+    assert regra is not None and regra.trechos
+
+
+def test_descrever_preenche_campos_da_requisicao():
+    regra = Regra(REGRAS[0])
+    assert regra.descrever({'codProduto': 'P1'}, {'nroPedido': 7}) == 'Item P1 do pedido 7 já excluído'
+    assert regra.descrever() == 'Item desconhecido do pedido desconhecido já excluído'
+    assert Regra(REGRAS[2]).descrever() == 'Erro esperado 409 em /Pedido/Fechar'
+
+
+@pytest.mark.parametrize('definicao', [{'status': 400}, {'endpoint': '/Pedido/Fechar'},
+                                       {'endpoint': '/Pedido/Fechar', 'status': 'abc'}])
+def test_regra_invalida(definicao):
+    with pytest.raises(ValueError):
+        Classificador([definicao])
+
+
+def test_carregar_classificador(tmp_path):
+    assert carregar_classificador(str(tmp_path / 'inexistente.json')).tabela == {}
+    caminho = tmp_path / 'erros.json'
+    caminho.write_text(json.dumps(REGRAS), encoding='utf-8')
+    assert len(carregar_classificador(str(caminho)).tabela) == 2
@@ -0,0 +1,74 @@
+import random
+
+from estado_pedidos import ArmazemPedidos, ConjuntoIndexado, EstadoPedidos
+
+
+def test_conjunto_indexado_remocao_mantem_os_indices():
+    conjunto = ConjuntoIndexado(range(10))
+    assert not conjunto.adicionar(3)
+    assert conjunto.remover(0)
+    assert conjunto.remover(9)
+    assert not conjunto.remover(42)
+    assert len(conjunto) == 8
+    assert sorted(conjunto) == list(range(1, 9))
+    # Cada elemento continua na posição registrada depois das trocas
+    for elemento in conjunto:
+        assert conjunto._elementos[conjunto._posicoes[elemento]] == elemento
+
+
+def test_conjunto_indexado_sorteio():
+    assert ConjuntoIndexado().sortear() is None
+    conjunto = ConjuntoIndexado(['a', 'b', 'c'])
+    random.seed(3)
+    assert {conjunto.sortear() for _ in range(300)} == {'a', 'b', 'c'}
+    conjunto.remover('b')
+    assert 'b' not in {conjunto.sortear() for _ in range(300)}
+
+
+def test_estado_itens_e_clientes():
+    estado = EstadoPedidos()
+    assert estado.pedido_aleatorio() is None
+    assert estado.adicionar_pedido(100)
+    assert not estado.adicionar_pedido('100')
+    estado.associar_cliente(100, 7)
+    assert estado.adicionar_item(100, 'P1')
+    assert not estado.adicionar_item(100, 'P1')
+    assert estado.item_aleatorio(100) == 'P1'
+    assert estado.remover_item(100, 'P1')
+    assert estado.item_aleatorio(100) is None
+    assert estado.cliente_do_pedido(100) == 7
+    assert estado.pedido_aleatorio() == 100
+
+
+def test_retirados_ficam_no_banco_e_fechados_nao_sao_recarregados(tmp_path):
+    caminho = str(tmp_path / 'estado.db')
+    armazem = ArmazemPedidos(caminho)
+    estado = EstadoPedidos(armazem)
+    for nro in range(1, 6):
+        estado.adicionar_pedido(nro)
+    estado.adicionar_item(1, 'P1')
+    estado.adicionar_item(4, 'P4')
+    estado.associar_cliente(4, 10)
+
+    assert estado.retirar_antigos(3) == 2
+    assert estado.fechar_pedido(4)
+    assert len(estado) == 2
+    assert not estado.contem_pedido(1) and estado.contem_pedido(5)
+    # Resposta atrasada de um pedido retirado não recria os itens
+    assert not estado.adicionar_item(1, 'P2')
+    assert estado.item_aleatorio(1) is None
+    armazem.fechar()
+
+    armazem = ArmazemPedidos(caminho)
+    assert armazem.carregar() == ([1, 2, 3, 5], {1: ['P1']}, {})
+    assert armazem.conexao.execute("SELECT COUNT(*) FROM pedidos_criados").fetchone() == (5,)
+    armazem.fechar()
+
+
+def test_restringir_particao():
+    estado = EstadoPedidos()
+    estado.carregar([1, 2, 3, 4], {2: ['A'], 3: ['B']}, {1: 10, 2: 20})
+    estado.restringir(lambda nro: nro % 2 == 0)
+    assert len(estado) == 2
+    assert estado.item_aleatorio(2) == 'A' and estado.item_aleatorio(3) is None
+    assert estado.cliente_do_pedido(1) is None and estado.cliente_do_pedido(2) == 20
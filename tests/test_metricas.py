@@ -0,0 +1,117 @@
+import json
+import math
+import random
+
+import pytest
+
+from metricas import Histograma, Metricas, SUCESSO, ERRO
+
+
+def histograma_de(valores) -> Histograma:
+    histograma = Histograma()
+    for valor in valores:
+        histograma.registrar(valor)
+    return histograma
+
+
+def test_percentil_dentro_da_precisao():
+    rng = random.Random(42)
+    valores = sorted(rng.uniform(0.001, 2.0) for _ in range(10000))
+    histograma = histograma_de(valores)
+    for p in (50, 90, 99, 99.9):
+        exato = valores[math.ceil(len(valores) * p / 100) - 1]
+        assert histograma.percentil(p) == pytest.approx(exato, rel=Histograma.PRECISAO)
+
+
+def test_percentil_limitado_ao_minimo_e_ao_maximo():
+    histograma = histograma_de([0.25, 0.5, 0.75])
+    assert 0.25 <= histograma.percentil(1) <= 0.25 * Histograma.BASE
+    assert histograma.percentil(50) == pytest.approx(0.5, rel=Histograma.PRECISAO)
+    assert histograma.percentil(100) == 0.75
+
+
+def test_percentil_sem_amostras_e_valores_fora_do_intervalo():
+    assert Histograma().percentil(99) == 0.0
+    histograma = histograma_de([0.0, Histograma.VALOR_MAXIMO * 10])
+    # Abaixo de VALOR_MINIMO tudo cai no bucket 0
+    assert histograma.percentil(1) <= Histograma.VALOR_MINIMO
+    # Acima de VALOR_MAXIMO tudo cai no último bucket; o máximo exato continua guardado
+    assert Histograma.VALOR_MAXIMO <= histograma.percentil(100) <= histograma.maximo == Histograma.VALOR_MAXIMO * 10
+    assert len(histograma.contagens) == 2
+
+
+def test_mesclar_equivale_a_registrar_tudo():
+    a, b = [0.01, 0.02, 0.5], [0.003, 1.5]
+    mesclado = histograma_de(a)
+    mesclado.mesclar(histograma_de(b))
+    direto = histograma_de(a + b)
+    assert mesclado.contagens == direto.contagens
+    assert mesclado.total == direto.total
+    assert mesclado.soma == pytest.approx(direto.soma)
+    assert (mesclado.minimo, mesclado.maximo) == (direto.minimo, direto.maximo)
+
+
+def test_diferenca_desfaz_mesclar():
+    anterior = histograma_de([0.01, 0.02, 0.02])
+    novos = [0.02, 0.3, 0.4]
+    atual = Histograma()
+    atual.mesclar(anterior)
+    for valor in novos:
+        atual.registrar(valor)
+
+    delta = atual.diferenca(anterior)
+    assert delta.contagens == histograma_de(novos).contagens
+    assert delta.total == len(novos)
+    assert delta.soma == pytest.approx(sum(novos))
+    # Mínimo e máximo do intervalo são os limites dos buckets ocupados
+    assert delta.minimo <= 0.02 and delta.maximo >= 0.4
+
+    anterior.mesclar(delta)
+    assert anterior.contagens == atual.contagens
+
+
+def test_histograma_para_dict_e_de_dict():
+    histograma = histograma_de([0.001, 0.2, 3.0])
+    copia = Histograma.de_dict(json.loads(json.dumps(histograma.para_dict())))
+    assert copia.contagens == histograma.contagens
+    assert (copia.total, copia.soma, copia.minimo, copia.maximo) == \
+        (histograma.total, histograma.soma, histograma.minimo, histograma.maximo)
+    vazio = Histograma.de_dict(json.loads(json.dumps(Histograma().para_dict())))
+    assert vazio.total == 0 and vazio.percentil(50) == 0.0
+
+
+def test_metricas_diferenca_e_para_dict():
+    metricas = Metricas()
+    metricas.registrar('/Pedido/Criar', SUCESSO, 0.1)
+    metricas.registrar_fases('/Pedido/Criar', {'espera': 0.08})
+    anterior = Metricas()
+    anterior.mesclar(metricas)
+
+    metricas.registrar('/Pedido/Criar', ERRO, 0.5)
+    metricas.registrar('/Produto/busca', SUCESSO, 0.02)
+    metricas.registrar_transacao('pedido', SUCESSO, 1.2)
+    metricas.atraso_envio.registrar(0.003)
+    delta = metricas.diferenca(anterior)
+    assert delta.contagem() == 2
+    assert delta.contagem('/Pedido/Criar', ERRO) == 1
+    assert ('/Pedido/Criar', SUCESSO) not in delta.histogramas
+    assert not delta.fases
+    assert delta.transacao('pedido').total == 1
+    assert delta.atraso_envio.total == 1
+
+    copia = Metricas.de_dict(json.loads(json.dumps(metricas.para_dict())))
+    assert copia.contagem() == metricas.contagem() == 3
+    assert copia.endpoints() == metricas.endpoints()
+    assert copia.fase('/Pedido/Criar', 'espera').total == 1
+    assert copia.combinado().percentil(99) == metricas.combinado().percentil(99)
+
+
+def test_extrair_recomeca_a_contagem():
+    metricas = Metricas()
+    metricas.registrar('/Produto/busca', SUCESSO, 0.02)
+    parcial = metricas.extrair()
+    assert parcial.contagem() == 1
+    assert metricas.contagem() == 0
+    metricas.registrar('/Produto/busca', SUCESSO, 0.03)
+    parcial.mesclar(metricas.extrair())
+    assert parcial.contagem() == 2
@@ -0,0 +1,15 @@
+from referencias import extrair_codigos
+
+CAMPOS = ('codProduto', 'codigo')
+
+
+def test_extrair_codigos_de_objetos_e_listas():
+    resposta = [{'CODPRODUTO': 'A'}, {'codigo': 'B', 'codProduto': None}, {'descricao': 'sem código'}, {'codProduto': 'A'}]
+    assert extrair_codigos(resposta, CAMPOS) == ['A', 'B']
+    assert extrair_codigos({'total': 2, 'itens': [3, 1, 3]}, CAMPOS) == [3, 1]
+    assert extrair_codigos('erro', CAMPOS) == []
+
+
+def test_extrair_codigos_ignora_codigos_nao_escalares():
+    resposta = [{'codProduto': ['A']}, {'codProduto': {'id': 1}}, [1, 2], 'C']
+    assert extrair_codigos(resposta, CAMPOS) == ['C']